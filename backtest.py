@@ -0,0 +1,306 @@
+import os
+import sys
+import json
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pytz
+import price_matrix
+import parallel_fetch
+import rs_engine
+import rs_kr
+import rs_us
+
+# =========================================================================
+# RS 전략 백테스트 (리밸런싱 날짜마다 RS 순위를 벡터 연산으로 재현)
+# - 입력: 장기 가격 행렬 (.cache/backtest/<market>/close.f32, price_matrix 형식)
+#   → ffill 한 (날짜, 종목) float32 배열을 replay.f32 로 한 번 써 두고
+#     워커 프로세스들은 같은 파일을 읽기 전용 memmap 으로 공유 (복사 없음)
+# - 한 설정 = (기간 세트, 리밸런싱 주기) → 모든 리밸런싱 날짜 x 기간 x 종목 점수를 한 번에,
+#   가중치 후보들은 같은 점수를 재사용해서 가중평균만 다시 계산
+# - 결과: 상위 10% 동일가중 포트폴리오의 다음 리밸런싱까지 수익률,
+#         연환산 수익률 / 지수 대비 초과 / 회전율 / 적중률 / MDD
+#
+# 사용법
+#   python backtest.py prepare kr [년수]        # 장기 히스토리 다운로드 (캐시 재사용)
+#   python backtest.py sweep kr [워커 수]       # 전체 그리드 병렬 실행
+#   python backtest.py run kr 180,90,60,30,10 0.2,0.2,0.2,0.2,0.2 5
+# =========================================================================
+BACKTEST_DIR = os.path.join('.cache', 'backtest')
+RESULT_DIR = 'backtest_results'
+YEARS = 10
+TRADING_DAYS = 252
+TOP_PCT = 0.1            # 상위 10% 보유
+CHUNK_ROWS = 64          # 리밸런싱 날짜를 이만큼씩 나눠서 점수 계산 (메모리 상한)
+TOP_N_PRINT = 15
+
+# 그리드: 기간 세트 x 가중치 방식 x 리밸런싱 주기(거래일)
+PERIOD_SETS = [
+    [180, 90, 60, 30, 10],
+    [250, 120, 60, 20],
+    [120, 60, 20],
+    [60, 20, 5],
+    [250, 60],
+]
+WEIGHT_SCHEMES = ['flat', 'recent', 'long']
+REBALANCE_DAYS = [5, 10, 21]
+
+MARKETS = {
+    'kr': {'module': rs_kr, 'index': rs_kr.INDEX_TICKER},
+    'us': {'module': rs_us, 'index': rs_us.INDEX_TICKER},
+}
+
+kst = pytz.timezone('Asia/Seoul')
+
+_shared = {}   # 워커 프로세스별: {'prices': memmap, 'index': ndarray}
+
+
+def scheme_weights(scheme, n):
+    """가중치 방식(이름 또는 숫자 리스트) → n 개 가중치 (합 1, 기간 리스트 순서 = 긴 기간 → 짧은 기간)"""
+    if isinstance(scheme, (list, tuple)):
+        if len(scheme) != n:
+            raise ValueError(f"가중치 {len(scheme)}개 / 기간 {n}개가 맞지 않습니다.")
+        w = np.asarray(scheme, dtype=float)
+    elif scheme == 'flat':
+        w = np.ones(n)
+    elif scheme == 'recent':
+        w = np.arange(1, n + 1, dtype=float)       # 짧은 기간일수록 큼
+    elif scheme == 'long':
+        w = np.arange(n, 0, -1, dtype=float)       # 긴 기간일수록 큼
+    else:
+        raise ValueError(f"알 수 없는 가중치 방식: {scheme}")
+    return w / w.sum()
+
+
+# =========================================================================
+# 데이터 준비
+# =========================================================================
+def _replay_paths(market):
+    d = os.path.join(BACKTEST_DIR, market)
+    return os.path.join(d, 'replay.f32'), os.path.join(d, 'replay.json')
+
+
+def prepare(market, years=YEARS):
+    """
+    장기 종가 히스토리를 받아서 백테스트 전용 가격 행렬에 기록
+    - 종목: 각 RS 모듈의 현재 유니버스 (RS_KR_MODE=full 이면 전 종목)
+    """
+    conf = MARKETS[market]
+    mod = conf['module']
+    now = datetime.now(kst)
+    end = now.strftime('%Y-%m-%d')
+    start = (now - timedelta(days=int(years * 365.25))).strftime('%Y-%m-%d')
+    if market == 'kr':
+        _, codes, _ = mod.load_universe()
+    else:
+        codes = list(mod.ALL_US_TICKERS)
+
+    print(f"📥 {market} {len(codes)}종목 {start} ~ {end} 히스토리 다운로드")
+    closes = parallel_fetch.fetch_closes(codes + [conf['index']], start, end)
+    if conf['index'] not in closes:
+        raise RuntimeError(f"❌ 지수 {conf['index']} 히스토리를 받지 못했습니다.")
+    pm = price_matrix.update(market, closes, start, end, root=BACKTEST_DIR)
+    print(f"✅ 백테스트 행렬 {pm.n_rows}일 x {pm.n_cols}종목")
+    return build_replay(market)
+
+
+def build_replay(market):
+    """백테스트 행렬 → ffill 한 (날짜, 종목 + 지수) float32 파일 (워커 공유용)"""
+    index_code = MARKETS[market]['index']
+    pm = price_matrix.shared(market, BACKTEST_DIR)
+    with pm.lock:
+        if index_code not in pm.col_of:
+            raise RuntimeError(f"❌ 백테스트 행렬이 없습니다. 먼저 'python backtest.py prepare {market}' 를 실행하세요.")
+        codes = [c for c in pm.tickers if c != index_code]
+        dates, prices, index, codes = pm.arrays(codes, index_code)
+
+    data_path, meta_path = _replay_paths(market)
+    out = np.memmap(data_path, dtype=np.float32, mode='w+', shape=(len(dates), len(codes) + 1))
+    out[:, :-1] = prices
+    out[:, -1] = index
+    out.flush()
+    del out
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({"dates": dates, "codes": codes}, f)
+    return data_path, (len(dates), len(codes) + 1)
+
+
+def load_replay(market):
+    data_path, meta_path = _replay_paths(market)
+    if not os.path.exists(meta_path):
+        data_path, _ = build_replay(market)
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    shape = (len(meta['dates']), len(meta['codes']) + 1)
+    return data_path, shape, meta
+
+
+def _init_worker(data_path, shape):
+    """워커 시작 시 한 번: 공유 파일을 읽기 전용 memmap 으로 열기"""
+    data = np.memmap(data_path, dtype=np.float32, mode='r', shape=shape)
+    _shared['prices'] = data[:, :-1]
+    _shared['index'] = np.asarray(data[:, -1], dtype=float)
+
+
+# =========================================================================
+# 재현 (한 설정)
+# =========================================================================
+def replay(prices, index, periods, schemes, freq, top_pct=TOP_PCT):
+    """
+    prices: (날짜, 종목) ffill 가격, index: (날짜,) 지수
+    periods / freq: 기간 세트, 리밸런싱 주기 / schemes: 가중치 방식 리스트
+    반환: 가중치 방식별 결과 dict 리스트
+    """
+    periods = np.asarray(periods, dtype=int)
+    n_days = prices.shape[0]
+    rows = np.arange(periods.max(), n_days - freq, freq)
+    if len(rows) < 2:
+        return []
+    weights = [scheme_weights(s, len(periods)) for s in schemes]
+    longest = int(np.argmax(periods))
+
+    avgs = [np.empty((len(rows), prices.shape[1])) for _ in schemes]
+    fwd = np.empty((len(rows), prices.shape[1]))
+    eligible = np.empty((len(rows), prices.shape[1]), dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for c0 in range(0, len(rows), CHUNK_ROWS):
+            r = rows[c0:c0 + CHUNK_ROWS]
+            p_now = np.asarray(prices[r], dtype=float)                                  # (R, 종목)
+            p_past = np.asarray(prices[r[:, None] - periods[None, :]], dtype=float)     # (R, 기간, 종목)
+            i_ret = index[r][:, None] / index[r[:, None] - periods[None, :]] - 1        # (R, 기간)
+            excess = p_now[:, None, :] / p_past - 1 - i_ret[:, :, None]
+            scores = rs_engine.to_score(rs_engine.pct_rank(excess))
+
+            f = np.asarray(prices[r + freq], dtype=float) / p_now - 1
+            ok = ~np.isnan(excess[:, longest, :]) & ~np.isnan(f)
+            fwd[c0:c0 + len(r)] = f
+            eligible[c0:c0 + len(r)] = ok
+            for w, avg in zip(weights, avgs):
+                a = np.round(np.nansum(scores * w[None, :, None], axis=1))
+                avg[c0:c0 + len(r)] = np.where(ok, a, np.nan)
+        index_fwd = index[rows + freq] / index[rows] - 1
+
+    out = []
+    for scheme, w, avg in zip(schemes, weights, avgs):
+        top = rs_engine.pct_rank(avg) > 1 - top_pct
+        stats = summarize(top, fwd, index_fwd, eligible, freq)
+        label = scheme if isinstance(scheme, str) else 'custom'
+        out.append(dict({"periods": periods.tolist(), "weights": label,
+                         "weight_values": np.round(w, 3).tolist(), "rebalance": freq}, **stats))
+    return out
+
+
+def summarize(top, fwd, index_fwd, eligible, freq):
+    """보유 행렬 (리밸런싱, 종목) → 성과 지표"""
+    n_hold = top.sum(axis=1)
+    port = np.where(n_hold > 0, np.where(top, fwd, 0.0).sum(axis=1) / np.maximum(n_hold, 1), 0.0)
+    universe = np.where(eligible, fwd, 0.0).sum(axis=1) / np.maximum(eligible.sum(axis=1), 1)
+    per_year = TRADING_DAYS / freq
+    n = len(port)
+
+    equity = np.cumprod(1 + port)
+    bench = np.cumprod(1 + index_fwd)
+    cagr = equity[-1] ** (per_year / n) - 1
+    bench_cagr = bench[-1] ** (per_year / n) - 1
+    vol = port.std() * np.sqrt(per_year)
+    drawdown = (equity / np.maximum.accumulate(equity) - 1).min()
+
+    held = n_hold[1:] > 0
+    kept = (top[1:] & top[:-1]).sum(axis=1)
+    turnover = float(np.mean(1 - kept[held] / n_hold[1:][held])) if held.any() else 0.0
+    members = top.sum()
+    return {
+        "rebalances": int(n),
+        "avg_holdings": round(float(n_hold.mean()), 1),
+        "period_return": round(float(port.mean()) * 100, 3),
+        "cagr": round(float(cagr) * 100, 2),
+        "index_cagr": round(float(bench_cagr) * 100, 2),
+        "excess_cagr": round(float(cagr - bench_cagr) * 100, 2),
+        "vs_universe": round(float((port - universe).mean()) * 100, 3),
+        "volatility": round(float(vol) * 100, 2),
+        "sharpe": round(float(port.mean() / port.std() * np.sqrt(per_year)), 2) if port.std() > 0 else None,
+        "max_drawdown": round(float(drawdown) * 100, 2),
+        "turnover": round(turnover * 100, 1),
+        "hit_rate": round(float((port > index_fwd).mean()) * 100, 1),
+        "member_hit_rate": round(float((top & (fwd > index_fwd[:, None])).sum() / members) * 100, 1) if members else None,
+    }
+
+
+def _run_task(task):
+    periods, freq, schemes = task
+    return replay(_shared['prices'], _shared['index'], periods, schemes, freq)
+
+
+# =========================================================================
+# 그리드 병렬 실행
+# =========================================================================
+def grid():
+    """(기간 세트, 리밸런싱 주기, 가중치 방식들) 작업 리스트 — 가중치는 한 작업 안에서 점수 재사용"""
+    return [(periods, freq, WEIGHT_SCHEMES) for periods in PERIOD_SETS for freq in REBALANCE_DAYS]
+
+
+def sweep(market, workers=None, tasks=None):
+    data_path, shape, meta = load_replay(market)
+    tasks = tasks or grid()
+    workers = workers or os.cpu_count() or 1
+    print(f"🧪 {market} 백테스트 {len(tasks)}개 작업 x 가중치 {len(WEIGHT_SCHEMES)}종 "
+          f"({shape[0]}일 x {shape[1] - 1}종목, {meta['dates'][0]} ~ {meta['dates'][-1]}, 워커 {workers})")
+
+    t0 = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_path, shape)) as ex:
+        for rows in ex.map(_run_task, tasks):
+            results.extend(rows)
+    elapsed = time.perf_counter() - t0
+
+    mod = MARKETS[market]['module']
+    for r in results:
+        r['current'] = (r['periods'] == list(mod.RS_PERIODS) and r['weights'] == 'flat')
+    results.sort(key=lambda r: -r['excess_cagr'])
+    save_results(market, meta, results, elapsed)
+    print_results(results, elapsed)
+    return results
+
+
+def save_results(market, meta, results, elapsed):
+    os.makedirs(RESULT_DIR, exist_ok=True)
+    stamp = datetime.now(kst).strftime('%Y%m%d_%H%M')
+    path = os.path.join(RESULT_DIR, f"{market}_{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"market": market, "start": meta['dates'][0], "end": meta['dates'][-1],
+                   "tickers": len(meta['codes']), "top_pct": TOP_PCT, "seconds": round(elapsed, 1),
+                   "results": results}, f, ensure_ascii=False, indent=1)
+    print(f"💾 결과 저장: {path}")
+
+
+def print_results(results, elapsed):
+    print(f"\n⏱️ {elapsed:.1f}s  (상위 {TOP_N_PRINT}개, 초과 CAGR 순 / * = 현재 설정)")
+    print(f"   {'기간':22} {'가중치':7} {'주기':>4} {'CAGR':>7} {'초과':>7} {'샤프':>5} "
+          f"{'MDD':>7} {'회전율':>6} {'적중률':>6}")
+    shown = results[:TOP_N_PRINT] + [r for r in results[TOP_N_PRINT:] if r['current']]
+    for r in shown:
+        mark = '*' if r['current'] else ' '
+        print(f" {mark} {','.join(map(str, r['periods'])):22} {r['weights']:7} {r['rebalance']:>4} "
+              f"{r['cagr']:>6.1f}% {r['excess_cagr']:>6.1f}% {r['sharpe'] or 0:>5.2f} "
+              f"{r['max_drawdown']:>6.1f}% {r['turnover']:>5.1f}% {r['hit_rate']:>5.1f}%")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[2] not in MARKETS:
+        sys.exit("사용법: python backtest.py [prepare|sweep|run] [kr|us] ...")
+    cmd, market = sys.argv[1], sys.argv[2]
+    if cmd == 'prepare':
+        prepare(market, float(sys.argv[3]) if len(sys.argv) > 3 else YEARS)
+    elif cmd == 'sweep':
+        sweep(market, int(sys.argv[3]) if len(sys.argv) > 3 else None)
+    elif cmd == 'run':
+        periods = [int(x) for x in sys.argv[3].split(',')]
+        weights = [float(x) for x in sys.argv[4].split(',')] if len(sys.argv) > 4 else 'flat'
+        freq = int(sys.argv[5]) if len(sys.argv) > 5 else 5
+        data_path, shape, meta = load_replay(market)
+        _init_worker(data_path, shape)
+        rows = replay(_shared['prices'], _shared['index'], periods, [weights], freq)
+        print(json.dumps(rows, ensure_ascii=False, indent=1))
+    else:
+        sys.exit(f"알 수 없는 명령: {cmd}")
@@ -0,0 +1,306 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+import numpy as np
+import pandas as pd
+import pytz
+import price_cache
+import rs_engine
+import rs_kr
+import news_index
+import firestore_sync
+import storage
+
+# =========================================================================
+# 오프라인 벤치마크 (네트워크 없이 단계별 시간 측정)
+# - 가격: .cache/prices 에 쌓인 실제 CSV 를 bench_fixtures/prices 로 기록해 재사용,
+#         없거나 종목 수가 모자라면 고정 시드로 합성
+# - 뉴스: news_kr.json / news_us.json 기사로 RSS XML 을 복원해서 bench_fixtures/rss 에 기록
+# - Firestore: storage.MemorySink 로 대체해서 기록 단계(해시 비교 + 큐 flush) 측정
+# - 결과: bench_results/<커밋>.json (커밋 간 비교용)
+#
+# 사용법
+#   python benchmark.py record                  # 현재 캐시/JSON 으로 픽스처 기록
+#   python benchmark.py run [70,500,2500] [반복]
+#   python benchmark.py compare A.json B.json
+# =========================================================================
+FIXTURE_DIR = 'bench_fixtures'
+RESULT_DIR = 'bench_results'
+UNIVERSES = [70, 500, 2500]
+REPEATS = 5
+N_DAYS = 480
+INDEX_TICKER = 'KS11'
+
+kst = pytz.timezone('Asia/Seoul')
+
+
+# =========================================================================
+# 픽스처 기록 / 생성
+# =========================================================================
+def _articles_to_rss(articles):
+    items = []
+    for a in articles:
+        dt = kst.localize(datetime.strptime(a['time'], '%Y-%m-%d %H:%M')).astimezone(timezone.utc)
+        items.append(
+            f"<item><title>{escape(a['title'])}</title><link>{escape(a['link'])}</link>"
+            f"<pubDate>{format_datetime(dt, usegmt=True)}</pubDate>"
+            f"<source url=\"https://news.google.com\">{escape(a['publisher'])}</source></item>")
+    return ("<?xml version=\"1.0\" encoding=\"UTF-8\"?><rss version=\"2.0\"><channel>"
+            + ''.join(items) + "</channel></rss>").encode('utf-8')
+
+
+def record():
+    """현재 가격 캐시와 뉴스 JSON 을 픽스처로 복사"""
+    price_dir = os.path.join(FIXTURE_DIR, 'prices')
+    rss_dir = os.path.join(FIXTURE_DIR, 'rss')
+    os.makedirs(price_dir, exist_ok=True)
+    os.makedirs(rss_dir, exist_ok=True)
+
+    n_prices = 0
+    if os.path.isdir(price_cache.PRICE_CACHE_DIR):
+        for fn in os.listdir(price_cache.PRICE_CACHE_DIR):
+            shutil.copy(os.path.join(price_cache.PRICE_CACHE_DIR, fn), price_dir)
+            n_prices += 1
+
+    n_rss = 0
+    for src in ('news_kr.json', 'news_us.json'):
+        if not os.path.exists(src):
+            continue
+        with open(src, 'r', encoding='utf-8') as f:
+            news = json.load(f)
+        for i, (key, entry) in enumerate(news.items()):
+            with open(os.path.join(rss_dir, f"{src[:-5]}_{i:03d}.xml"), 'wb') as f:
+                f.write(_articles_to_rss(entry['articles']))
+            n_rss += 1
+    print(f"✅ 픽스처 기록: 가격 {n_prices}개, RSS {n_rss}개 → {FIXTURE_DIR}/")
+
+
+def _synthetic_prices(n_tickers, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end='2025-12-31', periods=N_DAYS, name='Date')
+    drift = rng.normal(0.0003, 0.0005, n_tickers)
+    rets = rng.normal(drift, 0.02, (N_DAYS, n_tickers))
+    close = 10000 * np.exp(np.cumsum(rets, axis=0))
+    return pd.DataFrame(close, index=idx, columns=[f"{i:06d}" for i in range(n_tickers)])
+
+
+def prepare_prices(n_tickers, workdir):
+    """
+    n_tickers 종목의 가격 CSV 를 workdir 에 준비
+    - 기록된 실제 종목을 먼저 쓰고, 모자라면 합성 종목으로 채움
+    """
+    os.makedirs(workdir, exist_ok=True)
+    recorded = []
+    price_dir = os.path.join(FIXTURE_DIR, 'prices')
+    if os.path.isdir(price_dir):
+        recorded = sorted(fn for fn in os.listdir(price_dir) if fn.endswith('.csv'))
+
+    codes = []
+    for fn in recorded:
+        code = fn[:-4]
+        if code == INDEX_TICKER:
+            continue
+        if len(codes) >= n_tickers:
+            break
+        shutil.copy(os.path.join(price_dir, fn), workdir)
+        codes.append(code)
+
+    synth = _synthetic_prices(n_tickers - len(codes) + 1, seed=n_tickers)
+    if INDEX_TICKER + '.csv' in recorded:
+        shutil.copy(os.path.join(price_dir, INDEX_TICKER + '.csv'), workdir)
+    else:
+        synth.iloc[:, 0].rename('Close').to_frame().to_csv(os.path.join(workdir, f"{INDEX_TICKER}.csv"))
+    for code in synth.columns[1:]:
+        synth[code].rename('Close').to_frame().to_csv(os.path.join(workdir, f"{code}.csv"))
+        codes.append(code)
+    return codes[:n_tickers]
+
+
+def load_rss_fixtures():
+    rss_dir = os.path.join(FIXTURE_DIR, 'rss')
+    bodies = []
+    if os.path.isdir(rss_dir):
+        for fn in sorted(os.listdir(rss_dir)):
+            with open(os.path.join(rss_dir, fn), 'rb') as f:
+                bodies.append(f.read())
+    if not bodies:
+        base = datetime(2025, 12, 31, 9, 0)
+        for t in range(20):
+            arts = [{"title": f"종목{t} 기사 {i}", "link": f"https://news.google.com/rss/articles/{t}-{i}?oc=5",
+                     "publisher": "Bench", "time": (base - timedelta(minutes=17 * i)).strftime('%Y-%m-%d %H:%M')}
+                    for i in range(100)]
+            bodies.append(_articles_to_rss(arts))
+    return bodies
+
+
+# =========================================================================
+# 단계별 측정
+# =========================================================================
+def _timed(fn, repeats):
+    times = []
+    result = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return result, {'min_ms': round(min(times) * 1000, 3),
+                    'median_ms': round(statistics.median(times) * 1000, 3),
+                    'repeats': repeats}
+
+
+def bench_universe(n_tickers, repeats, tmp):
+    workdir = os.path.join(tmp, f"prices_{n_tickers}")
+    codes = prepare_prices(n_tickers, workdir)
+    stages = {}
+
+    # 1. 가격 로드 (캐시 CSV → 정렬된 종가 프레임)
+    old_dir = price_cache.PRICE_CACHE_DIR
+    price_cache.PRICE_CACHE_DIR = workdir
+    try:
+        def load():
+            close = price_cache.load_close_prices(codes, '1900-01-01', '2100-01-01').ffill()
+            index = price_cache.load_close_prices([INDEX_TICKER], '1900-01-01', '2100-01-01').iloc[:, 0]
+            return close, index.reindex(close.index).ffill()
+        (close, index), stages['price_load'] = _timed(load, repeats)
+    finally:
+        price_cache.PRICE_CACHE_DIR = old_dir
+
+    # 2. RS 계산 + 순위 리스트 생성
+    names = {c: c for c in codes}
+    rankings, stages['rs_compute'] = _timed(lambda: rs_kr.build_rankings(close, index, names), repeats)
+    stages['rs_engine_only'] = _timed(
+        lambda: rs_engine.compute_rs(close.to_numpy(), index.to_numpy(), rs_kr.RS_PERIODS, rs_kr.RS_WEIGHTS),
+        repeats)[1]
+
+    # 3. 뉴스 파싱 (종목당 RSS 1개, 빈 인덱스 기준)
+    bodies = load_rss_fixtures()
+    n_feeds = min(len(rankings), 120)
+
+    def parse():
+        out = {}
+        for i in range(n_feeds):
+            new = news_index.parse_new_items(bodies[i % len(bodies)], {})
+            out[f"{rankings[i]['code']}_{rankings[i]['name']}"] = {
+                "update_time": "2025-12-31 09:00",
+                "articles": news_index.merge_top(new, [], 20),
+            }
+        return out
+    news, stages['news_parse'] = _timed(parse, repeats)
+
+    # 4. payload 생성 + 기록 (처음 기록 / 변경 없음 재기록)
+    state_dir = os.path.join(tmp, f"sync_{n_tickers}")
+    old_state = firestore_sync.SYNC_STATE_DIR
+    firestore_sync.SYNC_STATE_DIR = state_dir
+    try:
+        def cold_write():
+            shutil.rmtree(state_dir, ignore_errors=True)
+            store = storage.WriteBehindQueue(storage.MemorySink(), flush_delay=0)
+            payload = {"update_time": "2025-12-31 09:00", "rankings": rankings}
+            b = firestore_sync.set_if_changed(store, 'rs_data', 'latest', payload)
+            stats = firestore_sync.sync_sharded(store, 'stock_news', 'news_kr', news, "2025-12-31 09:00")
+            store.flush()
+            return b + stats['bytes']
+        written, stages['write_cold'] = _timed(cold_write, repeats)
+        stages['write_cold']['bytes'] = written
+
+        store = storage.WriteBehindQueue(storage.MemorySink(), flush_delay=0)
+
+        def warm_write():
+            firestore_sync.sync_sharded(store, 'stock_news', 'news_kr', news, "2025-12-31 09:10")
+            store.flush()
+        stages['write_unchanged'] = _timed(warm_write, repeats)[1]
+    finally:
+        firestore_sync.SYNC_STATE_DIR = old_state
+
+    # 5. JSON 덤프 (기존 스크립트와 같은 indent=2)
+    dump_path = os.path.join(tmp, 'dump.json')
+
+    def dump():
+        with open(dump_path, 'w', encoding='utf-8') as f:
+            json.dump({"rankings": rankings, "news": news}, f, ensure_ascii=False, indent=2)
+        return os.path.getsize(dump_path)
+    size, stages['json_dump'] = _timed(dump, repeats)
+    stages['json_dump']['bytes'] = size
+
+    return {'tickers': len(codes), 'days': int(len(close)), 'stages': stages}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', '-C', os.path.dirname(os.path.abspath(__file__)),
+                                        'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def run(universes=UNIVERSES, repeats=REPEATS):
+    commit = _git_commit()
+    result = {
+        'commit': commit,
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'universes': {},
+    }
+    tmp = tempfile.mkdtemp(prefix='finance_bench_')
+    try:
+        for n in universes:
+            print(f"⏱️ {n}종목 측정 중...")
+            res = bench_universe(n, repeats, tmp)
+            result['universes'][str(n)] = res
+            for stage, r in res['stages'].items():
+                print(f"   {stage:16} {r['median_ms']:>10.2f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    os.makedirs(RESULT_DIR, exist_ok=True)
+    path = os.path.join(RESULT_DIR, f"{commit}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"✅ 결과 저장: {path}")
+    return result
+
+
+def compare(path_a, path_b):
+    """두 결과 파일의 단계별 중앙값 비교 (B / A)"""
+    with open(path_a) as f:
+        a = json.load(f)
+    with open(path_b) as f:
+        b = json.load(f)
+    print(f"{'universe':>8} {'stage':16} {a['commit']:>10} {b['commit']:>10}  ratio")
+    for n, ua in a['universes'].items():
+        ub = b['universes'].get(n)
+        if not ub:
+            continue
+        for stage, ra in ua['stages'].items():
+            rb = ub['stages'].get(stage)
+            if not rb:
+                continue
+            ratio = rb['median_ms'] / ra['median_ms'] if ra['median_ms'] else float('nan')
+            print(f"{n:>8} {stage:16} {ra['median_ms']:>10.2f} {rb['median_ms']:>10.2f}  {ratio:.2f}x")
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else 'run'
+    if cmd == 'record':
+        record()
+    elif cmd == 'run':
+        universes = [int(x) for x in sys.argv[2].split(',')] if len(sys.argv) > 2 else UNIVERSES
+        repeats = int(sys.argv[3]) if len(sys.argv) > 3 else REPEATS
+        run(universes, repeats)
+    elif cmd == 'compare':
+        compare(sys.argv[2], sys.argv[3])
+    else:
+        sys.exit("사용법: python benchmark.py [record|run|compare]")
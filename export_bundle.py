@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import hashlib
+from datetime import datetime
+import pytz
+import symbols
+import firestore_sync
+
+# =========================================================================
+# 프론트엔드용 정적 데이터 번들
+# - 보기(view)별 작은 파일: 순위표는 컬럼 배열, 뉴스는 종목별 파일
+# - 파일명에 내용 해시 → 내용이 같으면 같은 파일 (CDN 캐시 그대로 유지)
+#   뉴스 종목 파일은 매 사이클 바뀌는 update_time 을 빼고 기록 (manifest 항목에 따로) → 기사가 같으면 같은 파일
+# - 압축은 Firebase Hosting 이 전송 때 알아서 함 (미리 만든 .gz / .br 형제 파일은 서빙하지 않으므로 만들지 않음)
+# - manifest.json 이 보기 → 파일 경로/해시를 알려줌 (프론트는 manifest 만 짧게 캐시)
+# - 이번 사이클에 안 돈 스테이지의 보기는 이전 manifest 항목을 그대로 유지
+# =========================================================================
+BUNDLE_DIR = os.environ.get('BUNDLE_DIR', os.path.join('.cache', 'bundles', 'data'))
+MANIFEST_NAME = 'manifest.json'
+HASH_LEN = 10
+
+# 스테이지 결과 → 보기 이름
+STAGE_VIEWS = {
+    "finance": "market",
+    "rs_kr": "rs_kr",
+    "rs_us": "rs_us",
+    "rs_kr_live": "rs_kr",
+    "rs_us_live": "rs_us",
+    "news_kr": "news_kr",
+    "news_us": "news_us",
+}
+# 종목 메타데이터 보기 (코드 → 이름/시장/섹터, 컬럼 배열) — symbols 캐시에서 그대로
+SYMBOL_MARKETS = ('kr', 'us')
+# 단독 실행 시 읽을 로컬 산출물
+LOCAL_FILES = {
+    "finance": "market_data.json",
+    "rs_kr": "rs_kr.json",
+    "rs_us": "rs_us.json",
+    "news_kr": "news_kr.json",
+    "news_us": "news_us.json",
+}
+
+kst = pytz.timezone('Asia/Seoul')
+
+
+def compact(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def columnar(payload):
+    """
+    순위 payload → 컬럼 배열
+    {update_time, ..., rankings: [{rank, code, ...}, ...]} → {update_time, ..., columns: {rank: [...], code: [...]}}
+    """
+    rows = payload.get('rankings', [])
+    fields = []
+    for row in rows:
+        for k in row:
+            if k not in fields:
+                fields.append(k)
+    out = {k: v for k, v in payload.items() if k != 'rankings'}
+    out['columns'] = {f: [row.get(f) for row in rows] for f in fields}
+    return out
+
+
+def write_file(name, data):
+    """
+    내용 해시 파일명으로 기록 (이미 있으면 생략)
+    반환: (상대 경로, 해시, 바이트 수)
+    """
+    digest = hashlib.sha1(data).hexdigest()[:HASH_LEN]
+    stem, ext = os.path.splitext(name)
+    rel = f"{stem}.{digest}{ext}"
+    path = os.path.join(BUNDLE_DIR, rel)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+    return rel.replace(os.sep, '/'), digest, len(data)
+
+
+def export_view(view, payload):
+    """보기 하나를 파일로 → manifest 항목"""
+    if view.startswith('news_'):
+        tickers = {}
+        update_time = ''
+        for key, entry in payload.items():
+            code = key.split('_', 1)[0].replace('/', '_')
+            body = {k: v for k, v in entry.items() if k not in firestore_sync.HASH_EXCLUDE}
+            rel, digest, size = write_file(f"{view}/{code}.json", compact(body))
+            tickers[key] = {"path": rel, "hash": digest, "bytes": size,
+                            "update_time": entry.get('update_time', '')}
+            update_time = max(update_time, entry.get('update_time', ''))
+        return {"update_time": update_time, "tickers": tickers}
+
+    body = columnar(payload) if view.startswith('rs_') else payload
+    rel, digest, size = write_file(f"{view}.json", compact(body))
+    return {"update_time": payload.get('update_time', ''), "path": rel, "hash": digest, "bytes": size}
+
+
+def load_manifest():
+    try:
+        with open(os.path.join(BUNDLE_DIR, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {"views": {}}
+
+
+def _referenced(manifest):
+    paths = set()
+    for entry in manifest.get('views', {}).values():
+        if 'path' in entry:
+            paths.add(entry['path'])
+        for t in entry.get('tickers', {}).values():
+            paths.add(t['path'])
+    return paths
+
+
+def cleanup(keep):
+    """manifest 두 세대(현재 + 직전)가 참조하지 않는 파일 삭제 (예전에 만든 .gz / .br 도 같이 정리)"""
+    removed = 0
+    for root, _, files in os.walk(BUNDLE_DIR):
+        for fn in files:
+            rel = os.path.relpath(os.path.join(root, fn), BUNDLE_DIR).replace(os.sep, '/')
+            if rel == MANIFEST_NAME or rel in keep:
+                continue
+            os.remove(os.path.join(root, fn))
+            removed += 1
+    return removed
+
+
+def run(payloads):
+    """
+    payloads: {스테이지 이름: 결과 payload} (이번 사이클에 성공한 것만)
+    반환: 새 manifest
+    """
+    old = load_manifest()
+    manifest = {
+        "version": 1,
+        "generated": datetime.now(kst).strftime('%Y-%m-%d %H:%M'),
+        "views": dict(old.get('views', {})),
+    }
+    for stage, payload in payloads.items():
+        view = STAGE_VIEWS.get(stage)
+        if view and payload:
+            manifest['views'][view] = export_view(view, payload)
+    for market in SYMBOL_MARKETS:
+        body = symbols.export_view(market)
+        if body:
+            manifest['views'][f"symbols_{market}"] = export_view(f"symbols_{market}", body)
+
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    raw = json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8')
+    path = os.path.join(BUNDLE_DIR, MANIFEST_NAME)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(raw)
+    os.replace(path + '.tmp', path)
+
+    removed = cleanup(_referenced(manifest) | _referenced(old))
+    total = sum(e.get('bytes', 0) for e in manifest['views'].values())
+    total += sum(t['bytes'] for e in manifest['views'].values() for t in e.get('tickers', {}).values())
+    print(f"📦 데이터 번들 {len(payloads)}개 보기 갱신 (전체 {total / 1024:.1f} KB, 정리 {removed}개) → {BUNDLE_DIR}")
+    return manifest
+
+
+if __name__ == "__main__":
+    # 단독 실행: 로컬 JSON 산출물로 번들 생성
+    payloads = {}
+    for stage, fn in LOCAL_FILES.items():
+        if os.path.exists(fn):
+            with open(fn, 'r', encoding='utf-8') as f:
+                payloads[stage] = json.load(f)
+    if not payloads:
+        sys.exit("❌ 번들로 만들 로컬 데이터가 없습니다.")
+    run(payloads)
@@ -0,0 +1,233 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+import numpy as np
+import metrics
+
+# =========================================================================
+# 업스트림 요청 보호 (요청별 제한 시간 + 헤지 요청 + 소스별 차단기)
+# - 제한 시간: 요청마다 DEADLINE 초까지만 기다림 (멈춘 호출은 데몬 스레드에 버려 둠)
+# - 헤지: 소스별 최근 지연 시간의 p90 을 넘도록 응답이 없으면 같은 요청을 한 번 더 보내서
+#         먼저 끝나는 쪽 사용 (꼬리 지연 흡수)
+# - 차단기: 한 소스에서 성공 없이 서로 다른 키 BREAKER_FAILURES 개가 실패(시간 초과 포함)하면
+#           이번 사이클 동안 그 소스는 요청 없이 바로 실패 → 호출부는 캐시 값 사용
+#           (상장폐지 종목 하나가 재시도로 여러 번 실패해도 1개로 셈)
+# - stale: 캐시로 대체한 키를 기록 → 게시 payload 에 "stale": true 로 표시
+# - manager.py 가 사이클 시작마다 reset_cycle() (차단기 / stale 기록 초기화, 지연 기록은 유지)
+# =========================================================================
+DEADLINE = float(os.environ.get('FETCH_DEADLINE', '8'))      # 요청 1건 제한 시간 (헤지 포함)
+LISTING_HOST = 'krx-listing'   # 전 종목 시세표 / 상장사 리스트 (응답이 커서 제한 시간 따로)
+SOURCE_DEADLINES = {        # 소스별 제한 시간 (없으면 DEADLINE)
+    LISTING_HOST: 20.0,
+}
+HEDGE_PERCENTILE = 90
+HEDGE_MIN_SAMPLES = 20      # 이만큼 관측되기 전에는 HEDGE_DEFAULT 사용
+HEDGE_DEFAULT = 2.0
+HEDGE_FLOOR = 0.3           # 너무 이른 헤지로 요청이 2배가 되지 않도록 하한
+LATENCY_WINDOW = 200
+BREAKER_FAILURES = 5
+
+
+class SourceDown(Exception):
+    """차단기가 열린 소스 (이번 사이클 동안 요청하지 않음)"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """요청이 제한 시간 안에 끝나지 않음"""
+
+
+class _Source:
+    """소스별 지연 시간 창 + 마지막 성공 이후 실패한 키 + 차단 여부"""
+
+    def __init__(self):
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.failed = set()
+        self.open = False
+
+    def hedge_after(self):
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT
+        return max(HEDGE_FLOOR, float(np.percentile(self.latencies, HEDGE_PERCENTILE)))
+
+
+_sources = {}
+_stale = set()
+_lock = threading.Lock()
+
+
+def _source(host):
+    with _lock:
+        if host not in _sources:
+            _sources[host] = _Source()
+        return _sources[host]
+
+
+def reset_cycle():
+    """새 사이클: 차단기 닫고 stale 기록 비움 (지연 시간 창은 헤지 기준으로 계속 사용)"""
+    with _lock:
+        for src in _sources.values():
+            src.failed.clear()
+            src.open = False
+        _stale.clear()
+
+
+def is_open(host):
+    return _source(host).open
+
+
+def open_sources():
+    with _lock:
+        return sorted(h for h, s in _sources.items() if s.open)
+
+
+def check(host):
+    """차단기가 열려 있으면 SourceDown"""
+    if _source(host).open:
+        raise SourceDown(f"{host} 차단됨 (이번 사이클 건너뜀)")
+
+
+def record(host, seconds=None, ok=True, key=None):
+    """요청 결과 반영 (성공이면 지연 시간 기록, 실패한 키가 쌓이면 차단기 열기)"""
+    src = _source(host)
+    with _lock:
+        if ok:
+            src.failed.clear()
+            if seconds is not None:
+                src.latencies.append(seconds)
+            return
+        src.failed.add(key if key is not None else len(src.failed))
+        tripped = not src.open and len(src.failed) >= BREAKER_FAILURES
+        if tripped:
+            src.open = True
+    if tripped:
+        metrics.inc('breaker_open', host=host)
+        print(f"🔌 {host} {BREAKER_FAILURES}건 연속 실패 → 이번 사이클 동안 캐시 값 사용")
+
+
+def mark_stale(key):
+    """캐시 값으로 대체한 키 기록"""
+    with _lock:
+        _stale.add(str(key))
+    metrics.inc('stale_fallback', key=str(key))
+
+
+def is_stale(key):
+    with _lock:
+        return str(key) in _stale
+
+
+def stale(keys):
+    """keys 중 캐시로 대체된 것만"""
+    with _lock:
+        return {str(k) for k in keys} & _stale
+
+
+def _spawn(fn, args, kwargs):
+    """데몬 스레드에서 실행 (제한 시간을 넘겨 버려도 프로세스 종료를 막지 않음)"""
+    fut = Future()
+
+    def target():
+        try:
+            fut.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=target, name='fetch', daemon=True).start()
+    return fut
+
+
+def _deadline_error(host, key, deadline):
+    metrics.inc('fetch_deadline', host=host, key=key)
+    return DeadlineExceeded(f"{host} {key} {deadline:.0f}s 제한 시간 초과" if key else f"{host} {deadline:.0f}s 제한 시간 초과")
+
+
+def call(host, fn, *args, key=None, deadline=None, hedge=True, **kwargs):
+    """
+    fn(*args, **kwargs) 을 제한 시간 / 헤지 / 차단기 아래에서 실행
+    - 차단기가 열려 있으면 호출 없이 SourceDown
+    - 제한 시간 초과 시 DeadlineExceeded (실패 1회로 집계)
+    - hedge: 응답이 소스 p90 지연을 넘으면 같은 호출 1회 추가 (멱등 GET 전용)
+      첫 요청이 오류로 끝나면 헤지 없이 바로 예외 전달 (재시도는 호출부 정책)
+    """
+    check(host)
+    src = _source(host)
+    deadline = deadline or SOURCE_DEADLINES.get(host, DEADLINE)
+    t0 = time.monotonic()
+    end = t0 + deadline
+    pending = {_spawn(fn, args, kwargs)}
+    hedged = not hedge
+    error = None
+
+    while pending:
+        now = time.monotonic()
+        if now >= end:
+            break
+        timeout = end - now if hedged else min(end - now, max(0.0, t0 + src.hedge_after() - now))
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for fut in done:
+            try:
+                result = fut.result()
+            except Exception as e:
+                error = e
+                continue
+            record(host, time.monotonic() - t0)
+            return result
+        if not done and not hedged and time.monotonic() < end:
+            hedged = True
+            metrics.inc('fetch_hedges', host=host, key=key)
+            pending.add(_spawn(fn, args, kwargs))
+
+    record(host, ok=False, key=key)
+    if error is not None and not pending:
+        raise error
+    raise _deadline_error(host, key, deadline)
+
+
+async def call_async(host, make_coro, key=None, deadline=None, hedge=True):
+    """
+    비동기 버전 (aiohttp 피드 등)
+    - make_coro: 호출할 때마다 새 코루틴을 만드는 함수 (헤지 시 한 번 더 호출)
+    - 먼저 끝난 쪽 결과 사용, 나머지 작업은 취소
+    """
+    check(host)
+    src = _source(host)
+    deadline = deadline or SOURCE_DEADLINES.get(host, DEADLINE)
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    end = t0 + deadline
+    pending = {asyncio.ensure_future(make_coro())}
+    hedged = not hedge
+    error = None
+
+    try:
+        while pending:
+            now = loop.time()
+            if now >= end:
+                break
+            timeout = end - now if hedged else min(end - now, max(0.0, t0 + src.hedge_after() - now))
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                # 취소된 작업은 exception() 이 CancelledError 를 던지므로 먼저 확인 (실패 1회로 취급)
+                if task.cancelled():
+                    error = error or ConnectionError(f"{host} {key} 요청 취소됨" if key else f"{host} 요청 취소됨")
+                    continue
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                record(host, loop.time() - t0)
+                return task.result()
+            if not done and not hedged and loop.time() < end:
+                hedged = True
+                metrics.inc('fetch_hedges', host=host, key=key)
+                pending.add(asyncio.ensure_future(make_coro()))
+    finally:
+        for task in pending:
+            task.cancel()
+
+    record(host, ok=False, key=key)
+    if error is not None and not pending:
+        raise error
+    raise _deadline_error(host, key, deadline)
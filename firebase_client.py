@@ -0,0 +1,25 @@
+import os
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+# =========================================================================
+# 파이어베이스 인증 (프로세스당 한 번)
+# - 1순위: 현재 폴더(깃허브 액션), 2순위: 로컬 절대 경로
+# =========================================================================
+KEY_PATH = "serviceAccountKey.json"
+LOCAL_KEY_PATH = r"c:\Users\gwak\Finance_Final_V2\serviceAccountKey.json"
+
+_db = None
+
+
+def get_db():
+    """Firestore 클라이언트 (최초 호출 때만 인증)"""
+    global _db
+    if _db is not None:
+        return _db
+    if not firebase_admin._apps:
+        path = KEY_PATH if os.path.exists(KEY_PATH) else LOCAL_KEY_PATH
+        firebase_admin.initialize_app(credentials.Certificate(path))
+        print("✅ 파이어베이스 인증 성공")
+    _db = firestore.client()
+    return _db
@@ -0,0 +1,139 @@
+import os
+import json
+import hashlib
+import threading
+import metrics
+
+# =========================================================================
+# 변경분만 쓰는 Firestore 기록 계층
+# - 종목별 payload 를 내용 해시로 비교해서 바뀐 것만 기록
+# - 뉴스는 문서 하나에 몰지 않고 종목별 문서로 분할 (1 MiB 문서 한도 회피)
+#   stock_news/news_kr            → {update_time, count} (작은 메타 문서)
+#   stock_news/news_kr/tickers/*  → 종목별 {key, update_time, articles}
+# - 해시는 .cache/firestore/ 에 저장, 사이클마다 기록한 바이트 수 보고
+# - 실제 기록은 storage 큐(write-behind)에 넘김 → 배치 / 재시도는 storage 가 담당
+#   해시는 큐가 실제로 보낸 뒤(on_commit)에만 기록 → 전송 실패 / 보관 파일 유실 시 다음 사이클에 다시 씀
+# =========================================================================
+SYNC_STATE_DIR = os.path.join('.cache', 'firestore')
+HASH_EXCLUDE = ('update_time',)   # 해시 비교에서 빼는 필드 (매번 바뀌는 시각)
+
+_hash_lock = threading.Lock()
+
+
+def content_hash(payload):
+    body = {k: v for k, v in payload.items() if k not in HASH_EXCLUDE}
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def payload_bytes(payload):
+    """기록 크기 근사치 (JSON 인코딩 바이트)"""
+    return len(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def shard_id(key):
+    """Firestore 문서 ID 로 쓸 수 없는 '/' 치환"""
+    return key.replace('/', '_')
+
+
+def _state_path(name):
+    return os.path.join(SYNC_STATE_DIR, f"{name}.json")
+
+
+def load_hashes(name):
+    try:
+        with open(_state_path(name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_hashes(name, hashes):
+    os.makedirs(SYNC_STATE_DIR, exist_ok=True)
+    with open(_state_path(name) + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(hashes, f)
+    os.replace(_state_path(name) + '.tmp', _state_path(name))
+
+
+def _commit_hashes(committed):
+    """
+    큐가 배치를 보낸 뒤 해시 반영 — 큐 워커 스레드에서 배치마다 한 번 호출
+    - committed: [(name, key, h)] (h=None 이면 삭제된 문서), 해시 파일은 name 별로 한 번만 읽고 씀
+    """
+    by_name = {}
+    for name, key, h in committed:
+        by_name.setdefault(name, []).append((key, h))
+    with _hash_lock:
+        for name, pairs in by_name.items():
+            hashes = load_hashes(name)
+            for key, h in pairs:
+                if h is None:
+                    hashes.pop(key, None)
+                else:
+                    hashes[key] = h
+            save_hashes(name, hashes)
+
+
+def _on_commit(name, key, h):
+    """storage 큐의 on_commit 값 (같은 배치의 해시는 _commit_hashes 한 번으로 모아서 기록)"""
+    return (_commit_hashes, (name, key, h))
+
+
+def set_if_changed(store, collection, document, payload):
+    """
+    단일 문서: 내용이 같으면 기록 생략
+    - store: storage.WriteBehindQueue (또는 같은 set/delete 를 가진 객체)
+    반환: 기록한 바이트 수 (생략 시 0)
+    """
+    name = f"{collection}__{document}"
+    hashes = load_hashes(name)
+    h = content_hash(payload)
+    if hashes.get('_doc') == h:
+        return 0
+    store.set((collection, document), payload, on_commit=_on_commit(name, '_doc', h))
+    written = payload_bytes(payload)
+    metrics.inc('firestore_docs', 1, collection=collection)
+    metrics.inc('firestore_bytes', written, collection=collection)
+    return written
+
+
+def sync_sharded(store, collection, document, entries, update_time, keep=()):
+    """
+    entries({key: payload}) 를 collection/document/tickers/<key> 로 분할 기록
+    - 해시가 바뀐 종목만 set, 사라진 종목은 delete
+    - keep: 이번 사이클 대상이지만 entries 에 없는 키 (수집 실패) → 지우지 않고 지난 문서 유지
+    반환 dict: written / deleted / unchanged / bytes
+    """
+    name = f"{collection}__{document}"
+    old_hashes = load_hashes(name)
+    parent = (collection, document)
+
+    ops = []
+    stats = {'written': 0, 'deleted': 0, 'unchanged': 0, 'bytes': 0}
+    for key, payload in entries.items():
+        doc = dict(payload, key=key)
+        h = content_hash(doc)
+        if old_hashes.get(key) == h:
+            stats['unchanged'] += 1
+            continue
+        ops.append(('set', parent + ('tickers', shard_id(key)), doc, _on_commit(name, key, h)))
+        stats['written'] += 1
+        stats['bytes'] += payload_bytes(doc)
+
+    keep = set(keep) & set(old_hashes)
+    for key in old_hashes:
+        if key not in entries and key not in keep:
+            ops.append(('delete', parent + ('tickers', shard_id(key)), None, _on_commit(name, key, None)))
+            stats['deleted'] += 1
+
+    if ops:
+        meta = {'update_time': update_time, 'count': len(set(entries) | keep)}
+        ops.append(('set', parent, meta, None))
+        stats['bytes'] += payload_bytes(meta)
+
+    for op, path, doc, on_commit in ops:
+        store.put(op, path, doc, on_commit=on_commit)
+
+    metrics.inc('firestore_docs', len(ops), collection=collection)
+    metrics.inc('firestore_bytes', stats['bytes'], collection=collection)
+    return stats
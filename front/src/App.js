@@ -1,6 +1,7 @@
 import React, {useEffect, useState} from 'react';
 import { db} from'./firebaseConfig';
-import { doc, onSnapshot} from "firebase/firestore";
+import { doc, collection, onSnapshot} from "firebase/firestore";
+import { loadManifest, loadView, loadNews } from './dataBundle';
 
 import KRGraph from './components/kr/KRGraph';
 import KRTable from './components/kr/KRTable';
@@ -12,6 +13,8 @@ import GlobalFinance from './components/finance/GlobalFinance';
 
 import './App.css';
 
+const BUNDLE_POLL_MS = 60 * 1000; // manifest 확인 주기
+
 function App() {
   const [krRank, setKrRank] = useState([]);
   const [usRank, setUsRank] = useState([]);
@@ -24,12 +27,43 @@ function App() {
   const[activeSubMenu, setActiveSubMenu] = useState('NEWS');
 
   useEffect(() => {
-    onSnapshot(doc(db, 'market_data', 'global_indices'), (d) => setGlobalFinance(d.data() || {bonds:{}, items:[]}));
-    onSnapshot(doc(db, 'stock_news', 'news_kr'), (d) => setKrNews(d.data() || {}));
-    onSnapshot(doc(db, 'stock_news', 'news_us'), (d) => setUsNews(d.data() || {}));
-    onSnapshot(doc(db, 'rs_data', 'latest'), (d) => setKrRank(d.data()?.rankings || []));
-    onSnapshot(doc(db, 'rs_data', 'us_latest'), (d) => setUsRank(d.data()?.rankings || []));
-    
+    // 파이어베이스 실시간 구독 (정적 번들을 못 받을 때 대체 경로)
+    const subscribeFirestore = () => {
+      onSnapshot(doc(db, 'market_data', 'global_indices'), (d) => setGlobalFinance(d.data() || {bonds:{}, items:[]}));
+      // 뉴스는 종목별 문서로 분할 저장 → 바뀐 종목 문서만 다시 내려받음
+      const toNewsMap = (snap) => {
+        const map = {};
+        snap.forEach((d) => { const { key, ...rest } = d.data(); map[key || d.id] = rest; });
+        return map;
+      };
+      onSnapshot(collection(db, 'stock_news', 'news_kr', 'tickers'), (s) => setKrNews(toNewsMap(s)));
+      onSnapshot(collection(db, 'stock_news', 'news_us', 'tickers'), (s) => setUsNews(toNewsMap(s)));
+      onSnapshot(doc(db, 'rs_data', 'latest'), (d) => setKrRank(d.data()?.rankings || []));
+      onSnapshot(doc(db, 'rs_data', 'us_latest'), (d) => setUsRank(d.data()?.rankings || []));
+    };
+
+    // 정적 번들: manifest 만 주기적으로 확인하고 바뀐 파일만 받음
+    let lastGenerated = null;
+    let timer = null;
+    const refresh = async () => {
+      const manifest = await loadManifest();
+      if (manifest.generated === lastGenerated) return;
+      lastGenerated = manifest.generated;
+      const [market, kr, us, krNewsMap, usNewsMap] = await Promise.all([
+        loadView(manifest, 'market'), loadView(manifest, 'rs_kr'), loadView(manifest, 'rs_us'),
+        loadNews(manifest, 'news_kr'), loadNews(manifest, 'news_us'),
+      ]);
+      if (market) setGlobalFinance(market);
+      if (kr) setKrRank(kr.rankings);
+      if (us) setUsRank(us.rankings);
+      setKrNews(krNewsMap);
+      setUsNews(usNewsMap);
+    };
+
+    refresh()
+      .then(() => { timer = setInterval(() => refresh().catch(() => {}), BUNDLE_POLL_MS); })
+      .catch(subscribeFirestore);
+    return () => clearInterval(timer);
   },[])
 
     return (  
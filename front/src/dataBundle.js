@@ -0,0 +1,49 @@
+// 정적 데이터 번들 로더 (export_bundle.py 가 만든 /data/manifest.json 기준)
+// - manifest 만 매번 새로 받고, 나머지는 내용 해시 파일명이라 바뀐 것만 새로 받음
+// - 순위표 / 종목 메타데이터(symbols_*)는 컬럼 배열 → 행 배열로 복원
+// - 뉴스 종목 파일에는 update_time 이 없음 (manifest 항목에서 다시 붙임)
+const BASE = `${process.env.PUBLIC_URL || ''}/data`;
+const fileCache = new Map(); // 경로 → 파싱된 JSON (같은 해시면 다시 안 받음)
+
+const getJson = async (path) => {
+  if (fileCache.has(path)) return fileCache.get(path);
+  const res = await fetch(`${BASE}/${path}`);
+  if (!res.ok) throw new Error(`${path}: ${res.status}`);
+  const data = await res.json();
+  fileCache.set(path, data);
+  return data;
+};
+
+export const loadManifest = async () => {
+  const res = await fetch(`${BASE}/manifest.json`, { cache: 'no-cache' });
+  if (!res.ok) throw new Error(`manifest: ${res.status}`);
+  return res.json();
+};
+
+export const fromColumns = ({ columns = {}, ...rest }) => {
+  const fields = Object.keys(columns);
+  const n = fields.length ? columns[fields[0]].length : 0;
+  const rankings = Array.from({ length: n }, (_, i) => {
+    const row = {};
+    fields.forEach((f) => { row[f] = columns[f][i]; });
+    return row;
+  });
+  return { ...rest, rankings };
+};
+
+export const loadView = async (manifest, view) => {
+  const entry = manifest.views?.[view];
+  if (!entry) return null;
+  const data = await getJson(entry.path);
+  if (view.startsWith('symbols_')) return fromColumns(data).rankings;
+  return view.startsWith('rs_') ? fromColumns(data) : data;
+};
+
+export const loadNews = async (manifest, view) => {
+  const tickers = manifest.views?.[view]?.tickers || {};
+  const keys = Object.keys(tickers);
+  const entries = await Promise.all(keys.map((k) => getJson(tickers[k].path)));
+  const map = {};
+  keys.forEach((k, i) => { map[k] = { ...entries[i], update_time: tickers[k].update_time }; });
+  return map;
+};
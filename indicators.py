@@ -0,0 +1,267 @@
+import os
+import json
+import math
+from collections import deque
+from datetime import timedelta
+import price_cache
+import market_calendar
+
+# =========================================================================
+# 스트리밍 기술 지표 (EMA 20/50/200, RSI, ATR, 52주 고점 대비, 거래량 급증)
+# - 종목별 상태만 들고 있다가 새 봉이 오면 봉 1개씩 O(1) 갱신 (전체 히스토리 재계산 없음)
+#   · EMA / RSI / ATR: 직전 값 + 새 봉 (RSI, ATR 은 Wilder 평활)
+#   · 52주 고점: 단조 감소 덱 (윈도우 최고가가 항상 맨 앞)
+#   · 거래량 급증: 최근 50봉 링버퍼 + 누적합 (오늘 거래량 / 직전 50봉 평균)
+# - 확정 봉(폐장한 세션)만 상태에 반영해서 .cache/indicators/<market>.json 에 저장
+#   장중 미확정 봉은 상태 복사본에 임시로 반영해서 값만 계산 (저장 안 함)
+# =========================================================================
+INDICATOR_DIR = os.path.join('.cache', 'indicators')
+STATE_VERSION = 1
+EMA_SPANS = (20, 50, 200)
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+HIGH_WINDOW = 252      # 52주 ≈ 252 거래일
+VOLUME_WINDOW = 50
+
+
+def _num(v):
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(v) else v
+
+
+def new_state():
+    return {
+        "last": None,            # 마지막 확정 봉 날짜
+        "n": 0,                  # 반영한 봉 수
+        "close": None,
+        "ema": {str(s): None for s in EMA_SPANS},
+        "gain": 0.0, "loss": 0.0,
+        "atr": 0.0,
+        "highs": deque(),        # [봉 번호, 고가] 단조 감소
+        "vols": deque(),         # 최근 VOLUME_WINDOW 봉 거래량
+        "vol_sum": 0.0,
+        "vol_ratio": None,       # 이번 봉 거래량 / 직전 평균
+    }
+
+
+def copy_state(st):
+    out = dict(st)
+    out['ema'] = dict(st['ema'])
+    out['highs'] = deque(st['highs'])
+    out['vols'] = deque(st['vols'])
+    return out
+
+
+def step(st, date, high, low, close, volume):
+    """봉 1개 반영 (상태를 직접 갱신). 종가가 없으면 무시"""
+    close = _num(close)
+    if close is None:
+        return st
+    high = _num(high) or close
+    low = _num(low) or close
+    volume = _num(volume)
+    n, prev = st['n'], st['close']
+
+    for span in EMA_SPANS:
+        k = str(span)
+        e = st['ema'][k]
+        st['ema'][k] = close if e is None else e + 2.0 / (span + 1) * (close - e)
+
+    # RSI: 처음 RSI_PERIOD 개 변화는 단순 평균, 이후 Wilder 평활
+    if prev is not None:
+        diff = close - prev
+        gain, loss = max(diff, 0.0), max(-diff, 0.0)
+        if n <= RSI_PERIOD:
+            st['gain'] += gain / RSI_PERIOD
+            st['loss'] += loss / RSI_PERIOD
+        else:
+            st['gain'] += (gain - st['gain']) / RSI_PERIOD
+            st['loss'] += (loss - st['loss']) / RSI_PERIOD
+        tr = max(high - low, abs(high - prev), abs(low - prev))
+    else:
+        tr = high - low
+
+    # ATR: 처음 ATR_PERIOD 개 TR 은 단순 평균, 이후 Wilder 평활
+    if n < ATR_PERIOD:
+        st['atr'] += tr / ATR_PERIOD
+    else:
+        st['atr'] += (tr - st['atr']) / ATR_PERIOD
+
+    # 52주 고점: 새 고가보다 낮은 값은 뒤에서 버리고, 윈도우 밖은 앞에서 버림
+    highs = st['highs']
+    while highs and highs[-1][1] <= high:
+        highs.pop()
+    highs.append([n, high])
+    while highs[0][0] <= n - HIGH_WINDOW:
+        highs.popleft()
+
+    # 거래량 급증: 직전 평균과 먼저 비교한 뒤 링버퍼에 넣음
+    if volume is not None:
+        vols = st['vols']
+        st['vol_ratio'] = (volume / (st['vol_sum'] / len(vols))
+                           if len(vols) == VOLUME_WINDOW and st['vol_sum'] > 0 else None)
+        if len(vols) == VOLUME_WINDOW:
+            st['vol_sum'] -= vols.popleft()
+        vols.append(volume)
+        st['vol_sum'] += volume
+
+    st['n'], st['close'], st['last'] = n + 1, close, date
+    return st
+
+
+def fields(st):
+    """게시용 지표 값 (워밍업이 안 끝난 지표는 None)"""
+    n, close = st['n'], st['close']
+    out = {}
+    for span in EMA_SPANS:
+        e = st['ema'][str(span)]
+        out[f"ema_{span}"] = round(e, 2) if e is not None and n >= span else None
+    if n > RSI_PERIOD:
+        gain, loss = st['gain'], st['loss']
+        out['rsi'] = round(100.0 if loss == 0 else 100 - 100 / (1 + gain / loss), 1)
+    else:
+        out['rsi'] = None
+    out['atr'] = round(st['atr'], 2) if n >= ATR_PERIOD else None
+    out['high_52w_dist'] = (round((close / st['highs'][0][1] - 1) * 100, 2)
+                            if st['highs'] and st['highs'][0][1] > 0 else None)
+    out['vol_surge'] = round(st['vol_ratio'], 2) if st['vol_ratio'] is not None else None
+    return out
+
+
+# =========================================================================
+# 상태 파일
+# =========================================================================
+def _state_path(market):
+    return os.path.join(INDICATOR_DIR, f"{market}.json")
+
+
+def load_states(market):
+    try:
+        with open(_state_path(market), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception:
+        return {}
+    if data.get('version') != STATE_VERSION:
+        return {}
+    states = data.get('states', {})
+    for st in states.values():
+        st['highs'] = deque(st['highs'])
+        st['vols'] = deque(st['vols'])
+    return states
+
+
+def save_states(market, states):
+    os.makedirs(INDICATOR_DIR, exist_ok=True)
+    out = {code: dict(st, highs=list(st['highs']), vols=list(st['vols'])) for code, st in states.items()}
+    path = _state_path(market)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({"version": STATE_VERSION, "states": out}, f, separators=(',', ':'))
+    os.replace(path + '.tmp', path)
+
+
+# =========================================================================
+# 갱신
+# =========================================================================
+def bars_from_frame(df, date):
+    """
+    전 종목 시세표(종목코드 인덱스, High/Low/Close/Volume 컬럼) → {종목: (날짜, 고, 저, 종, 거래량)}
+    - KRX 벌크 시세표처럼 이미 받아 둔 당일 봉을 그대로 넘길 때 사용 (캐시 파일 안 읽음)
+    """
+    cols = [c if c in df.columns else 'Close' for c in ('High', 'Low', 'Close')]
+    vol = df['Volume'] if 'Volume' in df.columns else None
+    out = {}
+    for code, h, l, c, v in zip(df.index, df[cols[0]], df[cols[1]], df[cols[2]],
+                                vol if vol is not None else [None] * len(df)):
+        out[str(code)] = (date, h, l, c, v)
+    return out
+
+
+def session_date(market, now):
+    """오늘 세션이 이미 시작했으면 오늘 날짜 문자열, 아니면 None (시세표 봉을 당일 봉으로 볼 수 있는지)"""
+    local = market_calendar.local_now(market, now)
+    if not market_calendar.is_trading_day(market, local.date()):
+        return None
+    open_dt, _ = market_calendar.session_bounds(market, local.date())
+    return local.strftime('%Y-%m-%d') if local >= open_dt else None
+
+
+def _prev_trading_day(market, d):
+    day = d - timedelta(days=1)
+    for _ in range(15):
+        if market_calendar.is_trading_day(market, day):
+            return day.strftime('%Y-%m-%d')
+        day -= timedelta(days=1)
+    return None
+
+
+def _frame_bars(df, after):
+    """캐시 OHLCV → after 이후 봉 (날짜, 고, 저, 종, 거래량) 리스트"""
+    if after is not None:
+        df = df[df.index > after]
+    sub = df.reindex(columns=['High', 'Low', 'Close', 'Volume'])
+    return list(zip(df.index.strftime('%Y-%m-%d'), *(sub[c].to_numpy() for c in sub.columns)))
+
+
+def update(market, codes, now, bars=None):
+    """
+    종목별 지표 갱신
+    - 확정 봉: 마지막 폐장 세션까지 (market_calendar 기준) → 상태에 반영 후 저장
+    - 미확정 봉: bars 로 넘긴 당일 봉 또는 캐시 마지막 봉 → 값 계산에만 사용
+    - 상태가 최신이고 bars 에 봉이 있으면 캐시 파일을 읽지 않음
+    반환: {종목: 지표 dict}
+    """
+    bars = bars or {}
+    close_dt = market_calendar.last_session_close(market, now)
+    final = close_dt.strftime('%Y-%m-%d') if close_dt else '0000-00-00'
+    prev_final = _prev_trading_day(market, close_dt.date()) if close_dt else None
+    states = load_states(market)
+    changed = False
+    out = {}
+
+    for code in codes:
+        st = states.get(code)
+        last = st['last'] if st else None
+        bar = bars.get(code)
+        provisional = None
+
+        if bar is not None and last is not None and (
+                (bar[0] > final and last == final) or (bar[0] == final and last in (final, prev_final))):
+            # 빠른 경로: 당일 봉 1개만 반영
+            if bar[0] > final:
+                provisional = bar
+            elif last != final:
+                step(st, *bar)
+                changed = True
+        else:
+            if bar is None:
+                cached_last = price_cache.last_cached_date(code)
+                if cached_last is None:
+                    continue
+                need_read = last is None or cached_last.strftime('%Y-%m-%d') > last
+            else:
+                need_read = True
+            if need_read:
+                df = price_cache.load_cached(code)
+                if df is None:
+                    continue
+                st = st or new_state()
+                for row in _frame_bars(df, last):
+                    if row[0] <= final:
+                        step(st, *row)
+                        changed = True
+                    else:
+                        provisional = row
+                states[code] = st
+                if bar is not None and bar[0] > final:
+                    provisional = bar
+            if st is None:
+                continue
+
+        out[code] = fields(step(copy_state(st), *provisional) if provisional else st)
+
+    if changed:
+        save_states(market, states)
+    return out
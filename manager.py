@@ -1,48 +1,256 @@
-import subprocess
 import time
 import os
 import sys
+import json
+import threading
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from datetime import datetime
+import pytz
+import market_calendar
+import metrics
+import fetch_guard
+import storage
+import export_bundle
+import finance
+import rs_kr
+import rs_us
+import news_kr
+import news_us
 
 # 설정
-scripts = ["finance.py", "news_kr.py", "news_us.py", "rs_kr.py", "rs_us.py"]
-RESTART_INTERVAL = 600  # 10분 (600초) 대기 후 재실행
+STATE_PATH = os.path.join('.cache', 'scheduler_state.json')
+TICK_INTERVAL = 60  # 1분마다 실행할 작업이 있는지 확인
+# 주기 판정 여유 (초): last_run 은 실제 시작 시각이라 크론 지연이 조금만 있어도
+# 다음 틱의 경과 시간이 주기보다 살짝 모자람 → 여유 없이는 20분 작업이 40분마다 돎
+GRACE = 120
 
-def run_invest_cycle():
-    print(f"\n✨ [{time.strftime('%H:%M:%S')}] 새로운 데이터 수집 사이클을 시작합니다.")
-    processes = []
+# 스테이지별 실행 주기 (초) 및 의존 관계
+# - market: 기준 시장 (None 이면 한국/미국 중 하나라도 열려 있을 때 '장중')
+# - open: 장중 주기 / closed: 장외 주기 (None 이면 장 마감 후 1회만 실행)
+# - after: 먼저 끝나야 하는 스테이지 (결과의 rankings 를 메모리로 넘겨받음)
+# - timeout: 스테이지별 제한 시간 (초과 시 결과 버리고 후속 스테이지 건너뜀)
+# - session_only: 장중에만 실행 (장 마감 후 1회 실행도 없음)
+JOBS = {
+    "finance": {"market": None, "open": 300, "closed": 1800, "after": [], "timeout": 120},
+    "rs_kr": {"market": "kr", "open": 1200, "closed": None, "after": [], "timeout": 240},
+    "rs_us": {"market": "us", "open": 1200, "closed": None, "after": [], "timeout": 180},
+    "news_kr": {"market": "kr", "open": 1200, "closed": 3600, "after": ["rs_kr"], "timeout": 180},
+    "news_us": {"market": "us", "open": 1200, "closed": 3600, "after": ["rs_us"], "timeout": 180},
+}
+# 장중 증분 RS (현재가만으로 1분 단위 갱신, 상주 모드에서 RS_LIVE=1 일 때만)
+LIVE_INTERVAL = int(os.environ.get('RS_LIVE_INTERVAL', '60'))
+if os.environ.get('RS_LIVE') == '1':
+    JOBS["rs_kr_live"] = {"market": "kr", "open": LIVE_INTERVAL, "closed": None, "after": [], "timeout": 45, "session_only": True}
+    JOBS["rs_us_live"] = {"market": "us", "open": LIVE_INTERVAL, "closed": None, "after": [], "timeout": 45, "session_only": True}
 
-    # 1. 모든 일꾼 투입
-    for script in scripts:
-        if os.path.exists(script):
-            try:
-                # 넉넉한 처리를 위해 프로세스 실행
-                p = subprocess.Popen([sys.executable, script])
-                processes.append((script, p))
-                print(f"✅ {script} 가동 시작")
-                time.sleep(5)  # 서버 부하 방지를 위해 실행 간격을 5초로 늘림
-            except Exception as e:
-                print(f"❌ {script} 실행 에러: {e}")
-        else:
-            print(f"⚠️ 파일 없음: {script}")
-
-    # 2. 모든 일꾼이 일을 끝낼 때까지 대기 (동기화)
-    print("⏳ 모든 작업이 완료될 때까지 기다리는 중...")
-    for name, p in processes:
+STAGE_FUNCS = {
+    "finance": finance.run,
+    "rs_kr": rs_kr.run,
+    "rs_us": rs_us.run,
+    "news_kr": news_kr.run,
+    "news_us": news_us.run,
+    "rs_kr_live": rs_kr.run_live,
+    "rs_us_live": rs_us.run_live,
+}
+
+# 스테이지 결과 (프로세스가 살아 있는 동안 다음 사이클에도 재사용)
+_results = {}
+# 스테이지별 마지막 실행 스레드 (제한 시간을 넘겨 버린 스레드가 아직 살아 있으면 같은 스테이지를 또 띄우지 않음)
+_threads = {}
+
+
+def load_state():
+    try:
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    with open(STATE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+
+def market_open(market, now):
+    if market is None:
+        return any(market_calendar.is_open(m, now) for m in market_calendar.MARKETS)
+    return market_calendar.is_open(market, now)
+
+
+def _elapsed_enough(elapsed, interval):
+    """주기 경과 여부 (짧은 주기는 주기의 1/4 까지만 봐줌)"""
+    return elapsed >= interval - min(GRACE, interval / 4)
+
+
+def is_due(name, job, state, now):
+    """지금 실행해야 하는 작업인지 판단"""
+    last = state.get(name, {}).get('last_run', 0)
+    elapsed = now.timestamp() - last
+
+    if market_open(job['market'], now):
+        return _elapsed_enough(elapsed, job['open'])
+    if job.get('session_only'):
+        return False
+    if job['closed'] is None:
+        # 장 마감 후 1회: 마지막 세션 폐장 이후 아직 안 돌았으면 실행
+        close_dt = market_calendar.last_session_close(job['market'], now)
+        return close_dt is not None and last < close_dt.timestamp()
+    return _elapsed_enough(elapsed, job['closed'])
+
+
+def _call_stage(name, store, cancel):
+    """선행 스테이지 결과(rankings)를 메모리로 넘겨서 스테이지 실행"""
+    kwargs = {}
+    for dep in JOBS[name]['after']:
+        if _results.get(dep):
+            kwargs['rankings'] = _results[dep].get('rankings')
+    return STAGE_FUNCS[name](store=store, cancel=cancel, **kwargs)
+
+
+def _start_stage(name, store, cancel):
+    """
+    데몬 스레드로 스테이지 시작 (시간 초과 시 버려도 프로세스 종료를 막지 않음)
+    - cancel: 제한 시간 초과 시 세우는 Event (스테이지는 기록 / 게시 직전마다 확인)
+    """
+    fut = Future()
+
+    def target():
+        metrics.set_stage(name)
         try:
-            p.wait(timeout=300) # 각 스크립트당 최대 5분 대기
-            print(f"🏁 {name} 작업 완료")
-        except subprocess.TimeoutExpired:
-            print(f"🚨 {name} 응답 시간 초과! 강제 종료합니다.")
-            p.kill()
+            fut.set_result(_call_stage(name, store, cancel))
+        except BaseException as e:
+            fut.set_exception(e)
+
+    thread = threading.Thread(target=target, name=f"stage-{name}", daemon=True)
+    _threads[name] = thread
+    thread.start()
+    return fut
 
-    print(f"😴 사이클 종료. {RESTART_INTERVAL // 60}분간 휴식 후 다시 시작합니다.")
-    time.sleep(RESTART_INTERVAL)
 
-# 무한 루프 감시
+def _still_running(name):
+    """지난 사이클에 버린 같은 스테이지 스레드가 아직 도는 중인지"""
+    thread = _threads.get(name)
+    return thread is not None and thread.is_alive()
+
+
+def run_stages(names, state, store):
+    """
+    의존 관계(DAG) 순서로 스테이지 실행
+    - 선행 스테이지가 없는 것끼리는 병렬 (한국/미국 동시 진행)
+    - 이번 사이클에 같이 실행되는 선행 스테이지만 기다림
+    - 지난 사이클에 제한 시간을 넘긴 스레드가 아직 살아 있으면 그 스테이지는 이번에 건너뜀
+      (last_run 을 남기지 않으므로 다음 틱에 다시 시도)
+    """
+    pending = list(names)
+    running = {}
+    done, failed = set(), set()
+
+    while pending or running:
+        # 1. 실행 가능한 스테이지 투입
+        for name in list(pending):
+            deps = [d for d in JOBS[name]['after'] if d in names]
+            if any(d in failed for d in deps):
+                pending.remove(name)
+                failed.add(name)
+                print(f"⏭️ {name} 건너뜀 (선행 스테이지 실패)")
+            elif _still_running(name):
+                pending.remove(name)
+                failed.add(name)
+                print(f"⏳ {name} 건너뜀 (이전 실행이 아직 끝나지 않음)")
+            elif all(d in done for d in deps):
+                pending.remove(name)
+                cancel = threading.Event()
+                running[_start_stage(name, store, cancel)] = (name, time.monotonic() + JOBS[name]['timeout'],
+                                                              time.monotonic(), cancel)
+                state.setdefault(name, {})['last_run'] = time.time()
+                print(f"✅ {name} 가동 시작")
+        if not running:
+            break
+
+        # 2. 하나라도 끝나거나 가장 가까운 제한 시간까지 대기
+        next_deadline = min(deadline for _, deadline, _, _ in running.values())
+        finished, _ = wait(list(running), timeout=max(0, next_deadline - time.monotonic()),
+                           return_when=FIRST_COMPLETED)
+        for fut in finished:
+            name, _, started, _ = running.pop(fut)
+            try:
+                _results[name] = fut.result()
+                done.add(name)
+                metrics.observe('stage_seconds', time.monotonic() - started, stage=name, status='ok')
+                print(f"🏁 {name} 작업 완료 ({time.monotonic() - started:.1f}s)")
+            except BaseException as e:
+                failed.add(name)
+                metrics.observe('stage_seconds', time.monotonic() - started, stage=name, status='error')
+                print(f"❌ {name} 실행 에러: {e}")
+
+        # 3. 제한 시간 초과 스테이지는 결과를 버리고 이후 기록도 막음
+        now = time.monotonic()
+        for fut, (name, deadline, started, cancel) in list(running.items()):
+            if now >= deadline:
+                running.pop(fut)
+                cancel.set()
+                failed.add(name)
+                metrics.observe('stage_seconds', now - started, stage=name, status='timeout')
+                print(f"🚨 {name} 응답 시간 초과! 결과를 버리고 진행합니다.")
+
+    save_state(state)
+    return done
+
+
+def run_invest_cycle(store):
+    """실행 시점이 된 스테이지만 골라서 한 번 실행"""
+    now = datetime.now(pytz.utc)
+    state = load_state()
+    due = [s for s, job in JOBS.items() if is_due(s, job, state, now)]
+    kr = "장중" if market_calendar.is_open('kr', now) else "장외"
+    us = "장중" if market_calendar.is_open('us', now) else "장외"
+
+    if not due:
+        print(f"😴 [{time.strftime('%H:%M:%S')}] 실행할 작업 없음 (KRX {kr} / NYSE {us})")
+        return
+    print(f"\n✨ [{time.strftime('%H:%M:%S')}] 작업 실행: {', '.join(due)} (KRX {kr} / NYSE {us})")
+    # 차단기 / stale 기록은 사이클 단위 (지난 사이클에 죽었던 소스도 다시 시도)
+    fetch_guard.reset_cycle()
+    done = run_stages(due, state, store)
+    down = fetch_guard.open_sources()
+    if down:
+        print(f"🔌 이번 사이클 차단된 소스: {', '.join(down)} (캐시 값으로 게시)")
+
+    # 프론트엔드 정적 번들 (이번 사이클에 갱신된 보기만 새 파일)
+    try:
+        export_bundle.run({name: _results[name] for name in done})
+    except Exception as e:
+        print(f"⚠️ 데이터 번들 생성 실패: {e}")
+
+    # 사이클 요약 (스테이지별 p50/p95, 가장 느린 종목/피드) + 로그/textfile 기록
+    metrics.print_summary()
+    try:
+        metrics.flush(now.strftime('%Y%m%dT%H%M%SZ'))
+    except Exception as e:
+        print(f"⚠️ 측정값 기록 실패: {e}")
+
+
+# 무한 루프 감시 (--once: 깃허브 액션처럼 한 번만 확인하고 종료)
 if __name__ == "__main__":
+    # 모듈 import 와 저장소(파이어베이스) 인증은 프로세스당 한 번
+    try:
+        store = storage.get_store()
+    except Exception as e:
+        print(f"❌ 파이어베이스 인증 오류: {e}")
+        sys.exit(1)
+
+    if "--once" in sys.argv:
+        run_invest_cycle(store)
+        # 백그라운드 큐에 남은 기록 전송 (못 보낸 건 다음 실행으로 이월)
+        sys.exit(0 if storage.close_all() else 1)
+
     print("🚀 [투자 터미널 시스템] 엔진이 영구 가동 모드로 진입합니다.")
     try:
         while True:
-            run_invest_cycle()
+            run_invest_cycle(store)
+            time.sleep(TICK_INTERVAL)
     except KeyboardInterrupt:
-        print("\n🛑 사용자가 시스템을 수동으로 종료했습니다.")
\ No newline at end of file
+        print("\n🛑 사용자가 시스템을 수동으로 종료했습니다.")
+        storage.close_all()
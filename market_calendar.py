@@ -0,0 +1,248 @@
+import threading
+from datetime import datetime, date, time as dtime, timedelta
+import pytz
+
+try:
+    import exchange_calendars as xcals
+except ImportError:
+    xcals = None
+
+# =========================================================================
+# 거래소 세션 / 휴장일 캘린더 (KRX, NYSE)
+# - 연도별 휴장일 / 조기 폐장 결정 순서
+#   1. 아래 표에 있는 연도 (listed_years): 거래소 공지 기준 표 그대로
+#   2. exchange_calendars 설치 시: XKRX / XNYS 캘린더 (백테스트용 과거 10년 포함)
+#   3. 규칙: NYSE 는 휴장 규칙 전체 (관측일 / 부활절 / 조기 폐장),
+#            KRX 는 양력 고정 공휴일 + 연말 휴장만 → 설/추석/대체공휴일/선거일이 빠지므로 크게 경고
+# - 표는 거래소 공지가 나오면 매년 추가 (listed_years 도 같이)
+# =========================================================================
+MARKETS = {
+    'kr': {
+        'tz': pytz.timezone('Asia/Seoul'),
+        'open': dtime(9, 0),
+        'close': dtime(15, 30),
+        'xcal': 'XKRX',
+        'listed_years': {2025, 2026},
+        'holidays': {
+            # 2025
+            '2025-01-01', '2025-01-27', '2025-01-28', '2025-01-29', '2025-01-30',
+            '2025-03-03', '2025-05-01', '2025-05-05', '2025-05-06', '2025-06-03',
+            '2025-06-06', '2025-08-15', '2025-10-03', '2025-10-06', '2025-10-07',
+            '2025-10-08', '2025-10-09', '2025-12-25', '2025-12-31',
+            # 2026
+            '2026-01-01', '2026-02-16', '2026-02-17', '2026-02-18', '2026-03-02',
+            '2026-05-01', '2026-05-05', '2026-05-25', '2026-06-03', '2026-08-17',
+            '2026-09-24', '2026-09-25', '2026-09-28', '2026-10-05', '2026-10-09',
+            '2026-12-25', '2026-12-31',
+        },
+        'early_close': {},
+    },
+    'us': {
+        'tz': pytz.timezone('America/New_York'),
+        'open': dtime(9, 30),
+        'close': dtime(16, 0),
+        'xcal': 'XNYS',
+        'listed_years': {2025, 2026},
+        'holidays': {
+            # 2025
+            '2025-01-01', '2025-01-09', '2025-01-20', '2025-02-17', '2025-04-18',
+            '2025-05-26', '2025-06-19', '2025-07-04', '2025-09-01', '2025-11-27',
+            '2025-12-25',
+            # 2026
+            '2026-01-01', '2026-01-19', '2026-02-16', '2026-04-03', '2026-05-25',
+            '2026-06-19', '2026-07-03', '2026-09-07', '2026-11-26', '2026-12-25',
+        },
+        'early_close': {
+            '2025-07-03': dtime(13, 0), '2025-11-28': dtime(13, 0), '2025-12-24': dtime(13, 0),
+            '2026-11-27': dtime(13, 0), '2026-12-24': dtime(13, 0),
+        },
+    },
+}
+
+
+KRX_FIXED_HOLIDAYS = ['01-01', '03-01', '05-01', '05-05', '06-06', '08-15', '10-03', '10-09', '12-25']
+
+_years = {}          # (시장, 연도) → (휴장일 set, 조기 폐장 dict)
+_xcals = {}
+_lock = threading.Lock()
+
+
+def _ymd(d):
+    return d.strftime('%Y-%m-%d')
+
+
+def _observed(d):
+    """토요일 공휴일 → 금요일, 일요일 → 월요일 (NYSE)"""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n 번째 요일 (n=-1 이면 마지막)"""
+    if n > 0:
+        d = date(year, month, 1)
+        d += timedelta(days=(weekday - d.weekday()) % 7)
+        return d + timedelta(weeks=n - 1)
+    d = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return d - timedelta(days=(d.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """부활절 (그레고리력, Anonymous Gregorian algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+
+def _nyse_rules(year):
+    """NYSE 휴장 규칙 → (휴장일 set, 조기 폐장 dict) (임시 휴장은 빠짐)"""
+    days = [
+        date(year, 1, 1),                    # 토요일이면 전년 12/31 은 열림 (NYSE 규칙)
+        _nth_weekday(year, 1, 0, 3),         # 마틴 루터 킹 데이
+        _nth_weekday(year, 2, 0, 3),         # 대통령의 날
+        _easter(year) - timedelta(days=2),   # 성금요일
+        _nth_weekday(year, 5, 0, -1),        # 메모리얼 데이
+        _observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),         # 노동절
+        _nth_weekday(year, 11, 3, 4),        # 추수감사절
+        _observed(date(year, 12, 25)),
+    ]
+    if year >= 2022:
+        days.append(_observed(date(year, 6, 19)))
+    if date(year, 1, 1).weekday() == 6:
+        days[0] = date(year, 1, 2)
+    holidays = {_ymd(d) for d in days if d.weekday() < 5 and d.year == year}
+
+    early = {}
+    for d in (date(year, 7, 3), _nth_weekday(year, 11, 3, 4) + timedelta(days=1), date(year, 12, 24)):
+        # 금요일 7/3 · 12/24 는 토요일 휴일의 대체 휴장이라 빠짐
+        if d.weekday() < 5 and _ymd(d) not in holidays:
+            early[_ymd(d)] = dtime(13, 0)
+    return holidays, early
+
+
+def _krx_rules(year):
+    """KRX 양력 고정 휴장일 + 연말 휴장 (마지막 평일) — 음력 명절 / 대체공휴일 / 선거일은 모름"""
+    holidays = {f"{year}-{md}" for md in KRX_FIXED_HOLIDAYS}
+    last = date(year, 12, 31)
+    while last.weekday() >= 5 or _ymd(last) in holidays:
+        last -= timedelta(days=1)
+    holidays.add(_ymd(last))
+    return holidays, {}
+
+
+def _xcal_year(market, year):
+    """exchange_calendars 로 연도 휴장일 / 조기 폐장 (미설치 / 범위 밖이면 None)"""
+    if xcals is None:
+        return None
+    m = MARKETS[market]
+    if market not in _xcals:
+        try:
+            _xcals[market] = xcals.get_calendar(m['xcal'], start='2000-01-01')
+        except Exception as e:
+            print(f"⚠️ {m['xcal']} 캘린더 로드 실패: {e}")
+            _xcals[market] = None
+    cal = _xcals[market]
+    first, last = date(year, 1, 1), date(year, 12, 31)
+    if cal is None or first < cal.first_session.date() or last > cal.last_session.date():
+        return None
+    sessions = {_ymd(s) for s in cal.sessions_in_range(_ymd(first), _ymd(last))}
+    holidays = set()
+    d = first
+    while d <= last:
+        if d.weekday() < 5 and _ymd(d) not in sessions:
+            holidays.add(_ymd(d))
+        d += timedelta(days=1)
+    early = {_ymd(s): cal.session_close(s).tz_convert(m['tz'].zone).time()
+             for s in cal.early_closes if s.year == year}
+    return holidays, early
+
+
+def _year(market, year):
+    """(휴장일 set, 조기 폐장 dict) — 표 → exchange_calendars → 규칙 순"""
+    key = (market, year)
+    with _lock:
+        if key in _years:
+            return _years[key]
+    m = MARKETS[market]
+    if year in m['listed_years']:
+        prefix = f"{year}-"
+        table = ({d for d in m['holidays'] if d.startswith(prefix)},
+                 {d: t for d, t in m['early_close'].items() if d.startswith(prefix)})
+    else:
+        table = _xcal_year(market, year)
+        if table is None:
+            table = _nyse_rules(year) if market == 'us' else _krx_rules(year)
+            if market == 'kr':
+                print(f"🚨 KRX {year}년 휴장일이 표에 없습니다 → 양력 고정 공휴일만 적용 "
+                      f"(설/추석/대체공휴일 누락). market_calendar.py 표를 갱신하거나 exchange_calendars 를 설치하세요.")
+    with _lock:
+        _years[key] = table
+    return table
+
+
+def is_trading_day(market, d):
+    """주말/휴장일이 아니면 거래일"""
+    if isinstance(d, datetime):
+        d = d.date()
+    return d.weekday() < 5 and _ymd(d) not in _year(market, d.year)[0]
+
+
+def session_bounds(market, d):
+    """해당 날짜의 (개장, 폐장) 시각 (거래소 현지 시간대, tz-aware)"""
+    m = MARKETS[market]
+    close_t = _year(market, d.year)[1].get(_ymd(d), m['close'])
+    return (m['tz'].localize(datetime.combine(d, m['open'])),
+            m['tz'].localize(datetime.combine(d, close_t)))
+
+
+def local_now(market, now=None):
+    tz = MARKETS[market]['tz']
+    return now.astimezone(tz) if now else datetime.now(tz)
+
+
+def is_open(market, now=None):
+    now = local_now(market, now)
+    if not is_trading_day(market, now.date()):
+        return False
+    open_dt, close_dt = session_bounds(market, now.date())
+    return open_dt <= now < close_dt
+
+
+def last_session_close(market, now=None):
+    """now 이전에 끝난 가장 최근 세션의 폐장 시각"""
+    now = local_now(market, now)
+    d = now.date()
+    for _ in range(15):
+        if is_trading_day(market, d):
+            _, close_dt = session_bounds(market, d)
+            if close_dt <= now:
+                return close_dt
+        d -= timedelta(days=1)
+    return None
+
+
+def trading_days(market, start, end):
+    """start~end(포함) 사이 거래일 리스트 (datetime.date)"""
+    if isinstance(start, str):
+        start = date.fromisoformat(start)
+    if isinstance(end, str):
+        end = date.fromisoformat(end)
+    days = []
+    d = start
+    while d <= end:
+        if is_trading_day(market, d):
+            days.append(d)
+        d += timedelta(days=1)
+    return days
@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+# =========================================================================
+# 스테이지별 측정값 (지연 시간 / 재시도 / 다운로드량 / 기록량)
+# - 각 모듈은 observe() / inc() / timed() 로 이벤트만 남기고,
+#   manager.py 가 사이클 끝에 summary() 출력 후 flush()
+# - flush: .cache/metrics/metrics.jsonl (이벤트 1건 = 1줄)
+#          + Prometheus textfile (node_exporter textfile collector 용, 직전 사이클 값)
+# - 스테이지 이름은 스레드별로 들고 다님 (스레드 풀에는 bind_stage 로 전달)
+# =========================================================================
+METRICS_DIR = os.path.join('.cache', 'metrics')
+LOG_PATH = os.path.join(METRICS_DIR, 'metrics.jsonl')
+TEXTFILE_PATH = os.environ.get('METRICS_TEXTFILE', os.path.join(METRICS_DIR, 'finance.prom'))
+LOG_MAX_BYTES = 20 * 1024 * 1024   # 넘으면 metrics.jsonl.1 로 넘기고 새로 시작
+PROM_PREFIX = 'finance_'
+PROM_SKIP_LABELS = ('key',)        # 종목/피드 단위 라벨은 로그에만 (시계열 폭증 방지)
+
+_lock = threading.Lock()
+_events = []
+_local = threading.local()
+
+
+def set_stage(name):
+    _local.stage = name
+
+
+def current_stage():
+    return getattr(_local, 'stage', None)
+
+
+def bind_stage(fn):
+    """현재 스테이지 이름을 다른 스레드(스레드 풀 작업)로 넘기는 래퍼"""
+    stage = current_stage()
+
+    def _wrapped(*args, **kwargs):
+        set_stage(stage)
+        return fn(*args, **kwargs)
+
+    return _wrapped
+
+
+def _record(kind, metric, value, labels):
+    stage = labels.pop('stage', None) or current_stage()
+    if stage:
+        labels['stage'] = stage
+    event = {"ts": round(time.time(), 3), "kind": kind, "metric": metric,
+             "value": round(float(value), 6), "labels": labels}
+    with _lock:
+        _events.append(event)
+
+
+def observe(metric, value, **labels):
+    """분포를 보는 값 (지연 시간 등)"""
+    _record('observe', metric, value, labels)
+
+
+def inc(metric, value=1, **labels):
+    """합계를 보는 값 (재시도 횟수 / 바이트 / 문서 수 등)"""
+    _record('count', metric, value, labels)
+
+
+@contextmanager
+def timed(metric, **labels):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(metric, time.perf_counter() - t0, **labels)
+
+
+def events():
+    with _lock:
+        return list(_events)
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def summary(evts=None):
+    """
+    스테이지별 요약
+    반환: {stage: {seconds, status, fetches, fetch_p50, fetch_p95, slowest, retries,
+                   bytes_down, rows_down, parse_seconds, compute_seconds, fs_docs, fs_bytes}}
+    """
+    evts = events() if evts is None else evts
+    out = {}
+    fetch = {}
+    for e in evts:
+        stage = e['labels'].get('stage', '-')
+        s = out.setdefault(stage, {"seconds": 0.0, "status": "", "fetches": 0, "fetch_p50": 0.0,
+                                   "fetch_p95": 0.0, "slowest": None, "retries": 0, "bytes_down": 0,
+                                   "rows_down": 0, "parse_seconds": 0.0, "compute_seconds": 0.0,
+                                   "fs_docs": 0, "fs_bytes": 0})
+        m, v = e['metric'], e['value']
+        if m == 'stage_seconds':
+            s['seconds'] = v
+            s['status'] = e['labels'].get('status', '')
+        elif m == 'fetch_seconds':
+            fetch.setdefault(stage, []).append((v, e['labels'].get('key')))
+        elif m == 'fetch_retries':
+            s['retries'] += int(v)
+        elif m == 'fetch_bytes':
+            s['bytes_down'] += int(v)
+        elif m == 'fetch_rows':
+            s['rows_down'] += int(v)
+        elif m == 'parse_seconds':
+            s['parse_seconds'] += v
+        elif m in ('rs_compute_seconds', 'indicator_seconds'):
+            s['compute_seconds'] += v
+        elif m == 'firestore_docs':
+            s['fs_docs'] += int(v)
+        elif m == 'firestore_bytes':
+            s['fs_bytes'] += int(v)
+
+    for stage, samples in fetch.items():
+        lat = [v for v, _ in samples]
+        slow_v, slow_k = max(samples, key=lambda x: x[0])
+        out[stage].update(fetches=len(lat), fetch_p50=percentile(lat, 50),
+                          fetch_p95=percentile(lat, 95), slowest=(slow_k, slow_v))
+    return out
+
+
+def print_summary(evts=None):
+    rows = summary(evts)
+    if not rows:
+        return
+    print("📊 스테이지       시간(s)  요청  p50(s)  p95(s)  재시도  다운(KB)  기록(문서/KB)  가장 느린 요청")
+    for stage, s in sorted(rows.items(), key=lambda x: -x[1]['seconds']):
+        slow = f"{s['slowest'][0]} {s['slowest'][1]:.2f}s" if s['slowest'] else "-"
+        print(f"   {stage:14} {s['seconds']:>7.1f} {s['fetches']:>5} {s['fetch_p50']:>7.2f} "
+              f"{s['fetch_p95']:>7.2f} {s['retries']:>7} {s['bytes_down'] / 1024:>9.1f} "
+              f"{s['fs_docs']:>6}/{s['fs_bytes'] / 1024:<7.1f} {slow}")
+
+
+def _prom_labels(labels):
+    items = [(k, v) for k, v in sorted(labels.items()) if k not in PROM_SKIP_LABELS]
+    if not items:
+        return ''
+    esc = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{esc(v)}"' for k, v in items) + '}'
+
+
+def render_prometheus(evts):
+    """
+    직전 사이클 값 출력 (다음 flush 때 덮어씀)
+    - observe: summary — <이름>_sum / _count / {quantile="0.5|0.95"}
+    - count: gauge — <이름>_total (사이클 합계)
+    """
+    groups = {}
+    for e in evts:
+        labels = {k: v for k, v in e['labels'].items() if k not in PROM_SKIP_LABELS}
+        key = (e['kind'], e['metric'], _prom_labels(labels))
+        groups.setdefault(key, []).append(e['value'])
+
+    lines = []
+    typed = set()
+    for (kind, metric, lbl), values in sorted(groups.items()):
+        name = PROM_PREFIX + metric
+        if kind == 'count':
+            name += '_total'
+        if name not in typed:
+            lines.append(f"# TYPE {name} {'gauge' if kind == 'count' else 'summary'}")
+            typed.add(name)
+        if kind == 'count':
+            lines.append(f"{name}{lbl} {sum(values):g}")
+            continue
+        lines.append(f"{name}_sum{lbl} {sum(values):g}")
+        lines.append(f"{name}_count{lbl} {len(values)}")
+        for q in (0.5, 0.95):
+            ql = (lbl[:-1] + ',' if lbl else '{') + f'quantile="{q}"' + '}'
+            lines.append(f"{name}{ql} {percentile(values, q * 100):g}")
+    lines.append(f"# TYPE {PROM_PREFIX}last_flush_timestamp_seconds gauge")
+    lines.append(f"{PROM_PREFIX}last_flush_timestamp_seconds {time.time():.0f}")
+    return '\n'.join(lines) + '\n'
+
+
+def flush(cycle_id=None):
+    """모아 둔 이벤트를 JSON-lines 로그 + Prometheus textfile 로 내보내고 비움"""
+    with _lock:
+        evts = list(_events)
+        _events.clear()
+    if not evts:
+        return evts
+
+    cycle_id = cycle_id or time.strftime('%Y%m%d-%H%M%S')
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    try:
+        if os.path.getsize(LOG_PATH) > LOG_MAX_BYTES:
+            os.replace(LOG_PATH, LOG_PATH + '.1')
+    except OSError:
+        pass
+    with open(LOG_PATH, 'a', encoding='utf-8') as f:
+        for e in evts:
+            f.write(json.dumps(dict(e, cycle=cycle_id), ensure_ascii=False) + '\n')
+
+    os.makedirs(os.path.dirname(TEXTFILE_PATH) or '.', exist_ok=True)
+    with open(TEXTFILE_PATH + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(render_prometheus(evts))
+    os.replace(TEXTFILE_PATH + '.tmp', TEXTFILE_PATH)
+    return evts
@@ -0,0 +1,235 @@
+import os
+import sys
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import pytz
+
+# =========================================================================
+# 뉴스 아카이브 (SQLite + FTS5 전문 검색)
+# - 사이클마다 수집한 종목별 기사를 전부 보관 (상위 20개에서 밀려나도 남음)
+#   같은 (시장, 종목, 링크)는 한 번만 저장, 사이클당 트랜잭션 1회 일괄 삽입
+# - articles: 종목 / 시각 인덱스 → 종목별 기간 조회, 일별 건수 집계 (집계는 커버링 인덱스만 읽음)
+# - articles_fts: 제목 / 언론사 전문 색인 (trigram 토크나이저 → 한글 조사가 붙어도 부분 일치,
+#   trigram 이 없는 SQLite 면 unicode61), 삽입 트리거로 자동 동기화
+#   종목을 지정한 검색은 종목/기간 인덱스로 먼저 좁힌 뒤 LIKE (trigram 일치와 같은 결과,
+#   흔한 단어라도 그 종목 기사 수만큼만 읽음)
+# - 시각은 게시 payload 와 같은 KST 'YYYY-MM-DD HH:MM' 문자열 (문자열 비교 = 시간 비교)
+#
+# 사용법
+#   python news_archive.py search HBM 000660 30     # 000660 의 최근 30일 HBM 기사
+#   python news_archive.py counts kr 30             # 종목별 / 일별 기사 수
+# =========================================================================
+ARCHIVE_PATH = os.environ.get('NEWS_ARCHIVE', os.path.join('.cache', 'news', 'archive.db'))
+MIN_TRIGRAM = 3          # trigram 색인은 3글자 이상 검색어만 → 짧은 검색어는 LIKE 로
+
+kst = pytz.timezone('Asia/Seoul')
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS articles (
+        id INTEGER PRIMARY KEY,
+        market TEXT NOT NULL,
+        code TEXT NOT NULL,
+        name TEXT,
+        title TEXT NOT NULL,
+        publisher TEXT,
+        link TEXT NOT NULL,
+        published TEXT NOT NULL,
+        day TEXT NOT NULL,
+        collected REAL NOT NULL,
+        UNIQUE (market, code, link)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_articles_code_time ON articles (code, published)",
+    "CREATE INDEX IF NOT EXISTS idx_articles_code_day ON articles (code, day, name)",
+    "CREATE INDEX IF NOT EXISTS idx_articles_market_day ON articles (market, day, code, name)",
+    """CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts (rowid, title, publisher) VALUES (new.id, new.title, new.publisher);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts (articles_fts, rowid, title, publisher)
+        VALUES ('delete', old.id, old.title, old.publisher);
+    END""",
+]
+
+_conn = None
+_tokenizer = None
+_lock = threading.Lock()
+
+
+def _connect():
+    """프로세스당 연결 1개 (한국/미국 뉴스 스테이지 스레드가 잠금으로 공유)"""
+    global _conn, _tokenizer
+    if _conn is not None:
+        return _conn
+    os.makedirs(os.path.dirname(ARCHIVE_PATH) or '.', exist_ok=True)
+    conn = sqlite3.connect(ARCHIVE_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'articles_fts'").fetchone()
+    if row is None:
+        try:
+            conn.execute("CREATE VIRTUAL TABLE articles_fts USING fts5("
+                         "title, publisher, content='articles', content_rowid='id', tokenize='trigram')")
+        except sqlite3.OperationalError:
+            conn.execute("CREATE VIRTUAL TABLE articles_fts USING fts5("
+                         "title, publisher, content='articles', content_rowid='id')")
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'articles_fts'").fetchone()
+    _tokenizer = 'trigram' if 'trigram' in row[0] else 'unicode61'
+    for stmt in SCHEMA:
+        conn.execute(stmt)
+    conn.commit()
+    _conn = conn
+    return _conn
+
+
+# =========================================================================
+# 저장
+# =========================================================================
+def archive(market, fields, collected=None):
+    """
+    뉴스 스테이지 결과 보관 (사이클당 트랜잭션 1회)
+    - fields: {"{code}_{name}": {"update_time", "articles": [...]}} (게시 형식 그대로)
+    반환: 새로 저장한 기사 수
+    """
+    collected = collected or time.time()
+    rows = []
+    for field_key, field in fields.items():
+        code, name = field_key.split('_', 1)
+        for a in field.get('articles', []):
+            link = (a.get('link') or '').split('?', 1)[0] or a['title']
+            published = a.get('time') or ''
+            rows.append((market, code, name, a['title'], a.get('publisher'), link,
+                         published, published[:10], collected))
+    if not rows:
+        return 0
+    with _lock:
+        conn = _connect()
+        with conn:
+            cur = conn.executemany(
+                "INSERT OR IGNORE INTO articles (market, code, name, title, publisher, link, published, day, collected) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return max(cur.rowcount, 0)
+
+
+# =========================================================================
+# 조회
+# =========================================================================
+def _since(days, now=None):
+    if not days:
+        return None
+    now = now or datetime.now(kst)
+    return (now - timedelta(days=days)).strftime('%Y-%m-%d %H:%M')
+
+
+def _fts_query(text):
+    """검색어 → FTS5 MATCH 식 (단어별 구문 AND, 특수문자는 따옴표로 무력화)"""
+    return ' AND '.join('"' + w.replace('"', '""') + '"' for w in text.split())
+
+
+def _filters(code, market, since, alias='a'):
+    where, args = [], []
+    if code:
+        where.append(f"{alias}.code = ?")
+        args.append(str(code))
+    if market:
+        where.append(f"{alias}.market = ?")
+        args.append(market)
+    if since:
+        where.append(f"{alias}.published >= ?")
+        args.append(since)
+    return where, args
+
+
+def search(text, code=None, market=None, days=None, limit=100):
+    """
+    제목 / 언론사 전문 검색 (최신순, 종목 미지정이면 최근 수집분 limit 개 안에서)
+    - 예: search('HBM', code='000660', days=30)
+    - 종목 지정 또는 MIN_TRIGRAM 글자 미만 단어가 있으면 인덱스로 좁힌 뒤 LIKE, 아니면 FTS 색인
+    반환: [{market, code, name, title, publisher, link, time}]
+    """
+    words = text.split()
+    if not words:
+        return []
+    where, args = _filters(code, market, _since(days))
+    with _lock:
+        # 토크나이저는 연결할 때 정해지므로 연결 뒤에 판단 (새 프로세스의 첫 검색도 짧은 단어는 LIKE 로)
+        conn = _connect()
+        use_fts = not code and (_tokenizer != 'trigram' or all(len(w) >= MIN_TRIGRAM for w in words))
+        if use_fts:
+            sql = ("SELECT a.market, a.code, a.name, a.title, a.publisher, a.link, a.published "
+                   "FROM articles_fts f JOIN articles a ON a.id = f.rowid WHERE articles_fts MATCH ?")
+            args = [_fts_query(text)] + args
+        else:
+            sql = ("SELECT a.market, a.code, a.name, a.title, a.publisher, a.link, a.published "
+                   "FROM articles a WHERE " + ' AND '.join(["(a.title LIKE ? OR a.publisher LIKE ?)"] * len(words)))
+            args = [p for w in words for p in (f"%{w}%", f"%{w}%")] + args
+        if where:
+            sql += ' AND ' + ' AND '.join(where)
+        # 종목 지정: (종목, 시각) 인덱스를 거꾸로 읽음 / 전체: 행 번호(= 수집 순서) 역순으로 읽다가
+        # limit 에서 멈춤 (흔한 단어도 일치 전체를 정렬하지 않음)
+        if code:
+            sql += " ORDER BY a.published DESC LIMIT ?"
+        else:
+            sql += " ORDER BY f.rowid DESC LIMIT ?" if use_fts else " ORDER BY a.id DESC LIMIT ?"
+        rows = conn.execute(sql, args + [limit]).fetchall()
+    keys = ('market', 'code', 'name', 'title', 'publisher', 'link', 'time')
+    return sorted((dict(zip(keys, r)) for r in rows), key=lambda a: a['time'], reverse=True)
+
+
+def recent(code, days=30, limit=100):
+    """종목별 최근 기사 (최신순)"""
+    where, args = _filters(code, None, _since(days))
+    with _lock:
+        rows = _connect().execute(
+            "SELECT a.title, a.publisher, a.link, a.published FROM articles a WHERE " + ' AND '.join(where) +
+            " ORDER BY a.published DESC LIMIT ?", args + [limit]).fetchall()
+    return [dict(zip(('title', 'publisher', 'link', 'time'), r)) for r in rows]
+
+
+def daily_counts(market=None, code=None, days=30):
+    """
+    종목별 / 일별 기사 수
+    반환: [(날짜, 종목, 이름, 건수)] (날짜 오름차순)
+    """
+    # 종목을 지정하면 시장 조건은 빼서 (종목, 날짜) 인덱스를 쓰게 함 (종목 코드는 시장 간 겹치지 않음)
+    where, args = _filters(code, None if code else market, None)
+    since = _since(days)
+    if since:
+        where.append("a.day >= ?")
+        args.append(since[:10])
+    sql = "SELECT a.day, a.code, MAX(a.name), COUNT(*) FROM articles a"
+    if where:
+        sql += " WHERE " + ' AND '.join(where)
+    sql += " GROUP BY a.day, a.code ORDER BY a.day, a.code"
+    with _lock:
+        return _connect().execute(sql, args).fetchall()
+
+
+def stats():
+    with _lock:
+        conn = _connect()
+        total, first, last = conn.execute("SELECT COUNT(*), MIN(published), MAX(published) FROM articles").fetchone()
+        tickers = conn.execute("SELECT COUNT(DISTINCT code) FROM articles").fetchone()[0]
+    return {"articles": total, "tickers": tickers, "first": first, "last": last, "tokenizer": _tokenizer}
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    if cmd == 'search' and len(sys.argv) > 2:
+        code = sys.argv[3] if len(sys.argv) > 3 else None
+        days = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        t0 = time.perf_counter()
+        found = search(sys.argv[2], code=code, days=days)
+        for a in found:
+            print(f" {a['time']}  {a['code']:8} {a['title']}")
+        print(f"🔎 {len(found)}건 ({(time.perf_counter() - t0) * 1000:.1f}ms)")
+    elif cmd == 'counts':
+        market = sys.argv[2] if len(sys.argv) > 2 else None
+        days = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+        for day, code, name, n in daily_counts(market, days=days):
+            print(f" {day}  {code:8} {name or '':20} {n:>4}")
+    elif cmd == 'stats':
+        print(f"🗄️ {stats()}")
+    else:
+        sys.exit("사용법: python news_archive.py [search 검색어 [종목] [일수] | counts [kr|us] [일수] | stats]")
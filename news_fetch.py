@@ -0,0 +1,312 @@
+import os
+import json
+import time
+import asyncio
+import zlib
+from urllib.parse import quote_plus
+import aiohttp
+import news_index
+import news_match
+import fetch_guard
+import metrics
+import storage
+
+# =========================================================================
+# 구글 뉴스 RSS 비동기 수집기
+# - 세션 하나로 keep-alive 커넥션 재사용
+# - 고정 sleep 대신 동시 요청 수 제한(세마포어)
+# - ETag / Last-Modified 저장 후 조건부 GET → 변경 없으면 304로 파싱 생략
+# - 종목별 기사 빈도에 맞춰 폴링 간격 자동 조정
+# - 파싱은 news_index (이미 본 기사에서 중단, 상위 목록 증분 병합)
+# - 요청은 fetch_guard 제한 시간 / 헤지 / 차단기 아래에서,
+#   실패한 피드는 저장된 기사 목록으로 대체 (stale 로 기록)
+# - 묶음 모드(collect_batched): 종목 여러 개를 "A" OR "B" 검색 1회로 받고
+#   제목을 이름/별칭 매처(news_match)로 다시 종목별로 나눔 → 요청 수 1/BATCH_SIZE
+# =========================================================================
+NEWS_CACHE_DIR = os.path.join('.cache', 'news')
+NEWS_HOST = 'news.google.com'
+MAX_CONCURRENCY = int(os.environ.get('NEWS_CONCURRENCY', '6'))
+REQUEST_TIMEOUT = 10
+MAX_ARTICLES = 20
+MIN_POLL_INTERVAL = 600        # 종목별 최소 폴링 간격 10분
+MAX_POLL_INTERVAL = 6 * 3600   # 최대 6시간
+BATCH_SIZE = int(os.environ.get('NEWS_BATCH_SIZE', '8'))   # 1 이면 종목별 검색
+MAX_QUERY_CHARS = 400          # 묶음 검색어 길이 상한 (별칭이 많으면 묶음이 작아짐)
+BATCH_PREFIX = 'batch_'
+
+FEED_LOCALES = {
+    'ko': 'hl=ko&gl=KR&ceid=KR:ko',
+    'en': 'hl=en-US&gl=US&ceid=US:en',
+}
+
+
+def google_news_url(query, lang):
+    return f"https://news.google.com/rss/search?q={quote_plus(query)}&{FEED_LOCALES[lang]}"
+
+
+def _state_path(market):
+    return os.path.join(NEWS_CACHE_DIR, f"feeds_{market}.json")
+
+
+def load_feed_state(market):
+    try:
+        with open(_state_path(market), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_feed_state(market, state):
+    os.makedirs(NEWS_CACHE_DIR, exist_ok=True)
+    tmp = _state_path(market) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, _state_path(market))
+
+
+async def _request(session, url, headers):
+    """조건부 GET 1회 → (상태 코드, 본문, ETag, Last-Modified)"""
+    async with session.get(url, headers=headers) as res:
+        if res.status == 304:
+            return 304, b'', None, None
+        res.raise_for_status()
+        return res.status, await res.read(), res.headers.get('ETag'), res.headers.get('Last-Modified')
+
+
+async def _fetch_one(session, sem, key, url, entry, seen):
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+
+    async with sem:
+        t0 = time.perf_counter()
+        status, body, etag, last_modified = await fetch_guard.call_async(
+            NEWS_HOST, lambda: _request(session, url, headers), key=key, deadline=REQUEST_TIMEOUT)
+        if status == 304 and 'articles' in entry:
+            metrics.observe('fetch_seconds', time.perf_counter() - t0, host=NEWS_HOST, key=key)
+            metrics.inc('fetch_not_modified', host=NEWS_HOST)
+            return key, entry, False
+        metrics.observe('fetch_seconds', time.perf_counter() - t0, host=NEWS_HOST, key=key)
+        metrics.inc('fetch_bytes', len(body), host=NEWS_HOST)
+
+    # 이미 본 기사 전까지만 파싱하고, 이전 상위 목록과 병합
+    with metrics.timed('parse_seconds', key=key):
+        new_articles = news_index.parse_new_items(body, seen)
+    new_entry = {
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "articles": news_index.merge_top(new_articles, entry.get('articles', []), MAX_ARTICLES),
+        "new_count": len(new_articles),
+        "new_articles": new_articles,
+    }
+    return key, new_entry, bool(new_articles) or 'articles' not in entry
+
+
+def _next_interval(entry, new_count, now):
+    """
+    종목별 다음 폴링 간격 (초)
+    - 지난 폴링 이후 새 기사 1개가 나오는 데 걸린 시간을 관측값으로 사용
+    - 새 기사가 없으면 간격을 늘리고, 이전 간격과 반반 섞어서 완만하게 조정
+    """
+    prev = entry.get('interval', MIN_POLL_INTERVAL)
+    elapsed = now - entry.get('fetched_at', now - prev)
+    observed = elapsed / new_count if new_count else max(elapsed, prev) * 2
+    interval = 0.5 * prev + 0.5 * observed
+    return int(min(MAX_POLL_INTERVAL, max(MIN_POLL_INTERVAL, interval)))
+
+
+async def _collect(feeds, state, skip, index):
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY * 2, keepalive_timeout=30)   # 헤지 요청 여유
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks = []
+        for key, url in feeds.items():
+            if key in skip:
+                continue
+            entry = state.get(key, {})
+            if entry.get('url') != url or 'articles' not in entry:
+                entry = {}
+                index[key] = {}   # 저장된 목록이 없으면 인덱스도 처음부터
+            tasks.append(_fetch_one(session, sem, key, url, entry, index.setdefault(key, {})))
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _schedule(state, key, entry, changed, now):
+    """받은 피드 상태 저장 + 다음 폴링 시각"""
+    prev = state.get(key, {})
+    new_count = entry.pop('new_count', 0) if changed else 0
+    entry['interval'] = _next_interval(prev, new_count, now)
+    entry['fetched_at'] = now
+    entry['next_poll'] = now + entry['interval']
+    state[key] = entry
+
+
+def _due_skip(feeds, state, now):
+    """다음 폴링 시각 전이라 요청하지 않을 피드"""
+    return {k for k, url in feeds.items()
+            if state.get(k, {}).get('url') == url and 'articles' in state[k]
+            and state[k].get('next_poll', 0) > now}
+
+
+def collect(feeds, market, adaptive=True, cancel=None):
+    """
+    feeds: {field_key: rss_url}
+    반환: {field_key: (articles, changed)} — 실패한 키는 예외 객체 (CancelledError 포함)
+      (저장된 기사가 있으면 예외 대신 그 목록을 돌려주고 fetch_guard 에 stale 로 기록)
+    - adaptive: 기사 빈도로 정한 다음 폴링 시각 전이면 요청 없이 저장된 기사 사용
+    - cancel: 세워져 있으면 피드 상태 / 인덱스를 저장하지 않고 StageCancelled
+    """
+    state = load_feed_state(market)
+    now = time.time()
+    skip = _due_skip(feeds, state, now) if adaptive else set()
+
+    fetch_keys = [k for k in feeds if k not in skip]
+    index = news_index.load_index(market)
+    results = asyncio.run(_collect(feeds, state, skip, index))
+
+    out = {k: (state[k]['articles'], False) for k in skip}
+    stale = 0
+    for key, res in zip(fetch_keys, results):
+        if isinstance(res, BaseException):   # 취소된 작업은 CancelledError (Exception 이 아님)
+            prev = state.get(key, {})
+            if prev.get('url') == feeds[key] and 'articles' in prev:
+                fetch_guard.mark_stale(key)
+                out[key] = (prev['articles'], False)
+                stale += 1
+            else:
+                out[key] = res
+            continue
+        _, entry, changed = res
+        entry.pop('new_articles', None)
+        _schedule(state, key, entry, changed, now)
+        out[key] = (entry['articles'], changed)
+
+    if skip:
+        print(f"⏭️ 폴링 주기 전이라 건너뜀: {len(skip)}개 종목")
+    if stale:
+        print(f"🕰️ 수집 실패로 저장된 기사 사용: {stale}개 종목")
+    storage.check_cancel(cancel)
+    save_feed_state(market, state)
+    news_index.save_index(market, index)
+    return {k: out[k] for k in feeds if k in out}
+
+
+# =========================================================================
+# 묶음 검색 (OR 쿼리 + 제목 매칭으로 종목별 분배)
+# =========================================================================
+def batch_query(names):
+    return ' OR '.join(f'"{n}"' for n in names)
+
+
+def plan_batches(terms, batch_size=BATCH_SIZE):
+    """
+    {field_key: [이름, 별칭...]} → {묶음 키: [field_key...]}
+    - 종목 코드 crc32 로 고정 버킷에 배정 → 순위에 종목이 들고 나도 그 종목의 버킷만 구성이 바뀌고
+      나머지 묶음은 검색어 / 키 (= ETag / 폴링 간격 / 인덱스) 그대로
+    - 버킷 수 = 종목 수 / batch_size 를 2의 거듭제곱으로 올림 (종목 수가 조금 변해도 유지)
+    - 버킷이 batch_size 종목 또는 검색어 MAX_QUERY_CHARS 자를 넘으면 버킷 안에서 나눔
+    """
+    n_buckets = 1
+    while n_buckets * batch_size < len(terms):
+        n_buckets *= 2
+    buckets = {}
+    for key in sorted(terms):
+        bucket = zlib.crc32(key.split('_', 1)[0].encode('utf-8')) % n_buckets
+        buckets.setdefault(bucket, []).append(key)
+
+    batches = {}
+    for bucket, keys in sorted(buckets.items()):
+        part, cur, length = 0, [], 0
+        for key in keys:
+            q_len = len(batch_query(terms[key])) + 4
+            if cur and (len(cur) >= batch_size or length + q_len > MAX_QUERY_CHARS):
+                batches[f"{BATCH_PREFIX}{n_buckets}_{bucket}_{part}"] = cur
+                part, cur, length = part + 1, [], 0
+            cur.append(key)
+            length += q_len
+        batches[f"{BATCH_PREFIX}{n_buckets}_{bucket}_{part}"] = cur
+    return batches
+
+
+def _title_text(article):
+    """구글 뉴스 제목 끝의 ' - 언론사' 제거 (언론사 이름에 종목명이 들어가도 매칭 안 되게)"""
+    title, pub = article['title'], article.get('publisher') or ''
+    return title[:-len(pub) - 3] if pub and title.endswith(' - ' + pub) else title
+
+
+def collect_batched(terms, market, lang, adaptive=True, cancel=None):
+    """
+    terms: {field_key: [이름, 별칭...]} (첫 번째가 대표 이름)
+    반환: collect() 와 같은 {field_key: (articles, changed)} — 묶음 실패 + 저장 기사 없음이면 예외 객체
+    - 묶음 결과의 새 기사를 제목 매칭으로 종목별로 나눠서 종목별 상위 목록에 병합
+      (다른 묶음 종목이 제목에 나와도 그 종목에 넣음, 어느 종목과도 안 맞는 기사는 버림)
+    - cancel: collect() 와 같음
+    """
+    state = load_feed_state(market)
+    now = time.time()
+    batches = plan_batches(terms)
+    feeds = {bk: google_news_url(batch_query([t for k in members for t in terms[k]]), lang)
+             for bk, members in batches.items()}
+    skip = _due_skip(feeds, state, now) if adaptive else set()
+    fetch_keys = [k for k in feeds if k not in skip]
+    index = news_index.load_index(market)
+    results = asyncio.run(_collect(feeds, state, skip, index))
+
+    with metrics.timed('parse_seconds', key='demux'):
+        matcher = news_match.NameMatcher(terms)
+        incoming = {k: [] for k in terms}
+        failed = {}
+        unmatched = 0
+        for bk, res in zip(fetch_keys, results):
+            if isinstance(res, BaseException):
+                failed.update((k, res) for k in batches[bk])
+                continue
+            _, entry, changed = res
+            new_articles = entry.pop('new_articles', [])
+            entry['members'] = batches[bk]
+            _schedule(state, bk, entry, changed, now)
+            for a in new_articles:
+                keys = matcher.match(_title_text(a))
+                unmatched += not keys
+                for k in keys:
+                    incoming[k].append(a)
+
+    out = {}
+    stale = 0
+    for k in terms:
+        prev = state.get(k, {})
+        if k in failed:
+            if 'articles' in prev:
+                fetch_guard.mark_stale(k)
+                out[k] = (prev['articles'], False)
+                stale += 1
+            else:
+                out[k] = failed[k]
+            continue
+        new = sorted(incoming[k], key=lambda a: a['time'], reverse=True)
+        if not new and 'articles' in prev:
+            out[k] = (prev['articles'], False)
+            continue
+        articles = news_index.merge_top(new, prev.get('articles', []), MAX_ARTICLES)
+        state[k] = dict(prev, articles=articles)
+        out[k] = (articles, articles != prev.get('articles'))
+
+    # 구성이 바뀌어서 더 안 쓰는 묶음 상태 정리
+    for key in [k for k in state if k.startswith(BATCH_PREFIX) and k not in feeds]:
+        del state[key]
+
+    metrics.inc('news_requests', len(fetch_keys), market=market)
+    metrics.inc('news_unmatched', unmatched, market=market)
+    print(f"🧺 묶음 검색 {len(fetch_keys)}/{len(feeds)}회 ({len(terms)}종목, 종목 미매칭 기사 {unmatched}개)")
+    if skip:
+        print(f"⏭️ 폴링 주기 전이라 건너뜀: {len(skip)}개 묶음")
+    if stale:
+        print(f"🕰️ 수집 실패로 저장된 기사 사용: {stale}개 종목")
+    storage.check_cancel(cancel)
+    save_feed_state(market, state)
+    news_index.save_index(market, index)
+    return out
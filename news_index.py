@@ -0,0 +1,114 @@
+import os
+import io
+import json
+import time
+import heapq
+import hashlib
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+import pytz
+
+# =========================================================================
+# 기사 인덱스 (사이클 간 유지) + 스트리밍 RSS 파싱
+# - 종목별로 이미 본 기사 키(정규화 링크 / 제목 해시)를 .cache/news/index_<market>.json 에 보관
+# - RSS 는 iterparse 로 item 단위 스트리밍, 이미 본 기사가 연속으로 나오면 중단
+#   (구글 뉴스 검색 결과는 완전한 시간순이 아니어서 1개가 아니라 연속 N개 기준)
+# - 상위 20개는 이전 목록과 새 기사만 병합 (전체 재정렬 없음)
+# =========================================================================
+NEWS_CACHE_DIR = os.path.join('.cache', 'news')
+STOP_AFTER_KNOWN = 3       # 이미 본 기사가 연속 이만큼 나오면 파싱 중단
+INDEX_TTL_DAYS = 14        # 이 기간보다 오래된 인덱스 항목은 정리
+
+kst = pytz.timezone('Asia/Seoul')
+
+
+def link_key(link):
+    """링크 정규화 (쿼리스트링 제거)"""
+    return 'l:' + link.split('?', 1)[0].rstrip('/')
+
+
+def title_key(title):
+    norm = ' '.join(title.lower().split())
+    return 't:' + hashlib.sha1(norm.encode('utf-8')).hexdigest()[:16]
+
+
+def _index_path(market):
+    return os.path.join(NEWS_CACHE_DIR, f"index_{market}.json")
+
+
+def load_index(market):
+    try:
+        with open(_index_path(market), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_index(market, index):
+    """오래된 항목 정리 후 저장"""
+    cutoff = time.time() - INDEX_TTL_DAYS * 86400
+    pruned = {}
+    for ticker, seen in index.items():
+        kept = {k: ts for k, ts in seen.items() if ts >= cutoff}
+        if kept:
+            pruned[ticker] = kept
+    os.makedirs(NEWS_CACHE_DIR, exist_ok=True)
+    with open(_index_path(market) + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(pruned, f)
+    os.replace(_index_path(market) + '.tmp', _index_path(market))
+
+
+def parse_new_items(content, seen):
+    """
+    RSS 본문에서 아직 안 본 기사만 추출 (스트리밍)
+    - seen: 해당 종목의 {기사 키: 처음 본 시각} (새 기사 키가 여기에 추가됨)
+    - 반환: 새 기사 리스트 (최신순)
+    """
+    now = time.time()
+    articles = []
+    known_run = 0
+    for _, elem in ET.iterparse(io.BytesIO(content), events=('end',)):
+        if elem.tag != 'item':
+            continue
+        title = (elem.findtext('title') or '').strip()
+        link = elem.findtext('link') or ''
+        keys = (link_key(link), title_key(title))
+        if keys[0] in seen or keys[1] in seen:
+            elem.clear()
+            known_run += 1
+            if known_run >= STOP_AFTER_KNOWN:
+                break
+            continue
+        known_run = 0
+
+        try:
+            dt_obj = parsedate_to_datetime(elem.findtext('pubDate')).astimezone(kst)
+        except Exception:
+            dt_obj = datetime.now(kst)
+        articles.append({
+            "title": title,
+            "link": link,
+            "publisher": elem.findtext('source') or "Google News",
+            "time": dt_obj.strftime('%Y-%m-%d %H:%M'),
+        })
+        for k in keys:
+            seen[k] = now
+        elem.clear()
+
+    articles.sort(key=lambda a: a['time'], reverse=True)
+    return articles
+
+
+def merge_top(new_articles, old_articles, limit):
+    """최신순 두 목록 병합 → 상위 limit개 (제목 중복 제거, 시각이 같으면 새로 받은 쪽 우선)"""
+    merged = []
+    titles = set()
+    for a in heapq.merge(new_articles, old_articles, key=lambda a: a['time'], reverse=True):
+        if a['title'] in titles:
+            continue
+        titles.add(a['title'])
+        merged.append(a)
+        if len(merged) >= limit:
+            break
+    return merged
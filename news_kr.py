@@ -1,99 +1,101 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import quote_plus
 from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, firestore
-import time
-import os
-import json
 import pytz
 import sys
+import storage
+import firestore_sync
+import news_fetch
+import news_archive
+import fetch_guard
+import symbols
 
-# 1. 파이어베이스 초기화 (원본 경로 및 로직 유지)
-if not firebase_admin._apps:
-    try:
-        if os.path.exists("serviceAccountKey.json"):
-            cred = credentials.Certificate("serviceAccountKey.json")
-        else:
-            cred = credentials.Certificate(r"c:\Users\gwak\Finance_Final_V2\serviceAccountKey.json")
-        firebase_admin.initialize_app(cred)
-        print("✅ 파이어베이스 인증 성공")
-    except Exception as e:
-        print(f"❌ 파이어베이스 초기화 실패: {e}")
-        sys.exit(1)
+kst = pytz.timezone('Asia/Seoul')
 
-db = firestore.client()
 
-# 2. RS 데이터에서 상위 종목 가져오기
-doc = db.collection('rs_data').document('latest').get()
-if not doc.exists:
-    print("❌ rs_data/latest 문서가 없습니다.")
-    sys.exit(0)
+def load_rankings(store):
+    """RS 스테이지 결과가 메모리에 없을 때만 rs_data/latest 에서 읽어옴"""
+    doc = store.get(('rs_data', 'latest'))
+    if doc is None:
+        print("❌ rs_data/latest 문서가 없습니다.")
+        return None
+    return doc.get('rankings', [])
 
-rankings = doc.to_dict().get('rankings', [])
-kst = pytz.timezone('Asia/Seoul')
-now_str = datetime.now(kst).strftime('%Y-%m-%d %H:%M')
-fields_to_add = {}
 
-# 오빠 원본 문구 그대로 유지
-print(f"📰 한국 뉴스 30개 수집 시작: {now_str}")
+def run(store=None, rankings=None, cancel=None):
+    """
+    한국 뉴스 스테이지
+    - rankings: rs_kr.run() 결과의 rankings (없으면 파이어베이스에서 조회)
+    - cancel: manager.py 제한 시간 초과 표시 (세워져 있으면 저장 / 게시하지 않음)
+    """
+    # 1. 파이어베이스 초기화
+    store = store or storage.get_store()
 
-for item in rankings:
-    code = item['code']
-    name = item['name']
-    field_key = f"{code}_{name}"
-    
-    try:
-        url = f"https://news.google.com/rss/search?q={quote_plus(name)}&hl=ko&gl=KR&ceid=KR:ko"
-        res = requests.get(url, timeout=10)
-        soup = BeautifulSoup(res.content, "xml")
-        items = soup.find_all("item")
-
-        articles = []
-        seen_titles = set()
-        for i in items:
-            title = i.title.text.strip()
-            if title in seen_titles:
-                continue
-            seen_titles.add(title)
-            raw_date = i.pubDate.text
-            try:
-                dt_obj = datetime.strptime(raw_date, '%a, %d %b %Y %H:%M:%S %Z')
-                dt_obj = dt_obj.replace(tzinfo=pytz.UTC).astimezone(kst)
-            except:
-                dt_obj = datetime.now(kst)
+    # 2. RS 데이터에서 상위 종목 가져오기
+    if rankings is None:
+        rankings = load_rankings(store)
+        if rankings is None:
+            return None
+
+    now_str = datetime.now(kst).strftime('%Y-%m-%d %H:%M')
+    fields_to_add = {}
 
-            articles.append({
-                "title": title,
-                "link": i.link.text,
-                "publisher": i.source.text if i.source else "Google News",
-                "time": dt_obj.strftime('%Y-%m-%d %H:%M'),
-                "dt_index": dt_obj
-            })
+    # 오빠 원본 문구 그대로 유지
+    print(f"📰 한국 뉴스 30개 수집 시작: {now_str}")
 
-        # --- [원본 유지] 최신순 정렬 후 상위 20개 추출 ---
-        articles.sort(key=lambda x: x['dt_index'], reverse=True)
-        final_articles = articles[:20]
+    feeds, terms = {}, {}
+    for item in rankings:
+        code = item['code']
+        name = symbols.name('kr', code, item['name'])
+        feeds[f"{code}_{name}"] = news_fetch.google_news_url(name, 'ko')
+        terms[f"{code}_{name}"] = [name]
 
-        for a in final_articles: del a['dt_index']
+    if news_fetch.BATCH_SIZE > 1:
+        # 여러 종목을 OR 검색 1회로 묶고 제목으로 종목별 분배 (요청 수 1/BATCH_SIZE)
+        results = news_fetch.collect_batched(terms, 'kr', 'ko', cancel=cancel)
+    else:
+        results = news_fetch.collect(feeds, 'kr', cancel=cancel)
 
+    for field_key, res in results.items():
+        code, name = field_key.split('_', 1)
+        if isinstance(res, BaseException):
+            print(f" > {name} 오류: {res}")
+            continue
+
+        final_articles, changed = res
         fields_to_add[field_key] = {
             "update_time": now_str,
             "articles": final_articles
         }
-        print(f" > {name}({code}) 최신 뉴스 {len(final_articles)}개 완료")
-        time.sleep(0.5)
+        if fetch_guard.is_stale(field_key):
+            fields_to_add[field_key]["stale"] = True
+        print(f" > {name}({code}) 최신 뉴스 {len(final_articles)}개 완료{'' if changed else ' (변경 없음)'}")
+
+    # 3. 파이어베이스 전송 (오빠가 지정한 경로 고정)
+    storage.check_cancel(cancel)
+    # 빈 사이클(랭킹 없음 / 전부 실패)에는 아무것도 지우지 않도록 보낼 게 있을 때만
+    if fields_to_add:
+        try:
+            stats = firestore_sync.sync_sharded(store, 'stock_news', 'news_kr', fields_to_add, now_str,
+                                                 keep=feeds)
+            print(f"📝 변경 {stats['written']} / 삭제 {stats['deleted']} / 유지 {stats['unchanged']} 종목, {stats['bytes'] / 1024:.1f} KB 기록")
+            storage.get_files().set(('news_kr',), fields_to_add)
+
+            # 전체 기사 아카이브 (상위 목록에서 밀려나도 검색 가능, 실패해도 게시에는 영향 없음)
+            try:
+                added = news_archive.archive('kr', fields_to_add)
+                print(f"🗄️ 뉴스 아카이브 신규 {added}건")
+            except Exception as e:
+                print(f"⚠️ 뉴스 아카이브 저장 실패: {e}")
+            print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+            print("✅ 모든 한국 뉴스 업데이트 완료")
+        except Exception as e:
+            print(f"❌ 저장 오류: {e}")
+
+    return fields_to_add
 
+
+if __name__ == "__main__":
+    try:
+        run()
     except Exception as e:
-        print(f" > {name} 오류: {e}")
-
-# 3. 파이어베이스 전송 (오빠가 지정한 경로 고정)
-try:
-    db.collection('stock_news').document('news_kr').set(fields_to_add)
-    with open('news_kr.json', 'w', encoding='utf-8') as f:
-        json.dump(fields_to_add, f, ensure_ascii=False, indent=2)
-    print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-    print("✅ 모든 한국 뉴스 업데이트 완료")
-except Exception as e:
-    print(f"❌ 저장 오류: {e}")
\ No newline at end of file
+        print(f"❌ 파이어베이스 초기화 실패: {e}")
+        sys.exit(1)
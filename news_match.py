@@ -0,0 +1,96 @@
+import re
+from collections import deque
+
+# =========================================================================
+# 종목 이름/별칭 매처 (Aho–Corasick)
+# - 여러 종목을 OR 로 묶은 검색 결과를 제목 기준으로 다시 종목별로 나누는 데 사용
+# - 이름 전체를 한 번에 오토마톤으로 만들어 두고 제목 1개당 한 번만 훑음 (이름 수와 무관)
+# - 대소문자 무시, 영문/숫자 이름은 앞뒤가 영문/숫자면 매칭 안 함 (Apple ≠ Pineapple)
+#   한글은 조사가 바로 붙으므로 경계 검사 없음 (삼성전자가 → 삼성전자)
+# - 겹치는 매칭은 긴 쪽 우선 (SK하이닉스 안의 SK 는 버림)
+# =========================================================================
+CORP_SUFFIXES = re.compile(
+    r'(,?\s+(inc\.?|corp\.?|corporation|company|co\.?|plc|ltd\.?|holdings?|group)'
+    r'|\s+&\s+co\.?|\s+\([a-z]\))+$', re.IGNORECASE)
+
+
+def clean_name(name):
+    """검색/매칭용 이름 (법인 접미사 제거: 'Tesla, Inc.' → 'Tesla', 'Merck & Co.' → 'Merck')"""
+    cleaned = CORP_SUFFIXES.sub('', name.strip()).strip(' ,')
+    return cleaned or name.strip()
+
+
+def _is_word(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+class NameMatcher:
+    """
+    terms: {키: [이름, 별칭, ...]} → 제목에서 등장한 키 집합
+    - goto: 상태별 {문자: 다음 상태}, fail: 실패 링크, out: 상태에서 끝나는 (패턴 길이, 키) 리스트
+    """
+
+    def __init__(self, terms):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for key, names in terms.items():
+            for name in dict.fromkeys(n.strip().lower() for n in names if n and n.strip()):
+                self._add(name, key)
+        self._build()
+
+    def _add(self, pattern, key):
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        self.out[state].append((len(pattern), key))
+
+    def _build(self):
+        """BFS 로 실패 링크 연결 (실패 상태의 출력도 합쳐 둠)"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0) if self.goto[f].get(ch, 0) != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def spans(self, text):
+        """(시작, 끝, 키) 매칭 전부 (경계 검사 포함, 겹침 정리 전)"""
+        text = text.lower()
+        found = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for length, key in self.out[state]:
+                start, end = i - length + 1, i + 1
+                if _is_word(text[start]) and start > 0 and _is_word(text[start - 1]):
+                    continue
+                if _is_word(text[end - 1]) and end < len(text) and _is_word(text[end]):
+                    continue
+                found.append((start, end, key))
+        return found
+
+    def match(self, text):
+        """제목에 등장한 키 집합 (다른 매칭 안에 완전히 포함된 짧은 매칭은 제외)"""
+        found = sorted(self.spans(text), key=lambda s: (s[0], -(s[1] - s[0])))
+        keys = set()
+        cover_end = -1
+        for start, end, key in found:
+            if end <= cover_end:
+                continue
+            keys.add(key)
+            cover_end = max(cover_end, end)
+        return keys
@@ -1,106 +1,102 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import quote_plus
 from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, firestore
-import time
-import os
 import sys
-import json
 import pytz
+import storage
+import firestore_sync
+import news_fetch
+import news_archive
+import news_match
+import fetch_guard
+import symbols
 
-# 1. 파이어베이스 인증 (경로 최적화)
-JSON_PATH = r"c:\Users\gwak\Finance_Final_V2\serviceAccountKey.json"
-kst = pytz.timezone('Asia/Seoul') 
+kst = pytz.timezone('Asia/Seoul')
 
-if not firebase_admin._apps:
-    try:
-        # 1순위: 로컬 절대 경로, 2순위: 깃허브 서버(현재 폴더)
-        if os.path.exists(JSON_PATH):
-            cred = credentials.Certificate(JSON_PATH)
-            firebase_admin.initialize_app(cred)
-            print("✅ 미국뉴스: 로컬 인증 성공")
-        else:
-            cred = credentials.Certificate("serviceAccountKey.json")
-            firebase_admin.initialize_app(cred)
-            print("✅ 미국뉴스: 깃허브 서버 인증 성공")
-    except Exception as e:
-        print(f"❌ 파이어베이스 초기화 실패: {e}")
-        sys.exit(1)
-        
-db = firestore.client()
-
-# 2. 미국 주식 랭킹 데이터 가져오기 (원본 경로 유지)
-try:
-    doc = db.collection('rs_data').document('us_latest').get() 
-    if not doc.exists:
+# 묶음 검색 시 제목 매칭용 별칭 (기사 제목에 법인명 대신 자주 쓰는 이름)
+NEWS_ALIASES = {
+    'GOOGL': ['Google'], 'META': ['Facebook'], 'AMZN': ['Amazon'], 'AMD': ['AMD'],
+    'LLY': ['Lilly'], 'XOM': ['Exxon', 'ExxonMobil'], 'JPM': ['JPMorgan'], 'DIS': ['Disney'],
+    'DE': ['Deere'], 'BWXT': ['BWXT'], 'VRTX': ['Vertex'], 'REGN': ['Regeneron'],
+    'FCX': ['Freeport'], 'TLN': ['Talen'],
+}
+
+
+def load_rankings(store):
+    """RS 스테이지 결과가 메모리에 없을 때만 rs_data/us_latest 에서 읽어옴"""
+    doc = store.get(('rs_data', 'us_latest'))
+    if doc is None:
         print("❌ 미국 랭킹 데이터(us_latest)가 없습니다.")
-        sys.exit(0)
+        return None
+    return doc.get('rankings', [])
+
+
+def run(store=None, rankings=None, cancel=None):
+    """
+    미국 뉴스 스테이지
+    - rankings: rs_us.run() 결과의 rankings (없으면 파이어베이스에서 조회)
+    - cancel: manager.py 제한 시간 초과 표시 (세워져 있으면 저장 / 게시하지 않음)
+    """
+    # 1. 파이어베이스 인증
+    store = store or storage.get_store()
+
+    # 2. 미국 주식 랭킹 데이터 가져오기 (원본 경로 유지)
+    if rankings is None:
+        rankings = load_rankings(store)
+        if rankings is None:
+            return None
 
-    rankings = doc.to_dict().get('rankings', [])
     now_str = datetime.now(kst).strftime('%Y-%m-%d %H:%M')
     fields_to_add = {}
 
     print(f"🇺🇸 미국 뉴스 최신순 검색 시작 (한국시간 기준: {now_str})")
 
+    feeds, terms = {}, {}
     for item in rankings:
         code = item.get('code') or item.get('ticker')
-        name = item['name']
-        field_key = f"{code}_{name}"
-        
-        try:
-            url = f"https://news.google.com/rss/search?q={quote_plus(name)}&hl=en-US&gl=US&ceid=US:en"
-            res = requests.get(url, timeout=10)
-            soup = BeautifulSoup(res.content, "xml")
-            items = soup.find_all("item")
-
-            articles = []
-            seen_titles = set()
-            for i in items:
-                title = i.title.text.strip()
-                if title in seen_titles:
-                    continue
-                seen_titles.add(title)
-                
-                raw_date = i.pubDate.text
-                try:
-                    dt_obj = datetime.strptime(raw_date, '%a, %d %b %Y %H:%M:%S %Z')
-                    dt_obj = dt_obj.replace(tzinfo=pytz.UTC).astimezone(kst)
-                except:
-                    dt_obj = datetime.now(kst)
-
-                articles.append({
-                    "title": title,
-                    "link": i.link.text,
-                    "publisher": i.source.text if i.source else "Google News",
-                    "time": dt_obj.strftime('%Y-%m-%d %H:%M'),
-                    "dt_index": dt_obj
-                })
-
-            # 🔥 오빠 원본 정렬 로직 및 20개 유지
-            articles.sort(key=lambda x: x['dt_index'], reverse=True)
-            final_articles = articles[:20]
-
-            for a in final_articles: del a['dt_index']
-
-            fields_to_add[field_key] = {
-                "update_time": now_str,
-                "articles": final_articles
-            }
-            
-            print(f"✅ {name}({code}) 뉴스 {len(final_articles)}개 완료")
-            time.sleep(0.5)
+        name = symbols.name('us', code, item['name'])
+        feeds[f"{code}_{name}"] = news_fetch.google_news_url(name, 'en')
+        terms[f"{code}_{name}"] = [news_match.clean_name(name)] + NEWS_ALIASES.get(code, [])
 
-        except Exception as e:
-            print(f"❌ {name} 뉴스 에러: {e}")
+    if news_fetch.BATCH_SIZE > 1:
+        # 여러 종목을 OR 검색 1회로 묶고 제목으로 종목별 분배 (요청 수 1/BATCH_SIZE)
+        results = news_fetch.collect_batched(terms, 'us', 'en', cancel=cancel)
+    else:
+        results = news_fetch.collect(feeds, 'us', cancel=cancel)
+
+    for field_key, res in results.items():
+        code, name = field_key.split('_', 1)
+        if isinstance(res, BaseException):
+            print(f"❌ {name} 뉴스 에러: {res}")
+            continue
+
+        final_articles, changed = res
+        fields_to_add[field_key] = {
+            "update_time": now_str,
+            "articles": final_articles
+        }
+        if fetch_guard.is_stale(field_key):
+            fields_to_add[field_key]["stale"] = True
+        print(f"✅ {name}({code}) 뉴스 {len(final_articles)}개 완료{'' if changed else ' (변경 없음)'}")
 
     # 3. 파이어베이스 및 로컬 JSON 저장 (원본 경로 고정)
+    storage.check_cancel(cancel)
     if fields_to_add:
-        db.collection('stock_news').document('news_us').set(fields_to_add)
-        with open('news_us.json', 'w', encoding='utf-8') as f:
-            json.dump(fields_to_add, f, ensure_ascii=False, indent=2)
+        stats = firestore_sync.sync_sharded(store, 'stock_news', 'news_us', fields_to_add, now_str, keep=feeds)
+        print(f"📝 변경 {stats['written']} / 삭제 {stats['deleted']} / 유지 {stats['unchanged']} 종목, {stats['bytes'] / 1024:.1f} KB 기록")
+        storage.get_files().set(('news_us',), fields_to_add)
+
+        # 전체 기사 아카이브 (상위 목록에서 밀려나도 검색 가능, 실패해도 게시에는 영향 없음)
+        try:
+            added = news_archive.archive('us', fields_to_add)
+            print(f"🗄️ 뉴스 아카이브 신규 {added}건")
+        except Exception as e:
+            print(f"⚠️ 뉴스 아카이브 저장 실패: {e}")
         print(f"🚀 [완료] news_us 업데이트 완료 (KST 기준)")
 
-except Exception as e:
-    print(f"❌ 전체 실행 오류: {e}")
\ No newline at end of file
+    return fields_to_add
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except Exception as e:
+        print(f"❌ 전체 실행 오류: {e}")
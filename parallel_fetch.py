@@ -0,0 +1,133 @@
+import os
+import time
+import random
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import FinanceDataReader as fdr
+import price_cache
+import fetch_guard
+import metrics
+
+# =========================================================================
+# 병렬 종목 다운로드 (동시 작업 수 제한 + 호스트별 속도 제한 + 재시도)
+# - 요청마다 fetch_guard 제한 시간 / 헤지 / 차단기 적용
+#   (제한 시간 초과나 차단된 소스는 재시도하지 않고 바로 캐시 대체로 넘어감)
+# =========================================================================
+MAX_WORKERS = int(os.environ.get('FETCH_WORKERS', '8'))
+HOST_RATE_LIMITS = {   # 호스트별 초당 최대 요청 수
+    'krx': 10.0,
+    'yahoo': 5.0,
+}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5     # 재시도 대기: 0.5s, 1s, 2s ... (+지터)
+
+
+class RateLimiter:
+    """
+    토큰 버킷 방식 속도 제한
+    - rate: 초당 요청 수, burst: 순간 허용량
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def source_host(code):
+    """종목 코드로 FinanceDataReader가 접속할 업스트림 추정"""
+    code = str(code)
+    if code.isdigit() or code in ('KS11', 'KQ11', 'KS200'):
+        return 'krx'
+    return 'yahoo'
+
+
+def get_limiter(host):
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = RateLimiter(HOST_RATE_LIMITS.get(host, 5.0))
+        return _limiters[host]
+
+
+def with_retry(fetcher, host, retries=MAX_RETRIES):
+    """
+    속도 제한 + 제한 시간/헤지 + 지수 백오프 재시도를 씌운 다운로드 함수 반환
+    - 헤지 요청은 속도 제한 토큰 없이 나감 (느린 요청 1건당 최대 1회)
+    """
+    limiter = get_limiter(host)
+
+    def _fetch(code, start=None, end=None):
+        for attempt in range(retries + 1):
+            fetch_guard.check(host)
+            limiter.acquire()
+            t0 = time.perf_counter()
+            try:
+                data = fetch_guard.call(host, fetcher, code, key=code, start=start, end=end)
+                metrics.observe('fetch_seconds', time.perf_counter() - t0, host=host, key=code)
+                metrics.inc('fetch_rows', len(data) if data is not None else 0, host=host)
+                return data
+            except (fetch_guard.SourceDown, fetch_guard.DeadlineExceeded):
+                metrics.observe('fetch_seconds', time.perf_counter() - t0, host=host, key=code, error=1)
+                raise
+            except Exception:
+                metrics.observe('fetch_seconds', time.perf_counter() - t0, host=host, key=code, error=1)
+                if attempt == retries:
+                    raise
+                metrics.inc('fetch_retries', host=host, key=code)
+                time.sleep(BACKOFF_BASE * (2 ** attempt) * (1 + random.random() * 0.5))
+
+    return _fetch
+
+
+def fetch_history(code, start, end, fetcher=None):
+    """한 종목 히스토리 (캐시 + 재시도)"""
+    fetcher = with_retry(fetcher or fdr.DataReader, source_host(code))
+    return price_cache.get_history(code, start, end, fetcher=fetcher)
+
+
+def fetch_closes(codes, start, end, max_workers=MAX_WORKERS, fetcher=None):
+    """
+    여러 종목 종가를 병렬로 받아 {종목: 종가 시리즈} 로 반환
+    - 입력 순서 유지, 실패/빈 종목은 제외
+    """
+    def _one(code):
+        try:
+            data = fetch_history(code, start, end, fetcher=fetcher)
+            if data is not None and not data.empty:
+                return data['Close'].rename(code)
+        except Exception as e:
+            print(f"⚠️ {code} 다운로드 실패: {e}")
+        return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        results = list(ex.map(metrics.bind_stage(_one), codes))
+    return {code: s for code, s in zip(codes, results) if s is not None}
+
+
+def fetch_close_prices(codes, start, end, max_workers=MAX_WORKERS, fetcher=None):
+    """
+    여러 종목 종가를 병렬로 받아 하나의 프레임으로 정렬
+    - 반환값은 기존 스크립트의 close_prices(ffill 전)와 같은 형태
+    """
+    series = list(fetch_closes(codes, start, end, max_workers, fetcher).values())
+    if not series:
+        return pd.DataFrame()
+    return pd.concat(series, axis=1)
@@ -0,0 +1,242 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+import FinanceDataReader as fdr
+import fetch_guard
+
+# =========================================================================
+# 가격 히스토리 디스크 캐시 (종목별 OHLCV, 거래일 기준)
+# - .cache/prices/<종목>.csv 에 append-only로 저장
+# - 매 실행마다 마지막 캐시 날짜 이후 봉만 새로 받아서 뒤에 붙임
+# - 마지막 봉(장중 미확정 봉)은 다시 받아서 덮어씀 (로드 시 뒤쪽 값 우선)
+# - 증분 다운로드는 확정된 마지막 봉(기준 봉)부터 받아서 종가를 비교
+#   → 다르면 (액면분할 / 배당 수정주가 / 데이터 정정) 전체 재다운로드
+# - 종목별 상태 .cache/prices/<종목>.meta.json
+#   since: 마지막 전체 다운로드의 요청 시작일 (캐시 첫 봉이 그보다 늦으면 = 그 뒤에 상장, 다시 받지 않음)
+#   provisional: 미확정 봉 날짜 (장중에 받은 당일 봉 / 장 마감 전 시세표 봉) → 다음 실행이 다시 받음
+# =========================================================================
+PRICE_CACHE_DIR = os.path.join('.cache', 'prices')
+COMPACT_THRESHOLD = 20  # 중복 행이 이만큼 쌓이면 파일을 정리해서 다시 씀
+REVALIDATE_RTOL = 1e-6  # 기준 봉 종가 비교 허용 오차 (CSV 왕복 반올림)
+
+
+def _cache_path(code):
+    safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(code))
+    return os.path.join(PRICE_CACHE_DIR, f"{safe}.csv")
+
+
+def _meta_path(code):
+    return _cache_path(code)[:-len('.csv')] + '.meta.json'
+
+
+def _load_meta(code):
+    try:
+        with open(_meta_path(code), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_meta(code, meta):
+    os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+    path = _meta_path(code)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(path + '.tmp', path)
+
+
+def _provisional(last_date, end_ts):
+    """요청 종료일 당일 봉은 장중 값일 수 있음 (그 전 날짜 봉은 확정)"""
+    return last_date.strftime('%Y-%m-%d') if last_date >= end_ts.normalize() else None
+
+
+def load_cached(code):
+    """
+    캐시된 OHLCV 로드
+    - 같은 날짜가 여러 번 붙어 있으면 마지막 값 사용
+    - 캐시가 없거나 깨졌으면 None
+    """
+    path = _cache_path(code)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_csv(path, index_col='Date', parse_dates=['Date'])
+    except Exception:
+        return None
+    if df.empty:
+        return None
+
+    dup = df.index.duplicated(keep='last')
+    if dup.any():
+        df = df[~dup]
+        if dup.sum() >= COMPACT_THRESHOLD:
+            df.to_csv(path, index_label='Date')
+    return df.sort_index()
+
+
+def _append(code, new_rows, columns=None):
+    os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+    path = _cache_path(code)
+    if columns is not None:
+        new_rows = new_rows.reindex(columns=columns)
+    new_rows.to_csv(path, mode='a', header=not os.path.exists(path), index_label='Date')
+
+
+def _normalize(data):
+    data.index = pd.to_datetime(data.index).tz_localize(None)
+    data.index.name = 'Date'
+    return data
+
+
+def _download_full(code, start, end_ts, fetcher):
+    """전체 구간 다운로드 후 캐시 파일 교체 (since = 요청 시작일)"""
+    data = fetcher(code, start=start, end=end_ts.strftime('%Y-%m-%d'))
+    if data is not None and not data.empty:
+        data = _normalize(data)
+        path = _cache_path(code)
+        if os.path.exists(path):
+            os.remove(path)
+        _append(code, data)
+        _save_meta(code, {"since": pd.Timestamp(start).strftime('%Y-%m-%d'),
+                          "provisional": _provisional(data.index[-1], end_ts)})
+    return data
+
+
+def _same_close(a, b):
+    return bool(np.isclose(a, b, rtol=REVALIDATE_RTOL, equal_nan=True))
+
+
+def get_history(code, start, end, fetcher=None):
+    """
+    종목 가격 히스토리 조회 (캐시 우선)
+    - 캐시가 start 이전부터 있으면(또는 그 뒤에 상장한 게 확인됐으면) 기준 봉부터만 새로 다운로드
+      기준 봉 = 확정된 마지막 봉, 새로 받은 값과 종가가 다르면 수정주가 반영으로 보고 전체 재다운로드
+    - 캐시가 없거나 start보다 늦게 시작하면 전체 구간 다운로드
+    - 업스트림 실패 시 캐시된 데이터로 대체 + fetch_guard 에 stale 로 기록 (캐시도 없으면 예외 전달)
+    """
+    fetcher = fetcher or fdr.DataReader
+    start_ts = pd.Timestamp(start)
+    end_ts = pd.Timestamp(end)
+    cached = load_cached(code)
+    meta = _load_meta(code) if cached is not None else {}
+
+    def _fallback(e, what):
+        if cached is None:
+            raise e
+        if not isinstance(e, fetch_guard.SourceDown):   # 차단된 소스는 한 번만 알림
+            print(f"⚠️ {code} {what} 실패, 캐시 사용: {e}")
+        fetch_guard.mark_stale(code)
+        return cached[(cached.index >= start_ts) & (cached.index <= end_ts)]
+
+    listed_after = meta.get('since') and pd.Timestamp(meta['since']) <= start_ts
+    if cached is None or (cached.index[0] > start_ts + timedelta(days=7) and not listed_after):
+        try:
+            return _download_full(code, start, end_ts, fetcher)
+        except Exception as e:
+            return _fallback(e, "다운로드")
+
+    # 기준 봉: 미확정 봉이면 그 전 봉 (미확정 봉은 기준 봉부터 다시 받아서 덮어씀)
+    anchor = cached.index[-1]
+    if meta.get('provisional') == anchor.strftime('%Y-%m-%d') and len(cached) >= 2:
+        anchor = cached.index[-2]
+    if anchor <= end_ts:
+        try:
+            delta = fetcher(code, start=anchor.strftime('%Y-%m-%d'), end=end)
+            if delta is not None and not delta.empty:
+                delta = _normalize(delta)
+                delta = delta[delta.index >= anchor]
+                if anchor in delta.index and not _same_close(delta.at[anchor, 'Close'], cached.at[anchor, 'Close']):
+                    print(f"♻️ {code} {anchor:%Y-%m-%d} 종가 변경 (수정주가 / 정정) → 전체 재다운로드")
+                    full = _download_full(code, start, end_ts, fetcher)
+                    if full is not None and not full.empty:
+                        return full
+                else:
+                    _append(code, delta, columns=cached.columns)
+                    cached = pd.concat([cached[cached.index < anchor], delta.reindex(columns=cached.columns)])
+                    _save_meta(code, dict(meta, provisional=_provisional(cached.index[-1], end_ts)))
+        except Exception as e:
+            return _fallback(e, "증분 다운로드")
+
+    return cached[(cached.index >= start_ts) & (cached.index <= end_ts)]
+
+
+def last_cached_date(code):
+    """캐시 마지막 날짜 (파일 끝 줄만 읽음, 없으면 None)"""
+    path = _cache_path(code)
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 256))
+            last_line = f.read().splitlines()[-1].decode('utf-8')
+        return pd.Timestamp(last_line.split(',', 1)[0])
+    except Exception:
+        return None
+
+
+def _last_close(code, columns):
+    """캐시 마지막 줄의 종가 (파일 끝만 읽음, 못 읽으면 None)"""
+    try:
+        with open(_cache_path(code), 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 256))
+            last_line = f.read().splitlines()[-1].decode('utf-8')
+        return float(last_line.split(',')[1 + columns.index('Close')])
+    except Exception:
+        return None
+
+
+def append_snapshot(date, snapshot, prev_session, final=False, prev_close=None):
+    """
+    전 종목 시세 스냅샷(한 번의 벌크 다운로드)으로 당일 봉 추가 (같은 날 다시 받으면 덮어씀)
+    - snapshot: 종목코드 인덱스, Open/High/Low/Close/Volume 컬럼
+    - final: 장 마감 뒤 스냅샷인지 (아니면 당일 봉을 미확정으로 기록 → 다음에 다시 받음)
+    - prev_close: 시세표 기준 전일 종가 (종목코드 인덱스, 선택) — 캐시와 다르면 수정주가 반영이
+      필요하므로 개별 다운로드로 넘김
+    - 캐시가 직전 거래일(prev_session)까지 확정된 종목만 반영
+      (직전 거래일 봉이 장중 스냅샷 그대로면 개별 다운로드로 다시 받아야 함)
+    - 반환: 반영된 종목 코드 리스트 (나머지는 개별 다운로드 필요)
+    """
+    date = pd.Timestamp(date)
+    prev_session = pd.Timestamp(prev_session)
+    day = date.strftime('%Y-%m-%d')
+    updated = []
+    for code, row in snapshot.iterrows():
+        last = last_cached_date(code)
+        if last is None or last < prev_session or last > date:
+            continue
+        meta = _load_meta(code)
+        if last < date and meta.get('provisional') == last.strftime('%Y-%m-%d'):
+            continue
+        with open(_cache_path(code), 'r', encoding='utf-8') as f:
+            cached_cols = f.readline().strip().split(',')[1:]
+        if prev_close is not None and last == prev_session and code in prev_close.index:
+            if not _same_close(_last_close(code, cached_cols), prev_close[code]):
+                continue
+        bar = pd.DataFrame([row.values], index=pd.DatetimeIndex([date], name='Date'), columns=row.index)
+        _append(code, bar, columns=cached_cols)
+        _save_meta(code, dict(meta, provisional=None if final else day))
+        updated.append(code)
+    return updated
+
+
+def load_closes(codes, start, end):
+    """캐시에서만 종가 시리즈 dict 구성 (네트워크 없음, 캐시 없는 종목 제외)"""
+    out = {}
+    start_ts, end_ts = pd.Timestamp(start), pd.Timestamp(end)
+    for code in codes:
+        df = load_cached(code)
+        if df is None:
+            continue
+        s = df['Close']
+        out[code] = s[(s.index >= start_ts) & (s.index <= end_ts)].rename(code)
+    return out
+
+
+def load_close_prices(codes, start, end):
+    """캐시에서만 종가 프레임 구성 (네트워크 없음)"""
+    series = list(load_closes(codes, start, end).values())
+    if not series:
+        return pd.DataFrame()
+    return pd.concat(series, axis=1)
@@ -0,0 +1,248 @@
+import os
+import json
+import bisect
+import threading
+import numpy as np
+import pandas as pd
+import market_calendar
+
+# =========================================================================
+# 거래일 x 종목 float32 가격 행렬 (디스크 memmap)
+# - 행: market_calendar 거래소 달력 (한국/미국 휴장일이 섞이지 않음)
+# - 열: 종목 코드 → 열 번호
+# - 행/열 모두 여유 용량을 잡아 둠 → 하루 추가 / 종목 추가는 빈 칸에 쓰기만 (전체 복사 없음)
+#   용량이 차면 2배로 늘림 (행은 파일 끝에 붙이기, 열은 그때만 재배치)
+# - 파일: .cache/matrix/<market>/close.f32 (행 우선) + meta.json
+# - RS / 지표 코드는 arrays() 로 pandas 없이 바로 NumPy 배열을 받음
+# - 스테이지들은 shared() 로 시장별 인스턴스 하나를 같이 쓰고 pm.lock 안에서 읽기/쓰기
+#   (인스턴스를 따로 열면 열 재배치 os.replace 후 옛 파일에 쓴 값이 사라지고,
+#    meta.json 을 서로 덮어써서 데이터 파일과 어긋남)
+# =========================================================================
+MATRIX_DIR = os.path.join('.cache', 'matrix')
+DTYPE = np.float32
+MIN_ROW_CAP = 512
+MIN_COL_CAP = 128
+
+
+def _ffill(a):
+    """NaN 을 위쪽(이전 날짜) 값으로 채움 (축 0, 새 배열 반환, 맨 앞 NaN 은 그대로)"""
+    mask = np.isnan(a)
+    if not mask.any():
+        return a.copy()
+    idx = np.where(~mask, np.arange(a.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return a[idx, np.arange(a.shape[1])[None, :]]
+
+
+class PriceMatrix:
+    """
+    market 별 가격 행렬
+    - dates: 거래일 문자열 리스트 (행 순서), tickers: 종목 리스트 (열 순서)
+    - data: (row_cap, col_cap) memmap, 유효 영역은 [:n_rows, :n_cols]
+    """
+
+    def __init__(self, market, root=MATRIX_DIR):
+        self.market = market
+        self.dir = os.path.join(root, market)
+        self.data_path = os.path.join(self.dir, 'close.f32')
+        self.meta_path = os.path.join(self.dir, 'meta.json')
+        self.dates, self.tickers = [], []
+        self.row_cap, self.col_cap = 0, 0
+        self.data = None
+        self.lock = threading.RLock()
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.dates, self.tickers = meta['dates'], meta['tickers']
+            self.row_cap, self.col_cap = meta['row_cap'], meta['col_cap']
+            self._map()
+        self.row_of = {d: i for i, d in enumerate(self.dates)}
+        self.col_of = {t: j for j, t in enumerate(self.tickers)}
+
+    # ---------------------------------------------------------------------
+    # 저장 공간
+    # ---------------------------------------------------------------------
+    @property
+    def n_rows(self):
+        return len(self.dates)
+
+    @property
+    def n_cols(self):
+        return len(self.tickers)
+
+    def _map(self):
+        self.data = np.memmap(self.data_path, dtype=DTYPE, mode='r+', shape=(self.row_cap, self.col_cap))
+
+    def _allocate(self, row_cap, col_cap):
+        """새 용량으로 파일 준비 (행만 늘면 파일 뒤에 붙이고, 열이 늘면 재배치)"""
+        os.makedirs(self.dir, exist_ok=True)
+        if self.data is None:
+            self.row_cap, self.col_cap = row_cap, col_cap
+            np.full((row_cap, col_cap), np.nan, dtype=DTYPE).tofile(self.data_path)
+            self._map()
+            return
+
+        if col_cap == self.col_cap:
+            # 행 우선 배치라 기존 바이트는 그대로, 파일 끝에 NaN 행만 추가
+            self.data.flush()
+            del self.data
+            with open(self.data_path, 'ab') as f:
+                np.full((row_cap - self.row_cap, col_cap), np.nan, dtype=DTYPE).tofile(f)
+            self.row_cap = row_cap
+            self._map()
+            return
+
+        # 열 용량 증가: 이때만 전체 재배치
+        old = np.array(self.data[:self.n_rows, :self.n_cols])
+        del self.data
+        tmp = self.data_path + '.tmp'
+        grown = np.memmap(tmp, dtype=DTYPE, mode='w+', shape=(row_cap, col_cap))
+        grown[:] = np.nan
+        grown[:old.shape[0], :old.shape[1]] = old
+        grown.flush()
+        del grown
+        os.replace(tmp, self.data_path)
+        self.row_cap, self.col_cap = row_cap, col_cap
+        self._map()
+
+    def _ensure(self, n_rows, n_cols):
+        row_cap, col_cap = self.row_cap, self.col_cap
+        if n_rows > row_cap:
+            row_cap = max(MIN_ROW_CAP, row_cap * 2, n_rows)
+        if n_cols > col_cap:
+            col_cap = max(MIN_COL_CAP, col_cap * 2, n_cols)
+        if (row_cap, col_cap) != (self.row_cap, self.col_cap) or self.data is None:
+            self._allocate(row_cap, col_cap)
+
+    def save(self):
+        os.makedirs(self.dir, exist_ok=True)
+        if self.data is not None:
+            self.data.flush()
+        meta = {"dates": self.dates, "tickers": self.tickers,
+                "row_cap": self.row_cap, "col_cap": self.col_cap}
+        with open(self.meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(self.meta_path + '.tmp', self.meta_path)
+
+    # ---------------------------------------------------------------------
+    # 행 (거래일) / 열 (종목) 추가
+    # ---------------------------------------------------------------------
+    def extend_calendar(self, start, end):
+        """거래소 달력으로 end 까지 행 추가 (start 는 행렬이 비어 있을 때만 사용)"""
+        first = self.dates[-1] if self.dates else start
+        new_days = [d.strftime('%Y-%m-%d') for d in market_calendar.trading_days(self.market, first, end)]
+        new_days = [d for d in new_days if d not in self.row_of]
+        if not new_days:
+            return 0
+        self._ensure(self.n_rows + len(new_days), max(self.n_cols, 1))
+        for d in new_days:
+            self.row_of[d] = len(self.dates)
+            self.dates.append(d)
+        return len(new_days)
+
+    def add_tickers(self, codes):
+        new = [c for c in dict.fromkeys(codes) if c not in self.col_of]
+        if not new:
+            return 0
+        self._ensure(max(self.n_rows, 1), self.n_cols + len(new))
+        for c in new:
+            self.col_of[c] = len(self.tickers)
+            self.tickers.append(c)
+        return len(new)
+
+    def write_series(self, code, series):
+        """
+        종가 시리즈를 달력 행에 맞춰 기록 (달력에 없는 날짜 = 휴장일 데이터는 버림)
+        반환: 기록한 행 수
+        """
+        self.add_tickers([code])
+        if series is None or len(series) == 0:
+            return 0
+        dates = pd.DatetimeIndex(series.index).strftime('%Y-%m-%d')
+        rows = np.array([self.row_of.get(d, -1) for d in dates])
+        ok = rows >= 0
+        self.data[rows[ok], self.col_of[code]] = np.asarray(series, dtype=DTYPE)[ok]
+        return int(ok.sum())
+
+    def set_day(self, date, prices):
+        """하루치 가격 기록 (prices: {종목: 가격}) — 장중 스냅샷 / 벌크 시세표 반영용"""
+        row = self.row_of.get(date)
+        if row is None:
+            return 0
+        self.add_tickers(list(prices))
+        cols = np.array([self.col_of[c] for c in prices])
+        self.data[row, cols] = np.fromiter(prices.values(), dtype=DTYPE, count=len(prices))
+        return len(prices)
+
+    # ---------------------------------------------------------------------
+    # 읽기
+    # ---------------------------------------------------------------------
+    def view(self):
+        """유효 영역 memmap 뷰 (복사 없음, 날짜 x 종목)"""
+        return self.data[:self.n_rows, :self.n_cols]
+
+    def columns(self, codes):
+        return np.array([self.col_of[c] for c in codes if c in self.col_of], dtype=int)
+
+    def arrays(self, codes, index_code, start=None):
+        """
+        RS / 지표 계산용 입력 (pandas 없음)
+        - index_code: 지수 1개 또는 벤치마크 리스트 (리스트면 지수도 (날짜, 벤치마크))
+        - 지수도 종목도 값이 없는 행(달력에 없는 휴장일 / 아직 안 온 날) 제외
+        - 남은 결측은 직전 값으로 채움 (지수 포함)
+        반환: (날짜 리스트, (날짜, 종목) float64 가격, (날짜,) 지수, 종목 리스트)
+        """
+        codes = [c for c in codes if c in self.col_of]
+        single = isinstance(index_code, str)
+        index_cols = [self.col_of[c] for c in ([index_code] if single else index_code)]
+        r0 = bisect.bisect_left(self.dates, start) if start is not None else 0
+        block = self.data[r0:self.n_rows]
+        index = np.asarray(block[:, index_cols], dtype=float)
+        prices = np.asarray(block[:, self.columns(codes)], dtype=float)
+        keep = ~np.isnan(index).all(axis=1) | ~np.isnan(prices).all(axis=1)
+        prices = _ffill(prices[keep])
+        index = _ffill(index[keep])
+        if single:
+            index = index[:, 0]
+        dates = [d for d, ok in zip(self.dates[r0:], keep) if ok]
+        return dates, prices, index, codes
+
+    def frame(self, codes, index_code, start=None):
+        """기존 코드 호환용 (종가 DataFrame, 지수 Series 또는 벤치마크 DataFrame) — arrays() 결과를 감싼 것"""
+        dates, prices, index, codes = self.arrays(codes, index_code, start)
+        idx = pd.DatetimeIndex(dates, name='Date')
+        if isinstance(index_code, str):
+            bench = pd.Series(index, index=idx, name=index_code)
+        else:
+            bench = pd.DataFrame(index, index=idx, columns=list(index_code))
+        return pd.DataFrame(prices, index=idx, columns=codes), bench
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared(market, root=MATRIX_DIR):
+    """(시장, 폴더)별 프로세스 공용 인스턴스 (읽기/쓰기는 pm.lock 안에서)"""
+    key = (market, os.path.abspath(root))
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = PriceMatrix(market, root)
+        return _shared[key]
+
+
+def update(market, closes, start, end, root=MATRIX_DIR):
+    """
+    다운로드 결과를 행렬에 반영하고 저장 (공용 인스턴스, 잠금 안에서)
+    - closes: {종목: 종가 시리즈}
+    - root: 행렬 폴더 (백테스트용 장기 행렬은 따로 둠)
+    반환: PriceMatrix
+    """
+    pm = shared(market, root)
+    with pm.lock:
+        pm.extend_calendar(start, end)
+        pm.add_tickers(list(closes))
+        for code, series in closes.items():
+            pm.write_series(code, series)
+        pm.save()
+    return pm
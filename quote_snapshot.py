@@ -0,0 +1,136 @@
+import os
+import json
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import FinanceDataReader as fdr
+import fetch_guard
+import metrics
+
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
+
+# =========================================================================
+# 최신 시세 스냅샷 (지수 / 선물 / 환율 / 금리)
+# - 전체 히스토리 대신 최근 구간만, 가능하면 여러 종목을 한 번에 요청
+# - 직전 종가를 .cache/quotes/prev_close.json 에 보관 → 새 데이터 1개로 등락률 계산
+# - 다운로드는 fetch_guard 제한 시간 아래에서, 못 받은 심볼은 캐시 값으로 대체 (stale 표시)
+# =========================================================================
+QUOTE_CACHE_PATH = os.path.join('.cache', 'quotes', 'prev_close.json')
+QUOTE_HOST = 'yahoo'
+BATCH_DEADLINE = 20       # 일괄 다운로드 제한 시간 (심볼이 많아서 개별 요청보다 길게)
+WINDOW_DAYS = 10          # 개별 다운로드 시 조회 구간 (주말/휴장 포함 여유)
+FALLBACK_WORKERS = 8
+
+
+def load_cache():
+    try:
+        with open(QUOTE_CACHE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_cache(cache):
+    os.makedirs(os.path.dirname(QUOTE_CACHE_PATH), exist_ok=True)
+    with open(QUOTE_CACHE_PATH + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2)
+    os.replace(QUOTE_CACHE_PATH + '.tmp', QUOTE_CACHE_PATH)
+
+
+def _batch_download(symbols, period, aliases=None):
+    """yfinance 일괄 다운로드 → {심볼: 종가 시리즈} (aliases: 심볼 → yahoo 심볼)"""
+    aliases = aliases or {}
+    yahoo = [aliases.get(s, s) for s in symbols]
+    df = yf.download(yahoo, period=period, interval='1d', progress=False,
+                     auto_adjust=False, group_by='column', threads=True)
+    close = df['Close']
+    if isinstance(close, pd.Series):
+        close = close.to_frame(yahoo[0])
+    return {s: close[y].dropna() for s, y in zip(symbols, yahoo) if y in close.columns}
+
+
+def _window_download(symbols):
+    """심볼별 최근 구간만 병렬 다운로드 (yfinance 실패/미설치 시)"""
+    start = (datetime.now() - timedelta(days=WINDOW_DAYS)).strftime('%Y-%m-%d')
+
+    def _one(symbol):
+        t0 = time.perf_counter()
+        try:
+            close = fetch_guard.call(QUOTE_HOST, fdr.DataReader, symbol, key=symbol, start=start)['Close'].dropna()
+            metrics.observe('fetch_seconds', time.perf_counter() - t0, host='fdr', key=symbol)
+            return symbol, close
+        except Exception:
+            metrics.observe('fetch_seconds', time.perf_counter() - t0, host='fdr', key=symbol, error=1)
+            return symbol, None
+
+    with ThreadPoolExecutor(max_workers=FALLBACK_WORKERS) as ex:
+        return {s: c for s, c in ex.map(metrics.bind_stage(_one), symbols) if c is not None}
+
+
+def _download(symbols, period, aliases=None):
+    """일괄 다운로드 우선, 빠진 심볼만 개별 조회 → {심볼: 종가 시리즈}"""
+    closes = {}
+    if yf is not None:
+        try:
+            with metrics.timed('fetch_seconds', host=QUOTE_HOST, key='batch'):
+                closes = fetch_guard.call(QUOTE_HOST, _batch_download, symbols, period, aliases,
+                                          key='batch', deadline=BATCH_DEADLINE, hedge=False)
+        except Exception as e:
+            print(f"⚠️ 일괄 시세 조회 실패, 개별 조회로 전환: {e}")
+    missing = [s for s in symbols if s not in closes or closes[s].empty]
+    if missing and not fetch_guard.is_open(QUOTE_HOST):
+        closes.update(_window_download(missing))
+    return closes
+
+
+def last_prices(symbols, aliases=None):
+    """
+    심볼별 최신가 (장중이면 현재가) → {심볼: 가격}
+    - 장중 증분 RS 용: 히스토리 없이 마지막 봉 하나만 필요
+    - aliases: 일괄 조회에서만 이름이 다른 심볼 (KRX '005930' → '005930.KS', 개별 조회는 원래 심볼)
+    """
+    closes = _download(list(symbols), '1d', aliases)
+    return {s: float(c.iloc[-1]) for s, c in closes.items() if c is not None and not c.empty}
+
+
+def get_quotes(symbols):
+    """
+    반환: {심볼: (현재가, 직전 종가)}
+    - 캐시에 직전 종가가 있으면 최신 봉 1개만 있어도 계산
+    - 이번에 못 받은 심볼은 캐시의 마지막 값으로 대체하고 fetch_guard 에 stale 로 기록
+    """
+    cache = load_cache()
+    period = '2d' if all(s in cache for s in symbols) else '5d'
+    closes = _download(symbols, period)
+
+    quotes = {}
+    for symbol in symbols:
+        series = closes.get(symbol)
+        if series is None or series.empty:
+            entry = cache.get(symbol, {})
+            if 'last' in entry and 'prev' in entry:
+                quotes[symbol] = (entry['last'], entry['prev'])
+                fetch_guard.mark_stale(symbol)
+            continue
+        last_date = series.index[-1].strftime('%Y-%m-%d')
+        cur = float(series.iloc[-1])
+        entry = cache.get(symbol, {})
+
+        if len(series) >= 2:
+            prev = float(series.iloc[-2])
+        elif entry.get('last_date') and entry['last_date'] < last_date:
+            prev = entry['last']          # 캐시의 마지막 봉이 곧 직전 종가
+        elif entry.get('last_date') == last_date and 'prev' in entry:
+            prev = entry['prev']          # 같은 봉 갱신 (장중)
+        else:
+            continue
+
+        cache[symbol] = {'last_date': last_date, 'last': cur, 'prev': prev}
+        quotes[symbol] = (cur, prev)
+
+    save_cache(cache)
+    return quotes
@@ -0,0 +1,253 @@
+import numpy as np
+import pandas as pd
+
+# =========================================================================
+# 공용 RS 엔진 (한국/미국 공통)
+# - 가격 행렬(날짜 x 종목) 한 장으로 모든 기간 수익률, 초과수익률,
+#   백분위 점수, 가중평균, MA50 이격도를 NumPy 연산 한 번에 계산
+# - 종목별/행별 파이썬 루프 없음 → 종목 수천 개도 그대로 처리
+# - 지수를 (날짜, 벤치마크) 2차원으로 주면 벤치마크 축 하나만 늘어남
+#   (벤치마크, 기간, 종목) 초과수익률을 한 번에 계산
+#   · 종목 간 순위는 어느 지수를 빼도 같으므로 벤치마크별 점수는
+#     기간마다 (벤치마크 x 종목) 전체를 한 줄로 모아 순위 → 지수끼리 비교 가능한 점수
+#   · home: 종목별 소속 지수 번호 → 각자 자기 지수 대비 초과수익률로 종목 간 순위
+# =========================================================================
+MA_WINDOW = 50
+
+
+def pct_rank(values):
+    """
+    마지막 축 기준 백분위 순위 (pandas rank(pct=True, method='average')와 동일)
+    - 동점은 평균 순위, NaN은 NaN 유지 (분모는 유효 값 개수)
+    """
+    v = np.asarray(values, dtype=float)
+    shape = v.shape
+    v2 = v.reshape(-1, shape[-1])
+    rows, n = v2.shape
+    if n == 0:
+        return v.copy()
+
+    nan = np.isnan(v2)
+    filled = np.where(nan, np.inf, v2)
+    order = np.argsort(filled, axis=1, kind='mergesort')
+    sorted_v = np.take_along_axis(filled, order, axis=1)
+
+    # 정렬된 값이 바뀌는 지점 = 새 동점 그룹 (각 행의 첫 칸은 항상 새 그룹)
+    new_grp = np.ones((rows, n), dtype=bool)
+    new_grp[:, 1:] = sorted_v[:, 1:] != sorted_v[:, :-1]
+    flat_new = new_grp.ravel()
+    gid = np.cumsum(flat_new) - 1
+    pos = np.tile(np.arange(1, n + 1, dtype=float), rows)
+    first = pos[flat_new]
+    counts = np.bincount(gid)
+    avg_rank = (first + (counts - 1) / 2.0)[gid].reshape(rows, n)
+
+    ranks = np.empty_like(avg_rank)
+    np.put_along_axis(ranks, order, avg_rank, axis=1)
+    valid = (~nan).sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pct = ranks / valid
+    pct[nan] = np.nan
+    return pct.reshape(shape)
+
+
+def to_score(pct):
+    """백분위(0~1] → 1~99점"""
+    return np.round(pct * 98 + 1)
+
+
+def _weighted(scores, weights):
+    """(..., 기간, 종목) 점수 → (..., 종목) 가중평균 (NaN 기간은 0으로 취급)"""
+    return np.round(np.nansum(scores * weights[:, None], axis=-2))
+
+
+def _excess_scores(ret_stock, ret_index, ok, weights, home=None):
+    """
+    ret_stock: (기간, 종목), ret_index: (벤치마크, 기간)
+    반환 dict
+    - scores: (기간, 종목) / avg: (종목,) — 기본 지수(0번) 대비
+    - 벤치마크가 2개 이상이면 bench_avg: (벤치마크, 종목) 통합 순위 점수
+    - home 이 있으면 home_avg: (종목,) 소속 지수 대비 점수
+    """
+    excess = ret_stock[None, :, :] - ret_index[:, :, None]     # (벤치마크, 기간, 종목)
+    excess[:, ~ok] = np.nan
+    scores = to_score(pct_rank(excess[0]))
+    out = {"scores": scores, "avg": _weighted(scores, weights)}
+
+    n_bench, n_periods, n_tickers = excess.shape
+    if n_bench > 1:
+        pooled = excess.transpose(1, 0, 2).reshape(n_periods, n_bench * n_tickers)
+        bench = to_score(pct_rank(pooled)).reshape(n_periods, n_bench, n_tickers).transpose(1, 0, 2)
+        out["bench_avg"] = _weighted(bench, weights)
+    if home is not None:
+        own = np.take_along_axis(excess, np.asarray(home, dtype=int)[None, None, :], axis=0)[0]
+        out["home_avg"] = _weighted(to_score(pct_rank(own)), weights)
+    return out
+
+
+def compute_rs(prices, index, periods, weights=None, home=None):
+    """
+    prices: (날짜, 종목) 가격 행렬
+    index: (날짜,) 지수 가격 또는 (날짜, 벤치마크) 여러 지수 (0번이 기본 지수)
+    home: (종목,) 종목별 소속 지수 번호 (index 가 2차원일 때만)
+    반환 dict
+    - scores: (기간, 종목) 1~99점 (데이터 부족 기간은 NaN)
+    - avg: (종목,) 가중평균 점수 (NaN 기간은 0으로 취급, 기존 산식과 동일)
+    - disparity: (종목,) MA50 이격도(%)
+    - index_ret: (기간,) 기본 지수 수익률(%)
+    - bench_avg: (벤치마크, 종목) 벤치마크별 점수 (벤치마크 2개 이상일 때)
+    - home_avg: (종목,) 소속 지수 대비 점수 (home 을 줬을 때)
+    """
+    prices = np.asarray(prices, dtype=float)
+    index = np.asarray(index, dtype=float)
+    periods = np.asarray(periods, dtype=int)
+    n_days, n_tickers = prices.shape
+    bench = index.reshape(n_days, -1)
+    if weights is None:
+        weights = np.full(len(periods), 1.0 / len(periods))
+    weights = np.asarray(weights, dtype=float)
+
+    ok = periods + 1 <= n_days
+    past_idx = np.where(ok, n_days - 1 - periods, n_days - 1)
+
+    # 기간별 과거 가격을 한 번에 뽑아서 (기간, 종목) 수익률 계산
+    p_now = prices[-1]
+    p_past = prices[past_idx]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ret_stock = p_now / p_past - 1
+        ret_index = (bench[-1] / bench[past_idx] - 1).T     # (벤치마크, 기간)
+
+    # ✅ 초과수익률 (단순 뺄셈) → 벤치마크 전체를 한 번에 순위
+    res = _excess_scores(ret_stock, ret_index, ok, weights, home)
+
+    if n_days >= MA_WINDOW:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            disparity = (p_now / prices[-MA_WINDOW:].mean(axis=0) - 1) * 100
+    else:
+        disparity = np.full(n_tickers, np.nan)
+
+    res["disparity"] = np.round(disparity, 1)
+    res["index_ret"] = np.where(ok, np.round(ret_index[0] * 100, 1), 0.0)
+    return res
+
+
+def rs_frame(close_prices, index_prices, periods, weights=None, home=None):
+    """
+    DataFrame 입출력 래퍼
+    - index_prices: Series (지수 1개) 또는 DataFrame (컬럼 = 벤치마크, 첫 컬럼이 기본 지수)
+    - home: (종목,) 소속 지수 번호 (index_prices 컬럼 순서 기준)
+    - 반환: 종목 인덱스, RS_{p}D / W_RS_Avg (Int64), Disparity(%) (float)
+      벤치마크가 여러 개면 W_RS_{벤치마크}, home 이 있으면 W_RS_Home (Int64) 컬럼 추가
+    """
+    res = compute_rs(close_prices.to_numpy(dtype=float), index_prices.to_numpy(dtype=float), periods, weights, home)
+    benchmarks = list(index_prices.columns) if index_prices.ndim == 2 else None
+    return result_frame(res, close_prices.columns, periods, benchmarks)
+
+
+def result_frame(res, codes, periods, benchmarks=None):
+    """compute_rs / IncrementalRS.update 결과 → rs_frame 과 같은 DataFrame"""
+    rs_df = pd.DataFrame(index=codes)
+    for i, p in enumerate(periods):
+        rs_df[f'RS_{p}D'] = pd.array(res['scores'][i], dtype='Float64').round(0).astype('Int64')
+    rs_df['W_RS_Avg'] = pd.array(res['avg'], dtype='Float64').astype('Int64')
+    rs_df['Disparity(%)'] = res['disparity']
+    if 'bench_avg' in res:
+        for b, name in enumerate(benchmarks):
+            rs_df[f'W_RS_{name}'] = pd.array(res['bench_avg'][b], dtype='Float64').astype('Int64')
+    if 'home_avg' in res:
+        rs_df['W_RS_Home'] = pd.array(res['home_avg'], dtype='Float64').astype('Int64')
+    return rs_df
+
+
+def bench_scores(row, benchmarks):
+    """rs_frame 행 → {벤치마크: 가중평균 점수} (벤치마크 1개면 빈 dict)"""
+    if len(benchmarks) < 2:
+        return {}
+    return {b: int(row[f'W_RS_{b}']) for b in benchmarks if f'W_RS_{b}' in row and not pd.isna(row[f'W_RS_{b}'])}
+
+
+class IncrementalRS:
+    """
+    장중 증분 RS (오늘 현재가만 바뀌는 상황)
+    - 생성 시 어제까지의 히스토리에서 기간별 과거 가격(앵커)과 MA50 의 앞 49일 합을 한 번만 뽑아 둠
+    - update(현재가 벡터) 는 히스토리를 다시 보지 않고 O(종목) 연산 + 순위 정렬 1번
+    - 결과는 compute_rs(히스토리 + 오늘 행) 과 같음 (index 가 2차원이면 벤치마크 축 포함)
+    """
+
+    def __init__(self, prices, index, periods, weights=None, home=None):
+        prices = np.asarray(prices, dtype=float)
+        index = np.asarray(index, dtype=float)
+        n_days = prices.shape[0]          # 오늘 행을 붙이면 n_days + 1
+        self.periods = np.asarray(periods, dtype=int)
+        if weights is None:
+            weights = np.full(len(self.periods), 1.0 / len(self.periods))
+        self.weights = np.asarray(weights, dtype=float)
+
+        self.ok = self.periods <= n_days
+        past_idx = np.where(self.ok, n_days - self.periods, n_days - 1)
+        self.home = home
+        bench = index.reshape(n_days, -1)
+        self.anchor = prices[past_idx]            # (기간, 종목)
+        self.index_anchor = bench[past_idx]       # (기간, 벤치마크)
+        self.last = prices[-1].copy()             # 현재가가 없는 종목은 전일 종가 (ffill)
+        self.index_last = bench[-1].copy()        # (벤치마크,)
+        k = MA_WINDOW - 1
+        self.ma_sum = prices[-k:].sum(axis=0) if n_days >= k else None
+
+    def update(self, live, live_index=None):
+        """
+        live: (종목,) 현재가 (NaN 은 전일 종가)
+        live_index: 지수 현재가 (벤치마크 축이면 (벤치마크,) 배열, NaN 은 전일 종가)
+        반환: compute_rs 와 같은 dict
+        """
+        live = np.asarray(live, dtype=float)
+        p_now = np.where(np.isnan(live), self.last, live)
+        if live_index is None:
+            i_now = self.index_last
+        else:
+            live_index = np.asarray(live_index, dtype=float).reshape(-1)
+            i_now = np.where(np.isnan(live_index), self.index_last, live_index)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ret_stock = p_now / self.anchor - 1
+            ret_index = (i_now / self.index_anchor - 1).T
+        res = _excess_scores(ret_stock, ret_index, self.ok, self.weights, self.home)
+
+        if self.ma_sum is not None:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                disparity = (p_now / ((self.ma_sum + p_now) / MA_WINDOW) - 1) * 100
+        else:
+            disparity = np.full(len(p_now), np.nan)
+
+        res["disparity"] = np.round(disparity, 1)
+        res["index_ret"] = np.where(self.ok, np.round(ret_index[0] * 100, 1), 0.0)
+        return res
+
+
+def compute_rs_series(prices, index, periods, weights=None):
+    """
+    모든 날짜에 대한 RS 점수를 한 번에 계산 (백필/백테스트용)
+    반환 dict
+    - scores: (날짜, 기간, 종목) 1~99점, 기간보다 앞선 날짜는 NaN
+    - avg: (날짜, 종목) 가중평균 점수, 해당 날짜 가격이 없으면 NaN
+    """
+    prices = np.asarray(prices, dtype=float)
+    index = np.asarray(index, dtype=float)
+    n_days, n_tickers = prices.shape
+    if weights is None:
+        weights = np.full(len(periods), 1.0 / len(periods))
+    weights = np.asarray(weights, dtype=float)
+
+    excess = np.full((n_days, len(periods), n_tickers), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for k, p in enumerate(periods):
+            if p >= n_days:
+                continue
+            ret_stock = prices[p:] / prices[:-p] - 1
+            ret_index = index[p:] / index[:-p] - 1
+            excess[p:, k, :] = ret_stock - ret_index[:, None]
+
+    scores = to_score(pct_rank(excess))
+    avg = np.round(np.nansum(scores * weights[None, :, None], axis=1))
+    avg[np.isnan(prices)] = np.nan
+    return {"scores": scores, "avg": avg}
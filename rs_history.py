@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+import price_cache
+import rs_engine
+
+# =========================================================================
+# RS 스냅샷 히스토리 (컬럼형 append-only 저장소)
+# - .cache/rs_history/<market>/ 아래 컬럼별 바이너리 파일에 이어 붙임
+#   date(int32, YYYYMMDD) / time(int16, HHMM) / ticker(int32, 종목 id)
+#   rank(int16) / rs_avg, rs_180 ... (int8, 없으면 0)
+# - 종목 코드 ↔ id 와 확정된 행 수(rows)는 meta.json 에 보관
+#   컬럼을 다 붙인 뒤 meta 를 마지막에 써서 확정 → 중간에 죽어서 길이가 어긋난 컬럼은
+#   읽을 때 rows 까지만 쓰고, 다음 추가 때 rows 로 잘라낸 뒤 이어 붙임
+# - 조회는 np.fromfile + 마스크 연산 → 1년치도 수 ms
+# - 저장하는 건 게시된 순위표 그대로 (full 모드도 상위 PUBLISH_TOP_N 개만)
+#   → 순위 밖 종목은 추이에 빈 날짜가 생김 (전 종목 추이가 필요하면 backfill 로 가격에서 재구성)
+# - 기간 구성(rs_180 ...)은 저장소 생성 때 고정, 다른 기간으로 기록하려면 reset 후 backfill
+# =========================================================================
+RS_HISTORY_DIR = os.environ.get('RS_HISTORY_DIR', os.path.join('.cache', 'rs_history'))
+DEFAULT_PERIODS = [180, 90, 60, 30, 10]
+INDEX_TICKERS = {'kr': 'KS11', 'us': 'SPY'}
+
+BASE_COLUMNS = {'date': np.int32, 'time': np.int16, 'ticker': np.int32, 'rank': np.int16}
+SCORE_DTYPE = np.int8
+
+_cache = {}
+
+
+def _dir(market):
+    return os.path.join(RS_HISTORY_DIR, market)
+
+
+def _load_meta(market):
+    try:
+        with open(os.path.join(_dir(market), 'meta.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _save_meta(market, meta):
+    os.makedirs(_dir(market), exist_ok=True)
+    path = os.path.join(_dir(market), 'meta.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def _columns(meta):
+    cols = dict(BASE_COLUMNS)
+    for field in meta['fields']:
+        cols[field] = SCORE_DTYPE
+    return cols
+
+
+def _committed_rows(market, meta):
+    """확정된 행 수 (rows 가 없는 예전 meta 는 가장 짧은 컬럼 길이)"""
+    if 'rows' in meta:
+        return meta['rows']
+    sizes = []
+    for name, dtype in _columns(meta).items():
+        p = os.path.join(_dir(market), f"{name}.bin")
+        sizes.append(os.path.getsize(p) // np.dtype(dtype).itemsize if os.path.exists(p) else 0)
+    return min(sizes) if sizes else 0
+
+
+def _append_columns(market, meta, arrays):
+    """
+    컬럼별 파일 끝에 배열을 그대로 붙이고 meta(rows 포함)를 마지막에 기록
+    - 지난번에 확정 못 한 꼬리(중간에 죽은 추가분)는 먼저 잘라냄
+    """
+    os.makedirs(_dir(market), exist_ok=True)
+    rows = _committed_rows(market, meta)
+    n = 0
+    for name, dtype in _columns(meta).items():
+        data = np.asarray(arrays[name], dtype=dtype)
+        n = len(data)
+        with open(os.path.join(_dir(market), f"{name}.bin"), 'ab') as f:
+            f.truncate(rows * np.dtype(dtype).itemsize)
+            f.write(data.tobytes())
+    meta['rows'] = rows + n
+    _save_meta(market, meta)
+    _cache.pop(market, None)
+
+
+def _ticker_ids(meta, codes):
+    lookup = {c: i for i, c in enumerate(meta['tickers'])}
+    ids = []
+    for c in codes:
+        if c not in lookup:
+            lookup[c] = len(meta['tickers'])
+            meta['tickers'].append(c)
+        ids.append(lookup[c])
+    return np.asarray(ids, dtype=np.int32)
+
+
+def _new_meta(periods):
+    return {'fields': ['rs_avg'] + [f'rs_{p}' for p in periods], 'tickers': []}
+
+
+def _meta_for(market, periods):
+    """저장된 meta (없으면 새로), 기간 구성이 다르면 ValueError (컬럼이 어긋난 채로 섞이지 않게)"""
+    meta = _load_meta(market)
+    if meta is None:
+        return _new_meta(periods)
+    expected = _new_meta(periods)['fields']
+    if meta['fields'] != expected:
+        raise ValueError(f"RS 히스토리 {market} 기간 구성이 다릅니다 (저장 {meta['fields'][1:]} / 요청 {expected[1:]}). "
+                         f"python rs_history.py reset {market} 후 backfill 로 다시 만드세요.")
+    return meta
+
+
+def reset(market):
+    """저장소 삭제 (기간 구성을 바꿀 때)"""
+    d = _dir(market)
+    if os.path.isdir(d):
+        for fn in os.listdir(d):
+            os.remove(os.path.join(d, fn))
+        os.rmdir(d)
+    _cache.pop(market, None)
+
+
+def append_snapshot(market, snapshot_time, rankings, periods=DEFAULT_PERIODS):
+    """
+    랭킹 스냅샷 한 번 추가 (rs_kr.py / rs_us.py 의 rankings 리스트 그대로)
+    """
+    if not rankings:
+        return
+    meta = _meta_for(market, periods)
+    n = len(rankings)
+    arrays = {
+        'date': np.full(n, int(snapshot_time.strftime('%Y%m%d'))),
+        'time': np.full(n, int(snapshot_time.strftime('%H%M'))),
+        'ticker': _ticker_ids(meta, [str(r['code']) for r in rankings]),
+        'rank': [int(r['rank']) for r in rankings],
+    }
+    for field in meta['fields']:
+        arrays[field] = [int(r.get(field) or 0) for r in rankings]
+    _append_columns(market, meta, arrays)
+
+
+def load(market):
+    """전체 컬럼 로드 (확정된 행 수가 그대로면 메모리 캐시 재사용)"""
+    meta = _load_meta(market)
+    if meta is None:
+        return None, None
+    rows = _committed_rows(market, meta)
+    hit = _cache.get(market)
+    if hit and hit[0] == rows:
+        return hit[1], meta
+    cols = {}
+    for name, dtype in _columns(meta).items():
+        p = os.path.join(_dir(market), f"{name}.bin")
+        # 확정된 행까지만 (확정 전에 멈춘 꼬리는 버림)
+        cols[name] = np.fromfile(p, dtype=dtype, count=rows) if os.path.exists(p) and rows else np.empty(0, dtype=dtype)
+        if len(cols[name]) < rows:
+            raise ValueError(f"RS 히스토리 {market}/{name}.bin 이 확정된 {rows}행보다 짧습니다.")
+    _cache[market] = (rows, cols)
+    return cols, meta
+
+
+def _latest_per_date(cols, mask):
+    """마스크된 행 중 날짜별 마지막 스냅샷만 남긴 행 번호"""
+    rows = np.flatnonzero(mask)
+    if rows.size == 0:
+        return rows
+    key = cols['date'][rows].astype(np.int64) * 10000 + cols['time'][rows]
+    rows = rows[np.argsort(key, kind='stable')]
+    dates = cols['date'][rows]
+    last = np.ones(rows.size, dtype=bool)
+    last[:-1] = dates[1:] != dates[:-1]
+    return rows[last]
+
+
+def trajectory(market, code, days=30):
+    """종목 X 의 최근 N일 RS 추이 (날짜별 마지막 스냅샷 기준)"""
+    cols, meta = load(market)
+    if cols is None or code not in meta['tickers']:
+        return pd.DataFrame()
+    tid = meta['tickers'].index(code)
+    since = int((pd.Timestamp.now() - pd.Timedelta(days=days)).strftime('%Y%m%d'))
+    rows = _latest_per_date(cols, (cols['ticker'] == tid) & (cols['date'] >= since))
+    out = pd.DataFrame({name: cols[name][rows] for name in ['rank'] + meta['fields']})
+    out.index = pd.to_datetime(cols['date'][rows].astype(str), format='%Y%m%d')
+    out.index.name = 'date'
+    return out
+
+
+def _snapshot_at(cols, key_limit):
+    """key_limit(YYYYMMDDHHMM) 이전 가장 최근 스냅샷의 행 번호"""
+    key = cols['date'].astype(np.int64) * 10000 + cols['time']
+    valid = key <= key_limit
+    if not valid.any():
+        return np.empty(0, dtype=np.int64)
+    target = key[valid].max()
+    return np.flatnonzero(key == target)
+
+
+def movers(market, since, top=10):
+    """
+    since 날짜 대비 현재 순위 변동이 큰 종목
+    - change > 0 이면 순위 상승
+    """
+    cols, meta = load(market)
+    if cols is None or cols['date'].size == 0:
+        return pd.DataFrame()
+    since_key = int(pd.Timestamp(since).strftime('%Y%m%d')) * 10000 + 2359
+    now_rows = _snapshot_at(cols, np.iinfo(np.int64).max)
+    then_rows = _snapshot_at(cols, since_key)
+
+    n = len(meta['tickers'])
+    rank_then = np.full(n, np.nan)
+    rank_now = np.full(n, np.nan)
+    avg_then = np.full(n, np.nan)
+    avg_now = np.full(n, np.nan)
+    rank_then[cols['ticker'][then_rows]] = cols['rank'][then_rows]
+    avg_then[cols['ticker'][then_rows]] = cols['rs_avg'][then_rows]
+    rank_now[cols['ticker'][now_rows]] = cols['rank'][now_rows]
+    avg_now[cols['ticker'][now_rows]] = cols['rs_avg'][now_rows]
+
+    change = rank_then - rank_now
+    both = ~np.isnan(change)
+    ids = np.flatnonzero(both)
+    ids = ids[np.argsort(-np.abs(change[ids]), kind='stable')][:top]
+    return pd.DataFrame({
+        'code': [meta['tickers'][i] for i in ids],
+        'rank_then': rank_then[ids].astype(int),
+        'rank_now': rank_now[ids].astype(int),
+        'change': change[ids].astype(int),
+        'rs_avg_then': avg_then[ids].astype(int),
+        'rs_avg_now': avg_now[ids].astype(int),
+    })
+
+
+def backfill(market, close_prices, index_prices, periods=DEFAULT_PERIODS, weights=None, snapshot_time='1530'):
+    """
+    캐시된 가격으로 과거 스냅샷 재구성 (재다운로드 없음)
+    - 모든 날짜의 점수를 한 번에 계산하고, 저장소에 없는 날짜만 추가
+    - 저장소의 기간 구성과 periods 가 다르면 ValueError (reset 후 다시)
+    - close_prices 에 넘긴 종목 전체가 들어감 (게시된 상위 종목만이 아니어도 됨)
+    """
+    meta = _meta_for(market, periods)
+    cols, _ = load(market)
+    existing = set(np.unique(cols['date']).tolist()) if cols is not None else set()
+
+    res = rs_engine.compute_rs_series(close_prices.to_numpy(dtype=float),
+                                      index_prices.to_numpy(dtype=float), periods, weights)
+    scores, avg = res['scores'], res['avg']
+    dates = np.array([int(d.strftime('%Y%m%d')) for d in close_prices.index], dtype=np.int32)
+
+    # 최장 기간이 계산되는 날짜부터, 저장소에 없는 날짜만
+    day_mask = np.arange(len(dates)) >= max(periods)
+    day_mask &= ~np.isin(dates, list(existing))
+    valid = ~np.isnan(avg) & day_mask[:, None]
+    if not valid.any():
+        return 0
+
+    # 날짜별 순위: 점수 내림차순 (NaN 은 뒤로)
+    order = np.argsort(np.where(np.isnan(avg), np.inf, -avg), axis=1, kind='stable')
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(1, avg.shape[1] + 1)[None, :].repeat(avg.shape[0], 0), axis=1)
+
+    d_idx, t_idx = np.nonzero(valid)
+    ids = _ticker_ids(meta, [str(c) for c in close_prices.columns])
+    arrays = {
+        'date': dates[d_idx],
+        'time': np.full(d_idx.size, int(snapshot_time)),
+        'ticker': ids[t_idx],
+        'rank': rank[d_idx, t_idx],
+        'rs_avg': avg[d_idx, t_idx],
+    }
+    for k, p in enumerate(periods):
+        arrays[f'rs_{p}'] = np.nan_to_num(scores[d_idx, k, t_idx])
+    _append_columns(market, meta, arrays)
+    return int(np.unique(d_idx).size)
+
+
+# =========================================================================
+# CLI: python rs_history.py backfill kr [일수] / trajectory kr 005930 [일수] / movers kr 2025-01-02 / reset kr
+# =========================================================================
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("사용법: python rs_history.py [backfill|trajectory|movers|reset] [kr|us] ...")
+    cmd, market = sys.argv[1], sys.argv[2]
+
+    if cmd == 'backfill':
+        days = int(sys.argv[3]) if len(sys.argv) > 3 else 365
+        with open(f"rs_{market}.json", 'r', encoding='utf-8') as f:
+            codes = [r['code'] for r in json.load(f)['rankings']]
+        end = pd.Timestamp.now().strftime('%Y-%m-%d')
+        start = (pd.Timestamp.now() - pd.Timedelta(days=days + max(DEFAULT_PERIODS) * 2)).strftime('%Y-%m-%d')
+        close_prices = price_cache.load_close_prices(codes, start, end).ffill()
+        index_prices = price_cache.load_close_prices([INDEX_TICKERS[market]], start, end).iloc[:, 0]
+        index_prices = index_prices.reindex(close_prices.index).ffill()
+        n = backfill(market, close_prices, index_prices)
+        print(f"✅ {market} 히스토리 백필 {n}일 추가")
+    elif cmd == 'trajectory':
+        days = int(sys.argv[4]) if len(sys.argv) > 4 else 30
+        print(trajectory(market, sys.argv[3], days).to_string())
+    elif cmd == 'movers':
+        print(movers(market, sys.argv[3]).to_string())
+    elif cmd == 'reset':
+        reset(market)
+        print(f"🗑️ {market} RS 히스토리 삭제")
@@ -4,34 +4,49 @@ import numpy as np
 import FinanceDataReader as fdr
 import sys
 import os
-import firebase_admin
-from firebase_admin import credentials, firestore
-import json
 import pytz
+import storage
+import firestore_sync
+import price_cache
+import price_matrix
+import parallel_fetch
+import rs_engine
+import metrics
+import rs_history
+import indicators
+import sector_rs
+import symbols
+import fetch_guard
+import market_calendar
+import quote_snapshot
 
 # =========================================================================
 # 0. 한국 시간(KST) 설정
 # =========================================================================
 kst = pytz.timezone('Asia/Seoul')
-now_kst = datetime.now(kst)
-END_DATE = now_kst.strftime('%Y-%m-%d')
-NOW_STR = now_kst.strftime('%Y-%m-%d %H:%M')
 
 # =========================================================================
 # 1. 설정 변수 및 종목 리스트 강제 지정
 # =========================================================================
-INDEX_TICKER = 'KS11'
+BENCHMARKS = ['KS11', 'KQ11']   # RS 비교 지수 (0번이 기본 지수 = rs_avg 기준)
+INDEX_TICKER = BENCHMARKS[0]
+HOME_BENCHMARK = {'KOSPI': 'KS11', 'KOSDAQ': 'KQ11', 'KOSDAQ GLOBAL': 'KQ11'}  # 소속 시장 지수 → rs_home
 RS_PERIODS = [180, 90, 60, 30, 10]
+RS_WEIGHTS = [0.2, 0.2, 0.2, 0.2, 0.2]
 TOP_N = 50
 
-print(f"🔍 한국 RS 데이터 계산 시작 (기준 시간: {NOW_STR})")
+# 랭킹 모드: 'top' = 아래 raw_data 대형주 리스트, 'full' = 코스피+코스닥 전 종목
+RS_KR_MODE = os.environ.get('RS_KR_MODE', 'top')
+PUBLISH_TOP_N = int(os.environ.get('RS_KR_PUBLISH_TOP_N', '100'))  # full 모드에서 게시할 상위 종목 수
+FULL_MARKETS = ['KOSPI', 'KOSDAQ', 'KOSDAQ GLOBAL']
+# 장중 증분: top 모드는 추적 종목 현재가만 일괄 조회 (yahoo 심볼), full 모드는 전 종목 시세표 1회
+YAHOO_SUFFIX = {'KOSPI': '.KS', 'KOSDAQ': '.KQ', 'KOSDAQ GLOBAL': '.KQ'}
+YAHOO_INDEX = {'KS11': '^KS11', 'KQ11': '^KQ11'}
+SNAPSHOT_SETTLE = timedelta(minutes=10)   # 폐장 후 이만큼 지난 시세표부터 확정 종가로 취급 (종가 단일가 반영 대기)
 
-try:
-    krx_list = fdr.StockListing('KRX')[['Code', 'Name']]
-    K_NAME_DICT = dict(pd.Series(krx_list.Name.values, index=krx_list.Code.values))
-except:
-    print("⚠️ 상장사 리스트를 가져오지 못했습니다.")
-    K_NAME_DICT = {}
+# 장중 증분 모드 상태 (프로세스가 살아 있는 동안 유지)
+_last_universe = {}   # 마지막 전체 계산의 종목/이름
+_live = {}            # {'key': (날짜, 종목수), 'engine': IncrementalRS, 'codes': [...], 'names': {...}, 'benchmarks': [...]}
 
 raw_data = """
 005930,Samsung Electronics
@@ -101,109 +116,187 @@ for line in raw_data.strip().split('\n'):
 
 KOSPI_TICKERS = KOSPI_TICKERS[:TOP_N]
 
+
+def load_universe():
+    """
+    랭킹 대상 종목 + 코드→한글명 (이름은 종목 메타데이터 캐시에서)
+    - top 모드: 시세표 다운로드 없음 (캐시가 오래됐을 때만 하루 1회 갱신)
+    - full 모드: 당일 봉 반영에 어차피 필요한 시세표 1회로 캐시 갱신까지 같이 처리
+    반환: (universe DataFrame 또는 None, 종목 코드 리스트, 코드→한글명 dict)
+    """
+    if RS_KR_MODE != 'full':
+        table = symbols.table('kr', symbols.fetch_kr)
+        return None, list(KOSPI_TICKERS), table.column('name')
+
+    try:
+        krx_listing = fetch_guard.call(fetch_guard.LISTING_HOST, fdr.StockListing, 'KRX', key='KRX', hedge=False)
+    except Exception as e:
+        raise RuntimeError(f"❌ 전 종목 모드는 상장사 리스트가 필요합니다: {e}")
+    table = symbols.table('kr', lambda: symbols.fetch_kr(krx_listing))
+    # 보통주만 (우선주는 코드 끝자리가 0이 아님)
+    universe = krx_listing[krx_listing.Market.isin(FULL_MARKETS) & krx_listing.Code.str.endswith('0')]
+    return universe, universe.Code.tolist(), table.column('name')
+
+
 # =========================================================================
 # 2. 데이터 다운로드
 # =========================================================================
-MAX_LOOKBACK_DAYS = (max(RS_PERIODS) + 60) * 2
-START_DATE_STR = (now_kst - timedelta(days=MAX_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
-
-try:
-    index_data = fdr.DataReader(INDEX_TICKER, start=START_DATE_STR, end=END_DATE)
-    index_prices_raw = index_data['Close'].rename(INDEX_TICKER)
-except Exception as e:
-    sys.exit(f"❌ 지수 데이터 로드 실패: {e}")
+def load_prices(tickers, universe, now_kst, cancel=None):
+    """
+    (종가 프레임, 벤치마크 프레임) — 날짜 정렬 + ffill 완료
+    - cancel: 세워져 있으면 가격 캐시 / 가격 행렬을 건드리기 전에 중단
+    """
+    end_date = now_kst.strftime('%Y-%m-%d')
+    max_lookback_days = (max(RS_PERIODS) + 60) * 2
+    start_date_str = (now_kst - timedelta(days=max_lookback_days)).strftime('%Y-%m-%d')
 
-price_data_list = []
-for code in KOSPI_TICKERS:
     try:
-        data = fdr.DataReader(code, start=START_DATE_STR, end=END_DATE)
-        if not data.empty:
-            price_data_list.append(data['Close'].rename(code))
-    except:
-        continue
+        index_data = parallel_fetch.fetch_history(INDEX_TICKER, start_date_str, end_date)
+        index_prices_raw = index_data['Close'].rename(INDEX_TICKER)
+    except Exception as e:
+        raise RuntimeError(f"❌ 지수 데이터 로드 실패: {e}")
+
+    storage.check_cancel(cancel)
+    if universe is not None and len(index_prices_raw) >= 2:
+        # 전 종목 시세표(StockListing 1회 다운로드)로 당일 봉을 일괄 반영하고,
+        # 캐시가 비어 있거나 오래된 종목만 개별 다운로드
+        # 장 마감 전 시세표는 미확정 봉으로 기록 (다음 실행이 확정 종가로 다시 받음)
+        listing = universe.set_index('Code')
+        snapshot = listing[['Open', 'High', 'Low', 'Close', 'Volume']]
+        snapshot = snapshot[snapshot.Close > 0]
+        session_day = index_prices_raw.index[-1]
+        final = now_kst >= market_calendar.session_bounds('kr', session_day.date())[1] + SNAPSHOT_SETTLE
+        prev_close = listing.Close - listing.Changes if 'Changes' in listing else None
+        fresh = price_cache.append_snapshot(session_day, snapshot, index_prices_raw.index[-2],
+                                            final=final, prev_close=prev_close)
+        fresh_set = set(fresh)
+        stale = [c for c in tickers if c not in fresh_set]
+        print(f"📦 벌크 반영 {len(fresh)}종목 / 개별 다운로드 {len(stale)}종목")
+
+        # 가격 행렬: 이미 열이 있는 종목은 당일 칸 하나만 쓰고, 처음 보는 종목만 캐시 전체 복사
+        # (공용 인스턴스 — 잠금은 행렬을 만질 때만, 다운로드 중에는 장중 스테이지가 읽을 수 있게)
+        pm = price_matrix.shared('kr')
+        with pm.lock:
+            pm.extend_calendar(start_date_str, end_date)
+            day = session_day.strftime('%Y-%m-%d')
+            known = [c for c in fresh if c in pm.col_of]
+            pm.set_day(day, snapshot.loc[known, 'Close'].to_dict())
+            new = [c for c in fresh if c not in pm.col_of]
+        closes = price_cache.load_closes(new, start_date_str, end_date)
+        closes.update(parallel_fetch.fetch_closes(stale, start_date_str, end_date))
+        loaded = set(known) | set(closes)
+    else:
+        pm = price_matrix.shared('kr')
+        with pm.lock:
+            pm.extend_calendar(start_date_str, end_date)
+        closes = parallel_fetch.fetch_closes(tickers, start_date_str, end_date)
+        loaded = set(closes)
+    if not loaded:
+        raise RuntimeError("❌ 종목 데이터 로드 실패")
+
+    # 보조 벤치마크는 실패해도 기본 지수만으로 계속
+    closes.update(parallel_fetch.fetch_closes(BENCHMARKS[1:], start_date_str, end_date))
+    closes[INDEX_TICKER] = index_prices_raw
+    storage.check_cancel(cancel)
+    with pm.lock:
+        for code, series in closes.items():
+            pm.write_series(code, series)
+        pm.save()
+        benchmarks = [b for b in BENCHMARKS if b in pm.col_of]
+        return pm.frame([c for c in tickers if c in loaded], benchmarks, start_date_str)
 
-close_prices_raw = pd.concat(price_data_list, axis=1)
-close_prices_final = close_prices_raw.ffill()
-index_prices_final = index_prices_raw.reindex(close_prices_final.index).ffill()
 
 # =========================================================================
 # 3. RS 계산 (✅ 수정됨)
 # =========================================================================
-def calculate_period_rs(period, close_prices, index_prices):
-    """
-    상대강도(RS) 계산 함수
-    - 시장 대비 초과수익률 사용
-    - 초과수익 → 양수, 부진 → 음수
-    """
-    if len(close_prices) < period + 1:
-        return pd.Series(np.nan, index=close_prices.columns), 0
-    
-    # 과거 가격과 현재 가격
-    P_past = close_prices.iloc[-(period + 1)]
-    P_current = close_prices.iloc[-1]
-    I_past = index_prices.iloc[-(period + 1)]
-    I_current = index_prices.iloc[-1]
-    
-    # 수익률 계산
-    ret_stock = (P_current / P_past) - 1  # 개별 주식 수익률
-    ret_index = (I_current / I_past) - 1  # 지수 수익률
-    
-    # ✅ 초과수익률 (단순 뺄셈)
-    rs_val = ret_stock - ret_index
-    
-    # RS 값을 시리즈로 변환
-    rs_series = pd.Series(rs_val, index=close_prices.columns)
-    
-    # 순위를 백분위로 변환 후 1-99점으로 스케일링
-    ranks = rs_series.rank(pct=True, method='average')
-    scores = (ranks * 98 + 1).round(0).astype('Int64')
-    
-    return scores, round(ret_index * 100, 1)
-
-rs_results = {}
-for p in RS_PERIODS:
-    scores, _ = calculate_period_rs(p, close_prices_final, index_prices_final)
-    rs_results[f'RS_{p}D'] = scores
-
-rs_df = pd.DataFrame(rs_results)
-
-# 가중평균 계산
-weights = {'RS_180D': 0.2, 'RS_90D': 0.2, 'RS_60D': 0.2, 'RS_30D': 0.2, 'RS_10D': 0.2}
-rs_df['W_RS_Avg'] = rs_df.apply(
-    lambda r: sum(r[c] * w for c, w in weights.items() if pd.notna(r[c])), 
-    axis=1
-).round(0).astype('Int64')
-
-# 이격도 계산
-rs_df['Disparity(%)'] = (
-    ((close_prices_final.iloc[-1] / close_prices_final.rolling(50).mean().iloc[-1]) - 1) * 100
-).round(1)
-
-# 티커 이름 매핑
-rs_df['Ticker'] = rs_df.index.map(USER_ENGLISH_NAMES)
-
-# 정렬 및 인덱스 재설정
-final_df = rs_df.sort_values(by='W_RS_Avg', ascending=False).reset_index().rename(columns={'index': 'Code'})
-final_df.index = final_df.index + 1
+def load_indicators(codes, now_kst, listing=None, cancel=None):
+    """
+    기술 지표 (EMA/RSI/ATR/52주 고점/거래량 급증) 스트리밍 갱신
+    - listing: 전 종목 시세표 → 당일 봉으로 바로 반영 (캐시 파일 재로딩 없음)
+    - 실패해도 순위 게시는 계속 (지표 필드만 빠짐)
+    """
+    storage.check_cancel(cancel)
+    try:
+        with metrics.timed('indicator_seconds', market='kr'):
+            day = indicators.session_date('kr', now_kst)
+            bars = indicators.bars_from_frame(listing.set_index('Code'), day) if listing is not None and day else None
+            return indicators.update('kr', codes, now_kst, bars)
+    except Exception as e:
+        print(f"⚠️ 기술 지표 계산 실패: {e}")
+        return {}
+
+
+def home_index(codes, benchmarks):
+    """종목별 소속 시장 지수 번호 (benchmarks 순서 기준, 모르면 0번 = 기본 지수)"""
+    markets = symbols.table('kr').column('market')
+    pos = {b: i for i, b in enumerate(benchmarks)}
+    return np.array([pos.get(HOME_BENCHMARK.get(markets.get(c)), 0) for c in codes], dtype=int)
+
+
+def compute_frame(close_prices_final, index_prices_final):
+    """기간별 점수 / 가중평균 / 이격도 (+ 벤치마크별 / 소속 지수 대비 점수)를 공용 엔진에서 한 번에 계산"""
+    home = None
+    if index_prices_final.ndim == 2:
+        home = home_index(list(close_prices_final.columns), list(index_prices_final.columns))
+    with metrics.timed('rs_compute_seconds', market='kr'):
+        return rs_engine.rs_frame(close_prices_final, index_prices_final, RS_PERIODS, RS_WEIGHTS, home)
+
+
+def build_rankings(close_prices_final, index_prices_final, k_name_dict, extra=None):
+    """RS 순위 리스트 (게시용 dict 리스트)"""
+    return rankings_from_frame(compute_frame(close_prices_final, index_prices_final), k_name_dict, extra)
+
+
+def load_sectors(last_prices):
+    """
+    종목 → 섹터 (KRX 상장사 상세의 업종 분류) / 종목 → 시가총액 (상장주식수 x 최근가)
+    - 둘 다 종목 메타데이터 캐시 기준 (유니버스가 커져도 추가 다운로드 없음)
+    - last_prices: {종목: 가격}
+    """
+    return symbols.table('kr').column('sector'), symbols.caps('kr', last_prices)
+
+
+def sector_rollup(rs_df, sector_of, caps, extra=None):
+    """
+    섹터 RS (동일가중 / 시총가중 / RS 70 이상 비율) + 종목별 섹터 내 순위
+    반환: (섹터 순위 리스트, extra 에 sector / sector_rank 를 합친 종목별 추가 필드)
+    """
+    codes = list(rs_df.index)
+    scores = rs_df['W_RS_Avg'].astype(float)
+    if RS_KR_MODE == 'full':
+        # 게시 순위와 같은 기준 (최장 기간 히스토리 없는 종목 제외)
+        scores = scores.where(rs_df[f'RS_{max(RS_PERIODS)}D'].notna())
+    cap_arr = np.array([caps.get(c, np.nan) for c in codes], dtype=float) if caps else None
+    sectors, per_stock = sector_rs.rollup(codes, scores.to_numpy(), sector_of, cap_arr)
+    merged = {c: dict((extra or {}).get(c, {}), **f) for c, f in per_stock.items()}
+    return sectors, merged
+
+
+def rankings_from_frame(rs_df, k_name_dict, extra=None):
+    """
+    rs_frame 결과 → 정렬된 게시용 dict 리스트
+    - extra: {종목: 추가 필드} (기술 지표 등, 없으면 생략)
+    """
+    # 티커 이름 매핑
+    rs_df['Ticker'] = rs_df.index.map(USER_ENGLISH_NAMES)
+
+    if RS_KR_MODE == 'full':
+        # 최장 기간 히스토리가 없는 신규 상장 종목은 순위에서 제외
+        rs_df = rs_df[rs_df[f'RS_{max(RS_PERIODS)}D'].notna()]
+
+    # 정렬 및 인덱스 재설정
+    final_df = rs_df.sort_values(by='W_RS_Avg', ascending=False).reset_index().rename(columns={'index': 'Code'})
+    final_df.index = final_df.index + 1
+
+    if RS_KR_MODE == 'full':
+        final_df = final_df.head(PUBLISH_TOP_N)
 
-# =========================================================================
-# 4. 파이어베이스 전송 및 로컬 파일 저장
-# =========================================================================
-print(f"🚀 [한국 RS] 데이터 전송 및 파일 생성 시작 (시간: {NOW_STR})")
-
-try:
-    if not firebase_admin._apps:
-        cred = credentials.Certificate("serviceAccountKey.json")
-        firebase_admin.initialize_app(cred)
-    
-    db = firestore.client()
     kr_rank_list = []
-    
     for idx, row in final_df.iterrows():
         kr_rank_list.append({
             "rank": int(idx),
             "code": str(row['Code']),
-            "name": K_NAME_DICT.get(str(row['Code']), str(row['Ticker'])),
+            "name": k_name_dict.get(str(row['Code']), str(row['Ticker'])),
             "rs_180": int(row['RS_180D']),
             "rs_90": int(row['RS_90D']),
             "rs_60": int(row['RS_60D']),
@@ -212,20 +305,179 @@ try:
             "rs_avg": int(row['W_RS_Avg']),
             "disparity": float(row['Disparity(%)']),
         })
+        bench = rs_engine.bench_scores(row, BENCHMARKS)
+        if bench:
+            # 벤치마크별 점수 + 소속 시장 지수 대비 점수 (코스닥 종목은 KQ11 기준)
+            kr_rank_list[-1]["rs_bench"] = bench
+            kr_rank_list[-1]["rs_home"] = int(row['W_RS_Home'])
+        if fetch_guard.is_stale(row['Code']):
+            # 이번 사이클에 못 받아서 캐시 가격으로 계산한 종목
+            kr_rank_list[-1]["stale"] = True
+        if extra:
+            kr_rank_list[-1].update(extra.get(str(row['Code']), {}))
+    return kr_rank_list
+
+
+# =========================================================================
+# 4. 파이어베이스 전송 및 로컬 파일 저장
+# =========================================================================
+def publish(store, now_kst, kr_rank_list, history=True, sectors=None, cancel=None):
+    """
+    rs_data/latest + rs_kr.json 기록 (+ RS 히스토리 스냅샷)
+    - cancel: manager.py 제한 시간 초과 표시 (세워져 있으면 아무것도 기록하지 않음)
+    - 반환: 게시한 payload
+    """
+    storage.check_cancel(cancel)
+    now_str = now_kst.strftime('%Y-%m-%d %H:%M')
+    print(f"🚀 [한국 RS] 데이터 전송 및 파일 생성 시작 (시간: {now_str})")
 
     final_payload = {
-        "update_time": NOW_STR,
+        "update_time": now_str,
         "rankings": kr_rank_list
     }
+    if sectors is not None:
+        final_payload["sectors"] = sectors
+
+    try:
+        store = store or storage.get_store()
+
+        # 1. 업로드 큐에 넣기 (순위/점수가 그대로면 생략, 실제 전송은 백그라운드)
+        written = firestore_sync.set_if_changed(store, 'rs_data', 'latest', final_payload)
+        print(f"📝 rs_data/latest {written / 1024:.1f} KB 기록 예약" if written else "📝 rs_data/latest 변경 없음 (기록 생략)")
+
+        # 2. 로컬 파일 저장 (역시 백그라운드)
+        storage.get_files().set(('rs_kr',), final_payload)
+
+        # 3. RS 히스토리 스냅샷 추가 (실패해도 업로드에는 영향 없음, 장중 증분 갱신은 제외)
+        if history:
+            try:
+                rs_history.append_snapshot('kr', now_kst, kr_rank_list, RS_PERIODS)
+            except Exception as e:
+                print(f"⚠️ RS 히스토리 저장 실패: {e}")
+
+        print(f"✅ 파이어베이스 전송 & rs_kr.json 파일 생성 예약 완료! (KST: {now_str})")
+
+    except Exception as e:
+        print(f"❌ 에러 발생: {e}")
+
+    return final_payload
+
+
+def run(store=None, cancel=None):
+    """
+    한국 RS 스테이지 (manager.py 러너 또는 단독 실행)
+    - 반환: 게시한 payload (뉴스 스테이지로 메모리 전달)
+    """
+    now_kst = datetime.now(kst)
+    now_str = now_kst.strftime('%Y-%m-%d %H:%M')
+    print(f"🔍 한국 RS 데이터 계산 시작 (기준 시간: {now_str} / 모드: {RS_KR_MODE})")
+
+    universe, tickers, k_name_dict = load_universe()
+    close_prices_final, index_prices_final = load_prices(tickers, universe, now_kst, cancel)
+    extra = load_indicators(list(close_prices_final.columns), now_kst, universe, cancel)
+    sector_of, caps = load_sectors(close_prices_final.iloc[-1].to_dict())
+    rs_df = compute_frame(close_prices_final, index_prices_final)
+    sectors, extra = sector_rollup(rs_df, sector_of, caps, extra)
+    kr_rank_list = rankings_from_frame(rs_df, k_name_dict, extra)
 
-    # 1. 파이어베이스 업로드
-    db.collection('rs_data').document('latest').set(final_payload)
+    # 장중 증분 모드가 같은 종목/이름을 쓰도록 기억
+    _last_universe.update(codes=list(close_prices_final.columns), names=k_name_dict)
+    return publish(store, now_kst, kr_rank_list, sectors=sectors, cancel=cancel)
 
-    # 2. 로컬 파일 저장
-    with open('rs_kr.json', 'w', encoding='utf-8') as f:
-        json.dump(final_payload, f, ensure_ascii=False, indent=2)
 
-    print(f"✅ 파이어베이스 전송 & rs_kr.json 파일 생성 성공! (KST: {NOW_STR})")
+# =========================================================================
+# 5. 장중 증분 모드 (현재가 벡터만으로 1분 단위 갱신)
+# =========================================================================
+def _live_engine(now_kst):
+    """
+    오늘 처음 호출될 때만 캐시 히스토리(어제까지)로 앵커 계산, 이후엔 재사용
+    - 종목/이름은 마지막 전체 계산 기준 (없으면 상장사 리스트 다시 조회)
+    """
+    if _last_universe:
+        codes, names = _last_universe['codes'], _last_universe['names']
+    else:
+        _, codes, names = load_universe()
+
+    today = now_kst.strftime('%Y-%m-%d')
+    key = (today, len(codes))
+    if _live.get('key') == key:
+        return _live
+
+    start = (now_kst - timedelta(days=(max(RS_PERIODS) + 60) * 2)).strftime('%Y-%m-%d')
+    pm = price_matrix.shared('kr')
+    with pm.lock:
+        if INDEX_TICKER not in pm.col_of:
+            raise RuntimeError("❌ 가격 행렬이 비어 있습니다. 전체 RS 계산(run)을 먼저 실행하세요.")
+        benchmarks = [b for b in BENCHMARKS if b in pm.col_of]
+        dates, prices, index, codes = pm.arrays(codes, benchmarks, start)
+    # 오늘 행(장중 부분 봉)은 빼고 어제까지로 앵커 계산
+    n = sum(1 for d in dates if d < today)
+    if n == 0:
+        raise RuntimeError("❌ 어제까지의 가격이 없습니다.")
+
+    _live.update(key=key, codes=codes, names=names, benchmarks=benchmarks,
+                 engine=rs_engine.IncrementalRS(prices[:n], index[:n], RS_PERIODS, RS_WEIGHTS,
+                                                home_index(codes, benchmarks)))
+    print(f"🧮 장중 증분 RS 기준 데이터 준비 ({len(codes)}종목, ~{dates[n - 1]})")
+    return _live
+
+
+def yahoo_aliases(codes):
+    """KRX 종목코드 / 지수 → yahoo 심볼 (소속 시장을 모르면 코스피로)"""
+    markets = symbols.table('kr').column('market')
+    aliases = {c: c + YAHOO_SUFFIX.get(markets.get(c), '.KS') for c in codes}
+    aliases.update(YAHOO_INDEX)
+    return aliases
+
 
-except Exception as e:
-    print(f"❌ 에러 발생: {e}")
\ No newline at end of file
+def live_prices(codes, benchmarks, now_kst):
+    """
+    장중 현재가 → (현재가 배열, (벤치마크,) 지수 현재가, 시세표 또는 None)
+    - top 모드: 추적 종목 + 벤치마크만 일괄 조회 1회 (전 종목 시세표를 매분 받지 않음)
+    - full 모드: 전 종목 시세표 1회 (종목 수천 개는 개별 시세보다 시세표 하나가 가벼움) + 벤치마크별 당일 봉
+    """
+    if RS_KR_MODE != 'full':
+        quotes = quote_snapshot.last_prices(list(codes) + list(benchmarks), yahoo_aliases(codes))
+        prices = np.array([quotes.get(c, np.nan) for c in codes], dtype=float)
+        index_now = np.array([quotes.get(b, np.nan) for b in benchmarks], dtype=float)
+        return prices, index_now, None
+
+    listing = fetch_guard.call(fetch_guard.LISTING_HOST, fdr.StockListing, 'KRX', key='KRX', hedge=False)
+    prices = listing.set_index('Code')['Close'].reindex(codes).astype(float).to_numpy()
+    index_now = np.full(len(benchmarks), np.nan)
+    for i, b in enumerate(benchmarks):
+        try:
+            bar = fetch_guard.call(parallel_fetch.source_host(b), fdr.DataReader, b, key=b,
+                                   start=now_kst.strftime('%Y-%m-%d'))
+            index_now[i] = float(bar['Close'].iloc[-1])
+        except Exception:
+            pass
+    return prices, index_now, listing
+
+
+def run_live(store=None, cancel=None):
+    """
+    한국 RS 장중 증분 스테이지
+    - 히스토리 재다운로드/롤링 재계산 없이 현재가만 받아서 점수 갱신
+    """
+    now_kst = datetime.now(kst)
+    live = _live_engine(now_kst)
+    prices, index_now, listing = live_prices(live['codes'], live['benchmarks'], now_kst)
+    with metrics.timed('rs_compute_seconds', market='kr', mode='live'):
+        res = live['engine'].update(prices, index_now)
+        rs_df = rs_engine.result_frame(res, live['codes'], RS_PERIODS, live['benchmarks'])
+    if listing is None and market_calendar.is_open('kr', now_kst):
+        # 현재가만 있는 봉 (고가/저가 = 현재가) → 장중에는 미확정 봉으로 계산에만 쓰임
+        listing = pd.DataFrame({'Code': live['codes'], 'Close': prices}).dropna()
+    extra = load_indicators(live['codes'], now_kst, listing, cancel)
+    sector_of, caps = load_sectors(dict(zip(live['codes'], prices)))
+    sectors, extra = sector_rollup(rs_df, sector_of, caps, extra)
+    return publish(store, now_kst, rankings_from_frame(rs_df, live['names'], extra),
+                   history=False, sectors=sectors, cancel=cancel)
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except RuntimeError as e:
+        sys.exit(str(e))
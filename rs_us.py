@@ -4,24 +4,33 @@ import numpy as np
 import FinanceDataReader as fdr
 import sys
 import os
-import firebase_admin
-from firebase_admin import credentials, firestore
-import json
 import pytz
+import storage
+import firestore_sync
+import parallel_fetch
+import price_matrix
+import quote_snapshot
+import market_calendar
+import rs_engine
+import metrics
+import rs_history
+import indicators
+import sector_rs
+import symbols
+import fetch_guard
 
 # =========================================================================
 # 0. 한국 시간(KST) 설정
 # =========================================================================
 kst = pytz.timezone('Asia/Seoul')
-now_kst = datetime.now(kst)
-END_DATE = now_kst.strftime('%Y-%m-%d')
-NOW_STR = now_kst.strftime('%Y-%m-%d %H:%M')
 
 # =========================================================================
 # 1. 설정 및 종목 리스트
 # =========================================================================
-INDEX_TICKER = 'SPY'
+BENCHMARKS = ['SPY', 'QQQ', 'SOXX']   # RS 비교 지수 (0번이 기본 지수 = rs_avg 기준)
+INDEX_TICKER = BENCHMARKS[0]
 RS_PERIODS = [180, 90, 60, 30, 10]
+RS_WEIGHTS = [0.2, 0.2, 0.2, 0.2, 0.2]
 
 US_STOCKS_INFO = {
     # 원전 & 에너지
@@ -67,92 +76,111 @@ SECTOR_TICKERS = {
 }
 
 ALL_US_TICKERS = list(US_STOCKS_INFO.keys())
+SECTOR_OF = {t: sector for sector, tickers in SECTOR_TICKERS.items() for t in tickers}
+HOME_BENCHMARK = {'Tech/Semi': 'QQQ'}   # 섹터별 비교 지수 → rs_home (없으면 기본 지수)
+SEMI_TICKERS = ['NVDA', 'AVGO', 'ASML', 'AMD', 'MU', 'AMAT', 'LRCX', 'KLAC', 'QCOM', 'TXN']   # 반도체는 SOXX 기준
 
 USER_RS_SORT_ORDER = 'a'
 
+# 장중 증분 모드 상태 (프로세스가 살아 있는 동안 유지)
+_live = {}   # {'key': 미국 현지 날짜, 'engine': IncrementalRS, 'codes': [...], 'benchmarks': [...]}
+
 # =========================================================================
 # 2. 데이터 다운로드
 # =========================================================================
-START_DATE_STR = (now_kst - timedelta(days=max(RS_PERIODS) * 2)).strftime('%Y-%m-%d')
-print(f"💰 미국 데이터 다운로드 중... (Index: {INDEX_TICKER} / 기준일: {NOW_STR})")
-
-try:
-    index_data = fdr.DataReader(INDEX_TICKER, start=START_DATE_STR, end=END_DATE)
-    index_prices = index_data['Close'].rename(INDEX_TICKER)
-
-    price_list = []
-    for t in ALL_US_TICKERS:
-        try:
-            data = fdr.DataReader(t, start=START_DATE_STR, end=END_DATE)
-            if not data.empty: price_list.append(data['Close'].rename(t))
-        except:
-            continue
-
-    close_prices = pd.concat(price_list, axis=1).ffill()
-    index_prices = index_prices.reindex(close_prices.index).ffill()
-except Exception as e:
-    sys.exit(f"❌ 데이터 로드 실패: {e}")
+def load_prices(tickers, now_kst, cancel=None):
+    """
+    (종가 프레임, 벤치마크 프레임) — 날짜 정렬 + ffill 완료
+    - cancel: 세워져 있으면 가격 행렬을 건드리기 전에 중단
+    """
+    end_date = now_kst.strftime('%Y-%m-%d')
+    start_date_str = (now_kst - timedelta(days=max(RS_PERIODS) * 2)).strftime('%Y-%m-%d')
+
+    try:
+        index_data = parallel_fetch.fetch_history(INDEX_TICKER, start_date_str, end_date)
+        closes = parallel_fetch.fetch_closes(tickers, start_date_str, end_date)
+    except Exception as e:
+        raise RuntimeError(f"❌ 데이터 로드 실패: {e}")
+    loaded = [t for t in tickers if t in closes]
+
+    # NYSE 거래일 달력 기준 float32 행렬에 반영 (받은 구간만 덮어씀)
+    # 보조 벤치마크는 실패해도 기본 지수만으로 계속
+    closes.update(parallel_fetch.fetch_closes(BENCHMARKS[1:], start_date_str, end_date))
+    closes[INDEX_TICKER] = index_data['Close']
+    storage.check_cancel(cancel)
+    pm = price_matrix.update('us', closes, start_date_str, end_date)
+    with pm.lock:
+        benchmarks = [b for b in BENCHMARKS if b in pm.col_of]
+        return pm.frame(loaded, benchmarks, start_date_str)
+
 
 # =========================================================================
 # 3. RS 산식 적용 (✅ 수정됨)
 # =========================================================================
-def calculate_rs_fixed(period, stocks, index):
+def load_indicators(codes, now_kst, cancel=None):
     """
-    상대강도(RS) 계산 함수 - 수정 버전
-    - 시장 대비 초과수익률 사용
-    - 초과수익 → 양수, 부진 → 음수
+    기술 지표 (EMA/RSI/ATR/52주 고점/거래량 급증) 스트리밍 갱신
+    - 가격 캐시에 새 봉이 붙은 종목만 파일을 다시 읽음
+    - 실패해도 순위 게시는 계속 (지표 필드만 빠짐)
     """
-    if len(stocks) < period + 1 or len(index) < period + 1:
-        return pd.Series(np.nan, index=stocks.columns), 0
-    
-    # 수익률 계산
-    s_ret = (stocks.iloc[-1] / stocks.iloc[-(period + 1)]) - 1  # 주식 수익률
-    i_ret = (index.iloc[-1] / index.iloc[-(period + 1)]) - 1    # 지수 수익률
-    
-    # ✅ 초과수익률 (단순 뺄셈)
-    rs_val = s_ret - i_ret
-    
-    # 순위를 백분위로 변환 후 1-99점으로 스케일링
-    ranks = pd.Series(rs_val, index=stocks.columns).rank(pct=True)
-    scores = (ranks * 98 + 1).round(0).astype('Int64')
-    
-    return scores, round(i_ret * 100, 1)
+    storage.check_cancel(cancel)
+    try:
+        with metrics.timed('indicator_seconds', market='us'):
+            return indicators.update('us', codes, now_kst)
+    except Exception as e:
+        print(f"⚠️ 기술 지표 계산 실패: {e}")
+        return {}
 
-rs_results = {}
-for p in RS_PERIODS:
-    scores, _ = calculate_rs_fixed(p, close_prices, index_prices)
-    rs_results[f'RS_{p}D'] = scores
 
-rs_df = pd.DataFrame(rs_results)
+def load_symbols():
+    """종목 메타데이터 캐시 (US_STOCKS_INFO / SECTOR_TICKERS 기준, 하루 1회 상장주식수 갱신)"""
+    seed = {t: {"name": n, "sector": SECTOR_OF.get(t)} for t, n in US_STOCKS_INFO.items()}
+    return symbols.table('us', lambda: symbols.fetch_us(seed))
 
-# 가중평균 계산
-rs_df['W_RS_Avg'] = rs_df.apply(
-    lambda r: sum(r[c] * 0.2 for c in rs_df.columns if pd.notna(r[c])), 
-    axis=1
-).round(0).astype('Int64')
 
-rs_df['Ticker'] = rs_df.index
-rs_df['Company Name'] = rs_df['Ticker'].map(US_STOCKS_INFO)
+def home_index(codes, benchmarks):
+    """종목별 섹터 비교 지수 번호 (benchmarks 순서 기준, 없으면 0번 = 기본 지수)"""
+    pos = {b: i for i, b in enumerate(benchmarks)}
+    home = [('SOXX' if c in SEMI_TICKERS else HOME_BENCHMARK.get(SECTOR_OF.get(c))) for c in codes]
+    return np.array([pos.get(h, 0) for h in home], dtype=int)
 
-# 이격도 계산
-ma50_latest = close_prices.rolling(window=50).mean().iloc[-1]
-rs_df['Disparity(%)'] = ((close_prices.iloc[-1] / ma50_latest) - 1) * 100
-rs_df['Disparity(%)'] = rs_df['Disparity(%)'].astype(float).round(1)
 
-final_df = rs_df.sort_values(by='W_RS_Avg', ascending=False).reset_index(drop=True)
-final_df.index = final_df.index + 1
+def compute_frame(close_prices, index_prices):
+    """기간별 점수 / 가중평균 / 이격도 (+ 벤치마크별 / 섹터 지수 대비 점수)를 공용 엔진에서 한 번에 계산"""
+    home = home_index(list(close_prices.columns), list(index_prices.columns)) if index_prices.ndim == 2 else None
+    with metrics.timed('rs_compute_seconds', market='us'):
+        return rs_engine.rs_frame(close_prices, index_prices, RS_PERIODS, RS_WEIGHTS, home)
 
-# =========================================================================
-# 4. 파이어베이스 전송 및 로컬 파일 저장
-# =========================================================================
-print(f"\n🇺🇸 [미국 RS] 데이터 전송 및 파일 생성 시작 (시간: {NOW_STR})")
 
-try:
-    if not firebase_admin._apps:
-        cred = credentials.Certificate("serviceAccountKey.json")
-        firebase_admin.initialize_app(cred)
-    db = firestore.client()
-    
+def build_rankings(close_prices, index_prices, extra=None):
+    """RS 순위 리스트 (게시용 dict 리스트)"""
+    return rankings_from_frame(compute_frame(close_prices, index_prices), extra)
+
+
+def sector_rollup(rs_df, extra=None, caps=None):
+    """
+    SECTOR_TICKERS 기준 섹터 RS (동일가중 / 시총가중 / RS 70 이상 비율) + 종목별 섹터 내 순위
+    - caps: {종목: 시가총액} (없으면 시총가중 점수는 None)
+    반환: (섹터 순위 리스트, extra 에 sector / sector_rank 를 합친 종목별 추가 필드)
+    """
+    codes = list(rs_df.index)
+    cap_arr = np.array([caps.get(c, np.nan) for c in codes], dtype=float) if caps else None
+    sectors, per_stock = sector_rs.rollup(codes, rs_df['W_RS_Avg'].astype(float).to_numpy(), SECTOR_OF, cap_arr)
+    merged = {c: dict((extra or {}).get(c, {}), **f) for c, f in per_stock.items()}
+    return sectors, merged
+
+
+def rankings_from_frame(rs_df, extra=None):
+    """
+    rs_frame 결과 → 정렬된 게시용 dict 리스트
+    - extra: {종목: 추가 필드} (기술 지표 등, 없으면 생략)
+    """
+    rs_df['Ticker'] = rs_df.index
+    rs_df['Company Name'] = rs_df['Ticker'].map(lambda t: symbols.name('us', t, US_STOCKS_INFO.get(t)))
+
+    final_df = rs_df.sort_values(by='W_RS_Avg', ascending=False).reset_index(drop=True)
+    final_df.index = final_df.index + 1
+
     us_rank_list = []
     for idx, row in final_df.iterrows():
         us_rank_list.append({
@@ -167,21 +195,132 @@ try:
             "rs_avg": int(row['W_RS_Avg']),
             "disparity": float(row['Disparity(%)'])
         })
-    
+        bench = rs_engine.bench_scores(row, BENCHMARKS)
+        if bench:
+            # 벤치마크별 점수 + 섹터 비교 지수 대비 점수 (기술주는 QQQ, 반도체는 SOXX 기준)
+            us_rank_list[-1]["rs_bench"] = bench
+            us_rank_list[-1]["rs_home"] = int(row['W_RS_Home'])
+        if fetch_guard.is_stale(row['Ticker']):
+            # 이번 사이클에 못 받아서 캐시 가격으로 계산한 종목
+            us_rank_list[-1]["stale"] = True
+        if extra:
+            us_rank_list[-1].update(extra.get(str(row['Ticker']), {}))
+    return us_rank_list
+
+
+# =========================================================================
+# 4. 파이어베이스 전송 및 로컬 파일 저장
+# =========================================================================
+def publish(store, now_kst, us_rank_list, history=True, sectors=None, cancel=None):
+    """
+    rs_data/us_latest + rs_us.json 기록 (+ RS 히스토리 스냅샷)
+    - cancel: manager.py 제한 시간 초과 표시 (세워져 있으면 아무것도 기록하지 않음)
+    - 반환: 게시한 payload
+    """
+    storage.check_cancel(cancel)
+    now_str = now_kst.strftime('%Y-%m-%d %H:%M')
+    print(f"\n🇺🇸 [미국 RS] 데이터 전송 및 파일 생성 시작 (시간: {now_str})")
+
     final_payload = {
-        "update_time": NOW_STR,
+        "update_time": now_str,
         "sort_standard": USER_RS_SORT_ORDER,
         "rankings": us_rank_list
     }
+    if sectors is not None:
+        final_payload["sectors"] = sectors
+
+    try:
+        store = store or storage.get_store()
+
+        # 1. 업로드 큐에 넣기 (순위/점수가 그대로면 생략, 실제 전송은 백그라운드)
+        written = firestore_sync.set_if_changed(store, 'rs_data', 'us_latest', final_payload)
+        print(f"📝 rs_data/us_latest {written / 1024:.1f} KB 기록 예약" if written else "📝 rs_data/us_latest 변경 없음 (기록 생략)")
+
+        # 2. 로컬 파일 저장 (역시 백그라운드)
+        storage.get_files().set(('rs_us',), final_payload)
+
+        # 3. RS 히스토리 스냅샷 추가 (실패해도 업로드에는 영향 없음, 장중 증분 갱신은 제외)
+        if history:
+            try:
+                rs_history.append_snapshot('us', now_kst, us_rank_list, RS_PERIODS)
+            except Exception as e:
+                print(f"⚠️ RS 히스토리 저장 실패: {e}")
+
+        print(f"\n✅ [미국 RS] 파이어베이스 및 rs_us.json 저장 예약 완료! (KST: {now_str})")
+
+    except Exception as e:
+        print(f"\n❌ 전송 실패: {e}")
+
+    return final_payload
+
+
+def run(store=None, cancel=None):
+    """
+    미국 RS 스테이지 (manager.py 러너 또는 단독 실행)
+    - 반환: 게시한 payload (뉴스 스테이지로 메모리 전달)
+    """
+    now_kst = datetime.now(kst)
+    now_str = now_kst.strftime('%Y-%m-%d %H:%M')
+    print(f"💰 미국 데이터 다운로드 중... (Index: {INDEX_TICKER} / 기준일: {now_str})")
+
+    close_prices, index_prices = load_prices(ALL_US_TICKERS, now_kst, cancel)
+    load_symbols()
+    rs_df = compute_frame(close_prices, index_prices)
+    sectors, extra = sector_rollup(rs_df, load_indicators(list(close_prices.columns), now_kst, cancel),
+                                   symbols.caps('us', close_prices.iloc[-1].to_dict()))
+    us_rank_list = rankings_from_frame(rs_df, extra)
+
+    return publish(store, now_kst, us_rank_list, sectors=sectors, cancel=cancel)
+
+
+# =========================================================================
+# 5. 장중 증분 모드 (현재가 벡터만으로 1분 단위 갱신)
+# =========================================================================
+def _live_engine(now_kst):
+    """미국 현지 날짜가 바뀔 때만 캐시 히스토리(전 세션까지)로 앵커 계산"""
+    today = market_calendar.local_now('us', now_kst).strftime('%Y-%m-%d')
+    if _live.get('key') == today:
+        return _live
+
+    start = (now_kst - timedelta(days=(max(RS_PERIODS) + 60) * 2)).strftime('%Y-%m-%d')
+    pm = price_matrix.shared('us')
+    with pm.lock:
+        if INDEX_TICKER not in pm.col_of:
+            raise RuntimeError("❌ 가격 행렬이 비어 있습니다. 전체 RS 계산(run)을 먼저 실행하세요.")
+        benchmarks = [b for b in BENCHMARKS if b in pm.col_of]
+        dates, prices, index, codes = pm.arrays(ALL_US_TICKERS, benchmarks, start)
+    # 오늘 행(장중 부분 봉)은 빼고 전 세션까지로 앵커 계산
+    n = sum(1 for d in dates if d < today)
+    if n == 0:
+        raise RuntimeError("❌ 전 세션까지의 가격이 없습니다.")
+
+    _live.update(key=today, codes=codes, benchmarks=benchmarks,
+                 engine=rs_engine.IncrementalRS(prices[:n], index[:n], RS_PERIODS, RS_WEIGHTS,
+                                                home_index(codes, benchmarks)))
+    print(f"🧮 장중 증분 RS 기준 데이터 준비 ({len(codes)}종목, ~{dates[n - 1]})")
+    return _live
+
+
+def run_live(store=None, cancel=None):
+    """
+    미국 RS 장중 증분 스테이지
+    - 종목 + 지수 현재가를 일괄 조회 1회로 받아서 점수 갱신
+    """
+    now_kst = datetime.now(kst)
+    live = _live_engine(now_kst)
+    quotes = quote_snapshot.last_prices(live['codes'] + live['benchmarks'])
+    prices = np.array([quotes.get(c, np.nan) for c in live['codes']], dtype=float)
+    index_now = np.array([quotes.get(b, np.nan) for b in live['benchmarks']], dtype=float)
+    with metrics.timed('rs_compute_seconds', market='us', mode='live'):
+        res = live['engine'].update(prices, index_now)
+        rs_df = rs_engine.result_frame(res, live['codes'], RS_PERIODS, live['benchmarks'])
+    sectors, extra = sector_rollup(rs_df, load_indicators(live['codes'], now_kst, cancel),
+                                   symbols.caps('us', dict(zip(live['codes'], prices))))
+    return publish(store, now_kst, rankings_from_frame(rs_df, extra), history=False, sectors=sectors, cancel=cancel)
 
-    # 1. 파이어베이스 업로드
-    db.collection('rs_data').document('us_latest').set(final_payload)
-    
-    # 2. 로컬 파일 저장
-    with open('rs_us.json', 'w', encoding='utf-8') as f:
-        json.dump(final_payload, f, ensure_ascii=False, indent=2)
-    
-    print(f"\n✅ [미국 RS] 파이어베이스 및 rs_us.json 저장 완료! (KST: {NOW_STR})")
 
-except Exception as e:
-    print(f"\n❌ 전송 실패: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    try:
+        run()
+    except RuntimeError as e:
+        sys.exit(str(e))
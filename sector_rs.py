@@ -0,0 +1,84 @@
+import numpy as np
+
+# =========================================================================
+# 섹터 RS 집계 (그룹 소속 행렬로 한 번에 계산, 섹터별 반복문 없음)
+# - M: (섹터, 종목) 0/1 소속 행렬 → 섹터 합계는 전부 M @ 벡터
+#   · 동일가중 점수 = M @ 점수 / M @ 1
+#   · 시총가중 점수 = M @ (점수 x 시총) / M @ 시총
+#   · RS 70 이상 비율 = M @ (점수 >= 70) / M @ 1
+# - 섹터 내 순위: (섹터 번호, -점수) 정렬 한 번 → 섹터 시작 위치와의 차이
+# =========================================================================
+STRONG_RS = 70
+LEADERS_N = 3
+UNCLASSIFIED = '기타'
+
+
+def membership(codes, sector_of):
+    """
+    종목 → 섹터 매핑으로 소속 행렬 생성
+    반환: (섹터 이름 리스트, (섹터, 종목) float 행렬, (종목,) 섹터 번호 배열)
+    """
+    labels = [sector_of.get(c) or UNCLASSIFIED for c in codes]
+    names = sorted(set(labels))
+    pos = {s: i for i, s in enumerate(names)}
+    gid = np.array([pos[s] for s in labels], dtype=int)
+    m = np.zeros((len(names), len(codes)))
+    m[gid, np.arange(len(codes))] = 1.0
+    return names, m, gid
+
+
+def rollup(codes, scores, sector_of, caps=None):
+    """
+    종목 점수(W_RS_Avg) → 섹터 RS
+    - scores: (종목,) 점수 (NaN = 순위 제외 종목)
+    - caps: (종목,) 시가총액 (없으면 시총가중 점수는 None)
+    반환: (섹터 순위 리스트, {종목: {sector, sector_rank}})
+    """
+    codes = list(codes)
+    if not codes:
+        return [], {}
+    scores = np.asarray(scores, dtype=float)
+    names, m, gid = membership(codes, sector_of)
+
+    valid = ~np.isnan(scores)
+    s = np.where(valid, scores, 0.0)
+    count = m @ valid
+    with np.errstate(invalid='ignore', divide='ignore'):
+        equal = (m @ s) / count
+        strong = (m @ (valid & (s >= STRONG_RS))) / count * 100
+        if caps is not None:
+            w = np.where(valid, np.nan_to_num(np.asarray(caps, dtype=float)), 0.0)
+            cap_w = (m @ (s * w)) / (m @ w)
+        else:
+            cap_w = np.full(len(names), np.nan)
+
+    # 섹터 내 순위: 섹터 번호 오름차순, 점수 내림차순 (순위 제외 종목은 맨 뒤)
+    order = np.lexsort((-s, ~valid, gid))
+    sorted_gid = gid[order]
+    starts = np.searchsorted(sorted_gid, np.arange(len(names)))
+    in_rank = np.empty(len(codes), dtype=int)
+    in_rank[order] = np.arange(len(codes)) - starts[sorted_gid] + 1
+
+    per_stock = {}
+    for i, c in enumerate(codes):
+        per_stock[c] = {"sector": names[gid[i]], "sector_rank": int(in_rank[i]) if valid[i] else None}
+
+    leaders = {}
+    for i in order:
+        if valid[i] and len(leaders.setdefault(gid[i], [])) < LEADERS_N:
+            leaders[gid[i]].append(codes[i])
+
+    sectors = []
+    for g in np.argsort(-np.nan_to_num(equal, nan=-1), kind='stable'):
+        if count[g] == 0:
+            continue
+        sectors.append({
+            "rank": len(sectors) + 1,
+            "sector": names[g],
+            "members": int(count[g]),
+            "rs_avg": round(float(equal[g]), 1),
+            "rs_cap": round(float(cap_w[g]), 1) if not np.isnan(cap_w[g]) else None,
+            "pct_above_70": round(float(strong[g]), 1),
+            "leaders": leaders.get(g, []),
+        })
+    return sectors, per_stock
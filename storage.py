@@ -0,0 +1,372 @@
+import os
+import json
+import time
+import atexit
+import sqlite3
+import threading
+from collections import OrderedDict
+import metrics
+
+# =========================================================================
+# 저장소 추상화 + 비동기 write-behind 큐
+# - 백엔드(Sink): Firestore / 로컬 JSON / SQLite / 메모리(테스트·벤치마크용)
+#   문서 경로는 튜플: ('rs_data', 'latest'), ('stock_news', 'news_kr', 'tickers', '005930_삼성전자')
+# - 스테이지는 큐에 put() 만 하고 바로 다음 일로 (Firestore 가 느리거나 죽어도 계산 결과는 안 잃음)
+# - 같은 문서에 대한 연속 기록은 마지막 것만 남기고(coalesce) 배치로 flush
+# - flush 실패 시 백오프 후 재시도, 종료 때까지 못 보낸 기록은 .cache/storage/ 에 남겨서 다음 실행이 이어서 전송
+# - 백엔드 선택: 환경변수 FINANCE_SINK = firestore(기본) | json | sqlite | memory
+# =========================================================================
+STORAGE_DIR = os.path.join('.cache', 'storage')
+SINK_KIND = os.environ.get('FINANCE_SINK', 'firestore')
+BATCH_LIMIT = 400          # Firestore 배치 최대 500건 미만으로
+FLUSH_DELAY = 2.0          # 첫 기록 후 이만큼 모았다가 flush (그 사이 같은 문서 기록은 합침)
+RETRY_BASE = 1.0           # 재시도 대기: 1s, 2s, 4s ... 최대 RETRY_MAX
+RETRY_MAX = 60.0
+CLOSE_TIMEOUT = 60         # 종료 시 남은 기록을 기다리는 최대 시간 (초)
+
+
+class StageCancelled(Exception):
+    """제한 시간을 넘겨 결과가 버려진 스테이지 (이후 기록 / 게시 금지)"""
+
+
+def check_cancel(cancel):
+    """
+    스테이지 기록 직전마다 호출: manager.py 가 제한 시간 초과로 cancel 을 세웠으면 StageCancelled
+    (버려진 스레드가 다음 사이클 결과를 덮어쓰지 않도록)
+    """
+    if cancel is not None and cancel.is_set():
+        raise StageCancelled("제한 시간 초과로 취소된 스테이지 → 기록하지 않음")
+
+
+# =========================================================================
+# 1. 백엔드
+# =========================================================================
+class MemorySink:
+    """메모리 dict 백엔드 (테스트 / 벤치마크)"""
+    name = 'memory'
+
+    def __init__(self):
+        self.docs = {}
+
+    def get(self, path):
+        doc = self.docs.get(tuple(path))
+        return json.loads(json.dumps(doc)) if doc is not None else None
+
+    def commit(self, ops):
+        for op, path, doc in ops:
+            if op == 'set':
+                self.docs[tuple(path)] = json.loads(json.dumps(doc))
+            else:
+                self.docs.pop(tuple(path), None)
+
+
+class FirestoreSink:
+    """Firestore 백엔드 (경로를 collection/document 로 번갈아 해석)"""
+    name = 'firestore'
+
+    def __init__(self, db=None):
+        if db is None:
+            import firebase_client
+            db = firebase_client.get_db()
+        self.db = db
+
+    def _ref(self, path):
+        ref = self.db.collection(path[0]).document(path[1])
+        for i in range(2, len(path), 2):
+            ref = ref.collection(path[i]).document(path[i + 1])
+        return ref
+
+    def get(self, path):
+        snap = self._ref(path).get()
+        return snap.to_dict() if snap.exists else None
+
+    def commit(self, ops):
+        for i in range(0, len(ops), BATCH_LIMIT):
+            batch = self.db.batch()
+            for op, path, doc in ops[i:i + BATCH_LIMIT]:
+                if op == 'set':
+                    batch.set(self._ref(path), doc)
+                else:
+                    batch.delete(self._ref(path))
+            batch.commit()
+
+
+class JsonSink:
+    """
+    로컬 JSON 백엔드 (문서 하나 = 파일 하나, <root>/<경로>.json)
+    - root='.' 이면 ('rs_kr',) → ./rs_kr.json (프론트 빌드용 산출물)
+    """
+    name = 'json'
+
+    def __init__(self, root=os.path.join(STORAGE_DIR, 'json'), indent=None):
+        self.root = root
+        self.indent = indent
+
+    def _path(self, path):
+        return os.path.join(self.root, *[str(p).replace('/', '_') for p in path]) + '.json'
+
+    def get(self, path):
+        try:
+            with open(self._path(path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def commit(self, ops):
+        for op, path, doc in ops:
+            fp = self._path(path)
+            if op == 'delete':
+                if os.path.exists(fp):
+                    os.remove(fp)
+                continue
+            os.makedirs(os.path.dirname(fp) or '.', exist_ok=True)
+            with open(fp + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(doc, f, ensure_ascii=False, indent=self.indent)
+            os.replace(fp + '.tmp', fp)
+
+
+class SqliteSink:
+    """SQLite 백엔드 (docs 테이블 한 개, 경로 문자열이 키)"""
+    name = 'sqlite'
+
+    def __init__(self, path=os.path.join(STORAGE_DIR, 'store.db')):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS docs (path TEXT PRIMARY KEY, body TEXT NOT NULL, updated REAL NOT NULL)")
+        self.conn.commit()
+
+    def get(self, path):
+        with self.lock:
+            row = self.conn.execute("SELECT body FROM docs WHERE path = ?", ('/'.join(path),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def commit(self, ops):
+        now = time.time()
+        sets = [('/'.join(p), json.dumps(d, ensure_ascii=False), now) for op, p, d in ops if op == 'set']
+        dels = [('/'.join(p),) for op, p, _ in ops if op == 'delete']
+        with self.lock, self.conn:
+            if sets:
+                self.conn.executemany("INSERT OR REPLACE INTO docs (path, body, updated) VALUES (?, ?, ?)", sets)
+            if dels:
+                self.conn.executemany("DELETE FROM docs WHERE path = ?", dels)
+
+
+def make_sink(kind=None, db=None):
+    kind = kind or SINK_KIND
+    if kind == 'firestore':
+        return FirestoreSink(db)
+    if kind == 'json':
+        return JsonSink()
+    if kind == 'sqlite':
+        return SqliteSink()
+    if kind == 'memory':
+        return MemorySink()
+    raise ValueError(f"알 수 없는 저장소: {kind}")
+
+
+# =========================================================================
+# 2. write-behind 큐
+# =========================================================================
+class WriteBehindQueue:
+    """
+    백그라운드 스레드가 모아서 기록하는 큐
+    - put(): 즉시 반환, 같은 경로의 대기 중 기록은 덮어씀
+    - get(): 아직 안 보낸 기록이 있으면 그걸 먼저 (읽기-쓰기 일관성)
+    - flush(): 대기열이 빌 때까지 기다림 / close(): flush 후 남은 건 디스크에 보관
+    - on_commit=(함수, 값): 그 기록이 실제로 백엔드에 들어간 뒤 워커 스레드에서 배치마다 한 번
+      함수([값, ...]) 호출 (같은 함수끼리 모아서 → 문서마다 파일을 다시 쓰지 않음)
+      더 새 기록에 덮이면 버림, 디스크에 보관된 기록은 콜백 없이 재전송 → 호출부는 '안 보냄'으로 남아서 다시 씀
+    """
+
+    def __init__(self, sink, flush_delay=FLUSH_DELAY, spill_name=None):
+        self.sink = sink
+        self.flush_delay = flush_delay
+        self.spill_path = os.path.join(STORAGE_DIR, f"pending_{spill_name or sink.name}.jsonl")
+        self.pending = OrderedDict()    # 경로 → (op, doc)
+        self.inflight = []              # 보내는 중인 기록 (결과 모름)
+        self.callbacks = {}             # 경로 → 대기 중인 기록의 on_commit
+        self.failures = 0
+        self.cond = threading.Condition()
+        self.closed = False
+        self._load_spill()
+        self.thread = threading.Thread(target=self._worker, name=f"sink-{sink.name}", daemon=True)
+        self.thread.start()
+
+    def put(self, op, path, doc=None, on_commit=None):
+        with self.cond:
+            path = tuple(path)
+            self.pending.pop(path, None)
+            self.pending[path] = (op, doc)
+            if on_commit is not None:
+                self.callbacks[path] = on_commit
+            else:
+                self.callbacks.pop(path, None)
+            self.cond.notify_all()
+
+    def set(self, path, doc, on_commit=None):
+        self.put('set', path, doc, on_commit)
+
+    def delete(self, path, on_commit=None):
+        self.put('delete', path, on_commit=on_commit)
+
+    def get(self, path):
+        with self.cond:
+            item = self.pending.get(tuple(path))
+        if item is not None:
+            return item[1] if item[0] == 'set' else None
+        return self.sink.get(path)
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+                if not self.pending and self.closed:
+                    return
+                # 첫 기록 후 잠깐 모았다가 보냄 (flush/close 요청이면 바로)
+                deadline = time.monotonic() + self.flush_delay
+                while not self.closed and self.flush_delay and deadline > time.monotonic():
+                    self.cond.wait(deadline - time.monotonic())
+                items, callbacks = [], {}
+                while self.pending and len(items) < BATCH_LIMIT:
+                    path, (op, doc) = self.pending.popitem(last=False)
+                    items.append((op, path, doc))
+                    if path in self.callbacks:
+                        callbacks[path] = self.callbacks.pop(path)
+                self.inflight = items
+
+            t0 = time.perf_counter()
+            try:
+                self.sink.commit(items)
+                metrics.observe('sink_flush_seconds', time.perf_counter() - t0, sink=self.sink.name)
+                metrics.inc('sink_docs', len(items), sink=self.sink.name)
+                # 완료 콜백은 inflight 를 비우기 전에 (flush() 가 끝나면 콜백도 끝나 있음)
+                self._run_callbacks(callbacks)
+                with self.cond:
+                    self.inflight = []
+                    self.failures = 0
+                    self.cond.notify_all()
+            except Exception as e:
+                with self.cond:
+                    # 실패분 되돌리기 (그 사이 더 새 기록이 들어온 경로는 새 것 유지)
+                    for op, path, doc in reversed(items):
+                        if path not in self.pending:
+                            self.pending[path] = (op, doc)
+                            self.pending.move_to_end(path, last=False)
+                            if path in callbacks:
+                                self.callbacks[path] = callbacks[path]
+                    self.inflight = []
+                    self.failures += 1
+                    wait = min(RETRY_MAX, RETRY_BASE * (2 ** (self.failures - 1)))
+                    self.cond.notify_all()
+                metrics.inc('sink_retries', sink=self.sink.name)
+                print(f"⚠️ [{self.sink.name}] 기록 실패 {len(items)}건, {wait:.0f}초 후 재시도: {e}")
+                with self.cond:
+                    if self.closed:
+                        return
+                    self.cond.wait(wait)
+
+    def _run_callbacks(self, callbacks):
+        """배치에서 커밋된 기록의 on_commit 을 함수별로 모아 한 번씩 호출"""
+        grouped = OrderedDict()
+        for fn, value in callbacks.values():
+            grouped.setdefault(fn, []).append(value)
+        for fn, values in grouped.items():
+            try:
+                fn(values)
+            except Exception as e:
+                print(f"⚠️ [{self.sink.name}] 기록 완료 처리 실패 {len(values)}건: {e}")
+
+    def flush(self, timeout=None):
+        """대기 중인 기록을 바로 보내고 끝날 때까지 대기 (반환: 전부 보냈는지)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            saved_delay, self.flush_delay = self.flush_delay, 0
+            self.cond.notify_all()
+            try:
+                while self.pending or self.inflight:
+                    if not self.thread.is_alive():
+                        break
+                    left = None if deadline is None else deadline - time.monotonic()
+                    if left is not None and left <= 0:
+                        break
+                    self.cond.wait(left if left is not None else 1.0)
+                return not self.pending and not self.inflight
+            finally:
+                self.flush_delay = saved_delay
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """남은 기록 전송 시도 후, 못 보낸 건 다음 실행을 위해 디스크에 보관"""
+        if self.closed:
+            return True
+        ok = self.flush(timeout)
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+            # 보내는 중인 기록도 결과를 모르니 같이 보관 (같은 내용 재기록은 무해)
+            left = list(self.pending.items())
+            left += [(path, (op, doc)) for op, path, doc in self.inflight if path not in self.pending]
+        if left:
+            self._spill(left)
+            print(f"⚠️ [{self.sink.name}] 전송 못 한 기록 {len(left)}건 보관 → 다음 실행 때 재전송")
+        return ok
+
+    def _spill(self, items):
+        os.makedirs(STORAGE_DIR, exist_ok=True)
+        with open(self.spill_path + '.tmp', 'w', encoding='utf-8') as f:
+            for path, (op, doc) in items:
+                f.write(json.dumps({"op": op, "path": list(path), "doc": doc}, ensure_ascii=False) + '\n')
+        os.replace(self.spill_path + '.tmp', self.spill_path)
+
+    def _load_spill(self):
+        if not os.path.exists(self.spill_path):
+            return
+        try:
+            with open(self.spill_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    item = json.loads(line)
+                    self.pending[tuple(item['path'])] = (item['op'], item['doc'])
+            os.remove(self.spill_path)
+            print(f"♻️ [{self.sink.name}] 지난 실행에서 못 보낸 기록 {len(self.pending)}건 재전송")
+        except Exception as e:
+            print(f"⚠️ 보관된 기록 읽기 실패: {e}")
+
+
+# =========================================================================
+# 3. 프로세스 공용 인스턴스
+# =========================================================================
+_store = None
+_files = None
+_lock = threading.Lock()
+
+
+def get_store(db=None):
+    """원격 문서 저장소 큐 (최초 호출 때 백엔드 생성 — Firestore 면 이때 인증)"""
+    global _store
+    with _lock:
+        if _store is None:
+            _store = WriteBehindQueue(make_sink(db=db))
+        return _store
+
+
+def get_files():
+    """프론트 빌드용 로컬 산출물 큐 (rs_kr.json 등, 기존 형식 indent=2 유지)"""
+    global _files
+    with _lock:
+        if _files is None:
+            _files = WriteBehindQueue(JsonSink('.', indent=2), spill_name='files')
+        return _files
+
+
+def close_all(timeout=CLOSE_TIMEOUT):
+    ok = True
+    for q in (_store, _files):
+        if q is not None:
+            ok = q.close(timeout) and ok
+    return ok
+
+
+atexit.register(close_all)
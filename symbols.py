@@ -0,0 +1,239 @@
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import pytz
+import FinanceDataReader as fdr
+import fetch_guard
+
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
+
+# =========================================================================
+# 종목 메타데이터 캐시 (코드 / 이름 / 시장 / 섹터 / 상장주식수)
+# - .cache/symbols/<market>.json 에 컬럼 배열로 저장 → 로드 후 코드→행 번호 dict 로 즉시 조회
+# - TTL(기본 24시간)이 지났거나 날짜(KST)가 바뀌면 다시 받음
+#   다운로드 실패 시 이전 캐시를 그대로 사용 (이름이 영문으로 떨어지지 않음)
+# - RS / 뉴스 / 번들 내보내기가 모두 여기서 이름을 가져옴
+# =========================================================================
+SYMBOL_DIR = os.path.join('.cache', 'symbols')
+SYMBOL_TTL_HOURS = float(os.environ.get('SYMBOL_TTL_HOURS', '24'))
+FIELDS = ('name', 'market', 'sector', 'shares')
+SCHEMA_VERSION = 1
+SHARES_WORKERS = 8
+RETRY_MINUTES = 30      # 갱신 실패 후 다시 시도하기까지 대기 (그동안은 이전 캐시 사용)
+
+kst = pytz.timezone('Asia/Seoul')
+
+_tables = {}
+_failed_at = {}
+_refreshing = set()   # 다운로드 중인 시장 (같은 시장은 한 스레드만 받음)
+_conds = {}           # 시장별 잠금 (한국 / 미국 스테이지가 서로 기다리지 않게)
+_lock = threading.Lock()
+
+
+class SymbolTable:
+    """컬럼 배열 + 코드→행 번호 인덱스"""
+
+    def __init__(self, market, data=None):
+        data = data or {}
+        self.market = market
+        self.fetched = data.get('fetched')
+        self.codes = list(data.get('codes', []))
+        self.cols = {f: list(data.get(f, [None] * len(self.codes))) for f in FIELDS}
+        self.pos = {c: i for i, c in enumerate(self.codes)}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.pos
+
+    def get(self, code):
+        i = self.pos.get(code)
+        if i is None:
+            return None
+        return dict({f: self.cols[f][i] for f in FIELDS}, code=code)
+
+    def name(self, code, default=None):
+        i = self.pos.get(code)
+        return self.cols['name'][i] if i is not None and self.cols['name'][i] else default
+
+    def column(self, field):
+        """{코드: 값} (값이 없는 종목 제외)"""
+        return {c: v for c, v in zip(self.codes, self.cols[field]) if v is not None}
+
+    def is_fresh(self, now=None):
+        if not self.fetched:
+            return False
+        now = now or datetime.now(kst)
+        fetched = datetime.fromisoformat(self.fetched)
+        return now - fetched < timedelta(hours=SYMBOL_TTL_HOURS) and fetched.date() == now.date()
+
+    def to_dict(self):
+        return dict({"version": SCHEMA_VERSION, "market": self.market,
+                     "fetched": self.fetched, "codes": self.codes}, **self.cols)
+
+
+def _num(v):
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return None if v != v else v
+
+
+def _path(market):
+    return os.path.join(SYMBOL_DIR, f"{market}.json")
+
+
+def load_cached(market):
+    try:
+        with open(_path(market), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception:
+        return SymbolTable(market)
+    if data.get('version') != SCHEMA_VERSION:
+        return SymbolTable(market)
+    return SymbolTable(market, data)
+
+
+def save(table):
+    os.makedirs(SYMBOL_DIR, exist_ok=True)
+    path = _path(table.market)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(table.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(path + '.tmp', path)
+
+
+# =========================================================================
+# 시장별 메타데이터 다운로드
+# =========================================================================
+def fetch_kr(listing=None):
+    """
+    KRX 시세표(이름/시장/상장주식수) + 상장사 상세(업종)
+    - listing: 이미 받아 둔 StockListing('KRX') 가 있으면 재사용 (큰 다운로드 1회 절약)
+    """
+    if listing is None:
+        listing = fetch_guard.call(fetch_guard.LISTING_HOST, fdr.StockListing, 'KRX', key='KRX', hedge=False)
+    try:
+        desc = fetch_guard.call(fetch_guard.LISTING_HOST, fdr.StockListing, 'KRX-DESC', key='KRX-DESC', hedge=False)
+        sector_of = {c: s for c, s in zip(desc.Code, desc.Sector) if isinstance(s, str) and s}
+    except Exception as e:
+        print(f"⚠️ 업종 분류를 가져오지 못했습니다: {e}")
+        sector_of = {}
+    shares = listing['Stocks'] if 'Stocks' in listing.columns else [None] * len(listing)
+    rows = {}
+    for code, name, market, n in zip(listing.Code, listing.Name, listing.Market, shares):
+        rows[str(code)] = {"name": name, "market": market, "sector": sector_of.get(code), "shares": _num(n)}
+    return rows
+
+
+def _us_shares(code):
+    try:
+        return _num(yf.Ticker(code).fast_info['shares'])
+    except Exception:
+        return None
+
+
+def fetch_us(seed):
+    """
+    미국 종목: seed = {티커: {"name", "sector"}} (rs_us 유니버스 정의)
+    - 상장주식수는 yfinance 가 있을 때만 (없으면 None → 시총가중 점수 생략)
+    """
+    codes = list(seed)
+    shares = [None] * len(codes)
+    if yf is not None:
+        with ThreadPoolExecutor(max_workers=SHARES_WORKERS) as ex:
+            shares = list(ex.map(_us_shares, codes))
+    return {c: {"name": seed[c].get('name'), "market": seed[c].get('market', 'US'),
+                "sector": seed[c].get('sector'), "shares": n} for c, n in zip(codes, shares)}
+
+
+# =========================================================================
+# 조회
+# =========================================================================
+def _cond(market):
+    with _lock:
+        if market not in _conds:
+            _conds[market] = threading.Condition()
+        return _conds[market]
+
+
+def table(market, fetcher=None, now=None):
+    """
+    종목 메타데이터 테이블 (프로세스 메모리 → 디스크 캐시 → 다운로드 순)
+    - fetcher: 캐시가 오래됐을 때 호출할 함수 (→ {코드: {name, market, sector, shares}})
+      없으면 캐시만 사용
+    - 잠금은 시장별, 다운로드는 잠금 밖에서 (그동안 다른 스레드는 기존 테이블 사용,
+      테이블이 아예 비어 있을 때만 다운로드가 끝나길 기다림)
+    """
+    now = now or datetime.now(kst)
+    cond = _cond(market)
+    with cond:
+        t = _tables.get(market)
+        if t is None:
+            t = _tables[market] = load_cached(market)
+        if market in _refreshing:
+            while market in _refreshing and len(_tables[market]) == 0:
+                cond.wait()
+            return _tables[market]
+        if fetcher is None or t.is_fresh(now):
+            return t
+        failed = _failed_at.get(market)
+        if failed and now - failed < timedelta(minutes=RETRY_MINUTES):
+            return t
+        _refreshing.add(market)
+
+    try:
+        rows = fetcher()
+    except Exception as e:
+        with cond:
+            _failed_at[market] = now
+            _refreshing.discard(market)
+            cond.notify_all()
+        print(f"⚠️ {market} 종목 메타데이터 갱신 실패, 캐시 사용 ({len(t)}종목): {e}")
+        return t
+
+    with cond:
+        _refreshing.discard(market)
+        if rows:
+            codes = list(rows)
+            data = {"fetched": now.isoformat(), "codes": codes}
+            for f in FIELDS:
+                data[f] = [rows[c].get(f) for c in codes]
+            t = _tables[market] = SymbolTable(market, data)
+            save(t)
+        cond.notify_all()
+    if rows:
+        print(f"🗂️ {market} 종목 메타데이터 갱신 ({len(t)}종목)")
+    return t
+
+
+def name(market, code, default=None):
+    return table(market).name(code, default)
+
+
+def caps(market, prices):
+    """{종목: 가격} → {종목: 시가총액} (상장주식수 x 가격, 주식수 없는 종목 제외)"""
+    shares = table(market).column('shares')
+    out = {}
+    for code, p in prices.items():
+        p = _num(p)
+        if p is not None and code in shares:
+            out[code] = shares[code] * p
+    return out
+
+
+def export_view(market):
+    """프론트엔드 번들용 (코드 / 이름 / 시장 / 섹터 컬럼 배열, 상장주식수 제외)"""
+    t = table(market)
+    if not len(t):
+        return None
+    return {
+        "update_time": datetime.fromisoformat(t.fetched).strftime('%Y-%m-%d %H:%M') if t.fetched else '',
+        "columns": dict({"code": t.codes}, **{f: t.cols[f] for f in ('name', 'market', 'sector')}),
+    }
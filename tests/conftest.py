@@ -0,0 +1,44 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# 최상위 모듈(rs_engine, news_match ...)을 그대로 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def _workdir(tmp_path, monkeypatch):
+    """.cache/ 상대 경로(해시 / 보관 기록 / 캐시)가 저장소를 건드리지 않도록 임시 폴더에서 실행"""
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def make_prices():
+    """랜덤 워크 가격 생성기 → (종목 가격 (날짜, 종목), 지수 (날짜,) 또는 (날짜, 벤치마크))"""
+    def _make(rng, n_days, n_tickers, n_bench=1):
+        steps = rng.normal(0, 0.02, size=(n_days, n_tickers + n_bench))
+        prices = 100 * np.exp(np.cumsum(steps, axis=0))
+        stock, index = prices[:, :n_tickers], prices[:, n_tickers:]
+        stock[:rng.integers(1, n_days), 0] = np.nan       # 신규 상장
+        stock[rng.random(stock.shape) < 0.01] = np.nan    # 거래정지
+        stock[-1, 1] = np.nan                             # 오늘 가격 없음
+        return stock, index[:, 0] if n_bench == 1 else index
+    return _make
+
+
+@pytest.fixture
+def make_rss():
+    """[(제목, 링크, 'YYYY-MM-DD HH:MM' UTC)] → 구글 뉴스 형식 RSS 본문 (bytes)"""
+    from datetime import datetime, timezone
+    from email.utils import format_datetime
+    from xml.sax.saxutils import escape
+
+    def _make(items):
+        body = ''.join(
+            f"<item><title>{escape(t)}</title><link>{escape(l)}</link>"
+            f"<pubDate>{format_datetime(datetime.strptime(d, '%Y-%m-%d %H:%M').replace(tzinfo=timezone.utc))}</pubDate>"
+            f"<source>Pub</source></item>"
+            for t, l, d in items)
+        return f"<rss><channel>{body}</channel></rss>".encode('utf-8')
+    return _make
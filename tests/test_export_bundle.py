@@ -0,0 +1,43 @@
+import os
+import pytest
+import export_bundle
+
+
+@pytest.fixture(autouse=True)
+def _no_symbols(monkeypatch):
+    monkeypatch.setattr(export_bundle.symbols, 'export_view', lambda market: None)
+
+
+def _news(update_time, title='HBM 공급 확대'):
+    return {"000660_SK하이닉스": {"update_time": update_time, "articles": [{"title": title}]}}
+
+
+def _files():
+    out = set()
+    for root, _, files in os.walk(export_bundle.BUNDLE_DIR):
+        out |= {os.path.relpath(os.path.join(root, f), export_bundle.BUNDLE_DIR).replace(os.sep, '/') for f in files}
+    return out
+
+
+def test_unchanged_news_keeps_same_file_across_cycles():
+    first = export_bundle.run({"news_kr": _news('2026-01-02 09:00')})['views']['news_kr']['tickers']
+    second = export_bundle.run({"news_kr": _news('2026-01-02 09:05')})['views']['news_kr']['tickers']
+    key = "000660_SK하이닉스"
+    assert first[key]['path'] == second[key]['path']
+    assert second[key]['update_time'] == '2026-01-02 09:05'
+
+    third = export_bundle.run({"news_kr": _news('2026-01-02 09:10', title='신고가')})['views']['news_kr']['tickers']
+    assert third[key]['path'] != second[key]['path']
+
+
+def test_rankings_are_columnar_and_old_generations_cleaned():
+    payload = {"update_time": "t1", "rankings": [{"rank": 1, "code": "A"}, {"rank": 2, "code": "B"}]}
+    assert export_bundle.columnar(payload) == {"update_time": "t1", "columns": {"rank": [1, 2], "code": ["A", "B"]}}
+
+    paths = []
+    for i in range(3):
+        payload['rankings'][0]['code'] = f"A{i}"
+        paths.append(export_bundle.run({"rs_kr": payload})['views']['rs_kr']['path'])
+    # 현재 + 직전 manifest 가 참조하는 파일만 남음
+    assert _files() == {export_bundle.MANIFEST_NAME, paths[1], paths[2]}
+    assert not any(p.endswith(('.gz', '.br')) for p in _files())
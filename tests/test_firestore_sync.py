@@ -0,0 +1,115 @@
+import storage
+import firestore_sync
+
+
+class CountingSink(storage.MemorySink):
+    """commit 횟수를 세고, fail 만큼 실패하는 메모리 백엔드"""
+
+    def __init__(self, fail=0):
+        super().__init__()
+        self.fail = fail
+        self.commits = 0
+
+    def commit(self, ops):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("backend down")
+        self.commits += 1
+        super().commit(ops)
+
+
+def _queue(sink):
+    return storage.WriteBehindQueue(sink, flush_delay=0, spill_name='test')
+
+
+def _entries(*keys, articles='a'):
+    return {k: {"update_time": "2026-01-02 09:00", "articles": [articles]} for k in keys}
+
+
+def _tickers(sink):
+    return {p[-1] for p in sink.docs if len(p) == 4}
+
+
+def test_only_changed_entries_are_written():
+    sink = CountingSink()
+    q = _queue(sink)
+    stats = firestore_sync.sync_sharded(q, 'stock_news', 'news_kr', _entries('A', 'B'), 't1')
+    assert q.flush(5)
+    assert (stats['written'], stats['deleted'], stats['unchanged']) == (2, 0, 0)
+
+    # update_time 만 바뀐 종목은 그대로, 기사가 바뀐 종목만 기록
+    entries = _entries('A', 'B')
+    entries['B']['articles'] = ['b']
+    for e in entries.values():
+        e['update_time'] = '2026-01-02 09:05'
+    stats = firestore_sync.sync_sharded(q, 'stock_news', 'news_kr', entries, 't2')
+    assert q.flush(5)
+    assert (stats['written'], stats['deleted'], stats['unchanged']) == (1, 0, 1)
+    assert sink.docs[('stock_news', 'news_kr', 'tickers', 'B')]['articles'] == ['b']
+    q.close()
+
+
+def test_keep_preserves_failed_tickers_and_deletes_dropped_ones():
+    sink = CountingSink()
+    q = _queue(sink)
+    firestore_sync.sync_sharded(q, 'stock_news', 'news_kr', _entries('A', 'B', 'C'), 't1')
+    assert q.flush(5)
+
+    # B 는 이번 사이클 대상이지만 수집 실패 (keep), C 는 대상에서 빠짐
+    stats = firestore_sync.sync_sharded(q, 'stock_news', 'news_kr', _entries('A', 'D'), 't2',
+                                        keep=['A', 'B', 'D'])
+    assert q.flush(5)
+    assert stats['deleted'] == 1
+    assert _tickers(sink) == {'A', 'B', 'D'}
+    assert sink.docs[('stock_news', 'news_kr')]['count'] == 3
+    assert set(firestore_sync.load_hashes('stock_news__news_kr')) == {'A', 'B', 'D'}
+    q.close()
+
+
+def test_hashes_recorded_only_after_commit():
+    sink = CountingSink(fail=1)
+    storage.RETRY_BASE, saved = 0.01, storage.RETRY_BASE
+    try:
+        q = _queue(sink)
+        firestore_sync.sync_sharded(q, 'stock_news', 'news_us', _entries('AAPL'), 't1')
+        assert q.flush(5)
+    finally:
+        storage.RETRY_BASE = saved
+    assert set(firestore_sync.load_hashes('stock_news__news_us')) == {'AAPL'}
+    q.close()
+
+
+def test_spilled_writes_are_rewritten_next_run():
+    sink = CountingSink(fail=10 ** 6)
+    q = _queue(sink)
+    firestore_sync.sync_sharded(q, 'stock_news', 'news_us', _entries('AAPL'), 't1')
+    q.close(timeout=0.2)
+    # 보내지 못했으니 해시 없음 → 다음 사이클에 다시 씀
+    assert firestore_sync.load_hashes('stock_news__news_us') == {}
+    q = _queue(CountingSink())
+    stats = firestore_sync.sync_sharded(q, 'stock_news', 'news_us', _entries('AAPL'), 't2')
+    assert stats['written'] == 1
+    q.close()
+
+
+def test_hash_file_written_once_per_batch(monkeypatch):
+    saves = []
+    real_save = firestore_sync.save_hashes
+    monkeypatch.setattr(firestore_sync, 'save_hashes', lambda name, h: (saves.append(name), real_save(name, h)))
+    sink = CountingSink()
+    q = storage.WriteBehindQueue(sink, flush_delay=5, spill_name='test')
+    firestore_sync.sync_sharded(q, 'stock_news', 'news_kr', _entries(*[f"T{i}" for i in range(50)]), 't1')
+    assert q.flush(5)
+    assert sink.commits == 1
+    assert saves == ['stock_news__news_kr']
+    assert len(firestore_sync.load_hashes('stock_news__news_kr')) == 50
+    q.close()
+
+
+def test_set_if_changed_skips_same_payload():
+    q = _queue(CountingSink())
+    doc = {"update_time": "t1", "rankings": [1, 2]}
+    assert firestore_sync.set_if_changed(q, 'rs_data', 'latest', doc) > 0
+    assert q.flush(5)
+    assert firestore_sync.set_if_changed(q, 'rs_data', 'latest', dict(doc, update_time='t2')) == 0
+    q.close()
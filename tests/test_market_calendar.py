@@ -0,0 +1,94 @@
+from datetime import date, datetime, time as dtime
+import pytz
+import pytest
+import market_calendar
+import manager
+
+KST = pytz.timezone('Asia/Seoul')
+ET = pytz.timezone('America/New_York')
+
+
+def _kst(s):
+    return KST.localize(datetime.strptime(s, '%Y-%m-%d %H:%M'))
+
+
+@pytest.mark.parametrize('market, day, expected', [
+    ('kr', '2026-02-13', True),    # 금요일
+    ('kr', '2026-02-14', False),   # 토요일
+    ('kr', '2026-02-17', False),   # 설날
+    ('kr', '2026-12-31', False),   # 연말 휴장
+    ('us', '2026-04-03', False),   # 성금요일
+    ('us', '2026-07-03', False),   # 7/4(토) 대체 휴장
+    ('us', '2026-07-06', True),
+])
+def test_trading_days(market, day, expected):
+    assert market_calendar.is_trading_day(market, date.fromisoformat(day)) is expected
+
+
+def test_session_bounds_and_early_close():
+    open_dt, close_dt = market_calendar.session_bounds('kr', date(2026, 3, 3))
+    assert (open_dt.time(), close_dt.time()) == (dtime(9, 0), dtime(15, 30))
+    assert open_dt.tzinfo.zone == 'Asia/Seoul'
+    _, close_dt = market_calendar.session_bounds('us', date(2026, 11, 27))
+    assert close_dt.time() == dtime(13, 0)
+
+
+def test_is_open_follows_us_daylight_saving():
+    # 서머타임 전: 09:30 ET = 23:30 KST / 후: 22:30 KST
+    assert not market_calendar.is_open('us', _kst('2026-03-06 22:45'))
+    assert market_calendar.is_open('us', _kst('2026-03-06 23:45'))
+    assert market_calendar.is_open('us', _kst('2026-03-09 22:45'))
+    assert not market_calendar.is_open('kr', _kst('2026-03-09 15:30'))
+    assert market_calendar.is_open('kr', _kst('2026-03-09 15:29'))
+
+
+def test_last_session_close_skips_weekend_and_holidays():
+    close_dt = market_calendar.last_session_close('kr', _kst('2026-02-19 08:00'))   # 설 연휴 직후 아침
+    assert close_dt == _kst('2026-02-13 15:30')
+    close_dt = market_calendar.last_session_close('us', _kst('2026-11-28 10:00'))   # 추수감사절 다음 날 조기 폐장
+    assert close_dt == ET.localize(datetime(2026, 11, 27, 13, 0))
+
+
+def test_trading_days_range():
+    days = market_calendar.trading_days('kr', '2026-02-13', '2026-02-20')
+    assert [d.isoformat() for d in days] == ['2026-02-13', '2026-02-19', '2026-02-20']
+
+
+@pytest.mark.parametrize('year', [2025, 2026])
+def test_nyse_rules_match_published_tables(year):
+    holidays, early = market_calendar._nyse_rules(year)
+    m = market_calendar.MARKETS['us']
+    table = {d for d in m['holidays'] if d.startswith(f"{year}-")}
+    assert holidays == table - {'2025-01-09'}        # 임시 휴장 (카터 전 대통령 국장)은 규칙 밖
+    assert early == {d: t for d, t in m['early_close'].items() if d.startswith(f"{year}-")}
+
+
+def test_years_after_table_use_rules():
+    assert not market_calendar.is_trading_day('us', date(2027, 3, 26))   # 성금요일
+    assert not market_calendar.is_trading_day('us', date(2027, 7, 5))    # 7/4(일) 대체
+    assert not market_calendar.is_trading_day('us', date(2027, 12, 24))  # 12/25(토) 대체
+    assert market_calendar.session_bounds('us', date(2027, 11, 26))[1].time() == dtime(13, 0)
+    assert not market_calendar.is_trading_day('kr', date(2027, 3, 1))
+    assert not market_calendar.is_trading_day('kr', date(2027, 12, 31))
+
+
+# =========================================================================
+# 스케줄러 주기 판정
+# =========================================================================
+def test_is_due_open_interval_with_cron_jitter():
+    job = manager.JOBS['rs_kr']
+    now = _kst('2026-03-10 10:40')
+    state = {'rs_kr': {'last_run': now.timestamp() - job['open'] + 30}}   # 30초 모자람 (크론 지연)
+    assert manager.is_due('rs_kr', job, state, now)
+    state = {'rs_kr': {'last_run': now.timestamp() - job['open'] / 2}}
+    assert not manager.is_due('rs_kr', job, state, now)
+
+
+def test_is_due_once_after_close():
+    job = manager.JOBS['rs_kr']
+    after = _kst('2026-03-10 16:00')
+    assert manager.is_due('rs_kr', job, {'rs_kr': {'last_run': _kst('2026-03-10 15:00').timestamp()}}, after)
+    assert not manager.is_due('rs_kr', job, {'rs_kr': {'last_run': _kst('2026-03-10 15:40').timestamp()}}, after)
+    # 주말에도 금요일 마감 후 한 번 돌았으면 다시 안 돎
+    assert not manager.is_due('rs_kr', job, {'rs_kr': {'last_run': _kst('2026-03-13 16:00').timestamp()}},
+                              _kst('2026-03-14 12:00'))
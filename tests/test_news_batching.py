@@ -0,0 +1,92 @@
+import news_match
+import news_fetch
+
+
+# =========================================================================
+# 제목 → 종목 매칭
+# =========================================================================
+def _matcher():
+    return news_match.NameMatcher({
+        'SK': ['SK'],
+        'HYNIX': ['SK하이닉스'],
+        'SAMSUNG': ['삼성전자'],
+        'LAND': ['전자랜드'],
+        'AAPL': ['Apple'],
+        'GOOGL': ['Alphabet', 'Google'],
+        'META': ['Meta'],
+    })
+
+
+def test_longer_name_wins_when_nested():
+    m = _matcher()
+    assert m.match('SK하이닉스, HBM 공급 확대') == {'HYNIX'}
+    assert m.match('SK 그룹과 SK하이닉스 동반 강세') == {'SK', 'HYNIX'}
+
+
+def test_partial_overlap_keeps_both():
+    assert _matcher().match('삼성전자랜드 매장 확대') == {'SAMSUNG', 'LAND'}
+
+
+def test_ascii_names_need_word_boundaries():
+    m = _matcher()
+    assert m.match('Pineapple prices jump') == set()
+    assert m.match("Apple's new iPhone") == {'AAPL'}
+    assert m.match('Metaverse spending slows') == set()
+    assert m.match('META, Google shares rise') == {'META', 'GOOGL'}
+
+
+def test_korean_names_match_with_particles():
+    assert _matcher().match('삼성전자가 신고가') == {'SAMSUNG'}
+
+
+def test_clean_name_strips_corporate_suffixes():
+    assert news_match.clean_name('Tesla, Inc.') == 'Tesla'
+    assert news_match.clean_name('Merck & Co.') == 'Merck'
+    assert news_match.clean_name('Alphabet Inc. (A)') == 'Alphabet'
+
+
+# =========================================================================
+# 묶음 구성 / 묶음 결과 분배
+# =========================================================================
+def _terms(n):
+    return {f"{i:06d}_종목{i}": [f"종목{i}"] for i in range(n)}
+
+
+def test_plan_batches_respects_size_and_query_length():
+    terms = _terms(40)
+    terms['999999_긴이름'] = ['가' * 150, '나' * 150, '다' * 150]
+    batches = news_fetch.plan_batches(terms, batch_size=8)
+    assert sorted(k for keys in batches.values() for k in keys) == sorted(terms)
+    for keys in batches.values():
+        assert len(keys) <= 8
+        if len(keys) > 1:
+            assert len(news_fetch.batch_query([t for k in keys for t in terms[k]])) <= news_fetch.MAX_QUERY_CHARS
+
+
+def test_plan_batches_stable_when_one_ticker_changes():
+    terms = _terms(60)
+    before = news_fetch.plan_batches(terms, batch_size=8)
+    del terms['000007_종목7']
+    terms['123456_신규'] = ['신규']
+    after = news_fetch.plan_batches(terms, batch_size=8)
+    same = [k for k in before if after.get(k) == before[k]]
+    assert len(same) >= len(before) - 2
+
+
+def test_collect_batched_demuxes_titles(monkeypatch, make_rss):
+    terms = {'000660_SK하이닉스': ['SK하이닉스'], '034730_SK': ['SK'], '005930_삼성전자': ['삼성전자']}
+    body = make_rss([
+        ('SK하이닉스 HBM 공급 - Pub', 'https://x/1', '2026-01-02 01:00'),
+        ('삼성전자, SK 동반 상승 - Pub', 'https://x/2', '2026-01-02 02:00'),
+        ('코스피 마감 시황 - Pub', 'https://x/3', '2026-01-02 03:00'),
+    ])
+
+    async def request(session, url, headers):
+        return 200, body, None, None
+
+    monkeypatch.setattr(news_fetch, '_request', request)
+    out = news_fetch.collect_batched(terms, 'kr', 'ko', adaptive=False)
+    titles = {k: [a['title'] for a in v[0]] for k, v in out.items()}
+    assert titles['000660_SK하이닉스'] == ['SK하이닉스 HBM 공급 - Pub']
+    assert titles['034730_SK'] == ['삼성전자, SK 동반 상승 - Pub']
+    assert titles['005930_삼성전자'] == ['삼성전자, SK 동반 상승 - Pub']
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+import fetch_guard
+import news_fetch
+
+
+@pytest.fixture(autouse=True)
+def _fresh_guard():
+    fetch_guard.reset_cycle()
+    yield
+    fetch_guard.reset_cycle()
+
+
+def _feeds(*keys):
+    return {k: news_fetch.google_news_url(k.split('_', 1)[1], 'ko') for k in keys}
+
+
+def test_conditional_get_and_failure_fallback(monkeypatch, make_rss):
+    bodies = {'삼성전자': make_rss([('삼성전자 신고가', 'https://a/1', '2026-01-02 01:00')]),
+              'SK하이닉스': make_rss([('HBM 공급', 'https://b/1', '2026-01-02 02:00')])}
+    sent = []
+
+    async def request(session, url, headers):
+        sent.append((url, dict(headers)))
+        name = next(n for n in bodies if news_fetch.quote_plus(n) in url)
+        return 200, bodies[name], f'"{name}"', None
+
+    monkeypatch.setattr(news_fetch, '_request', request)
+    feeds = _feeds('005930_삼성전자', '000660_SK하이닉스')
+    first = news_fetch.collect(feeds, 'kr', adaptive=False)
+    assert first['005930_삼성전자'][0][0]['title'] == '삼성전자 신고가'
+    assert all(changed for _, changed in first.values())
+
+    async def not_modified(session, url, headers):
+        sent.append((url, dict(headers)))
+        if 'SK' in url:
+            raise ConnectionError("reset")
+        return 304, b'', None, None
+
+    monkeypatch.setattr(news_fetch, '_request', not_modified)
+    second = news_fetch.collect(feeds, 'kr', adaptive=False)
+    assert sent[-2][1]['If-None-Match'] in ('"삼성전자"', '"SK하이닉스"')
+    assert second['005930_삼성전자'] == (first['005930_삼성전자'][0], False)
+    # 실패한 피드는 저장된 기사 + stale 표시
+    assert second['000660_SK하이닉스'] == (first['000660_SK하이닉스'][0], False)
+    assert fetch_guard.is_stale('000660_SK하이닉스')
+
+
+def test_cancelled_fetch_is_treated_as_failure(monkeypatch):
+    async def fetch_one(session, sem, key, url, entry, seen):
+        raise asyncio.CancelledError()
+
+    monkeypatch.setattr(news_fetch, '_fetch_one', fetch_one)
+    out = news_fetch.collect(_feeds('005930_삼성전자'), 'kr', adaptive=False)
+    assert isinstance(out['005930_삼성전자'], asyncio.CancelledError)
+
+
+def test_call_async_cancelled_attempt_raises_regular_error():
+    async def main():
+        async def cancelled():
+            raise asyncio.CancelledError()
+        return await fetch_guard.call_async('test-host', cancelled, key='k', deadline=1, hedge=False)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(main())
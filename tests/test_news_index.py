@@ -0,0 +1,49 @@
+import news_index
+
+
+def _items(*specs):
+    return [(f"기사 {n}", f"https://news/{n}?utm=x", d) for n, d in specs]
+
+
+def test_parse_new_items_skips_known_and_stops_early(make_rss, monkeypatch):
+    seen = {}
+    first = news_index.parse_new_items(make_rss(_items((3, '2026-01-02 03:00'), (2, '2026-01-02 02:00'),
+                                                       (1, '2026-01-02 01:00'))), seen)
+    assert [a['title'] for a in first] == ['기사 3', '기사 2', '기사 1']
+    assert first[0]['time'] == '2026-01-02 12:00'          # KST
+    assert news_index.link_key('https://news/3?utm=y') in seen
+
+    # 새 기사 1개 + 이미 본 기사 연속 → 그 뒤는 파싱하지 않음
+    monkeypatch.setattr(news_index, 'STOP_AFTER_KNOWN', 2)
+    body = make_rss(_items((4, '2026-01-02 04:00'), (3, '2026-01-02 03:00'), (2, '2026-01-02 02:00'),
+                           (9, '2026-01-01 09:00')))
+    assert [a['title'] for a in news_index.parse_new_items(body, seen)] == ['기사 4']
+
+
+def test_same_title_with_new_link_is_known(make_rss):
+    seen = {}
+    news_index.parse_new_items(make_rss([('같은 제목', 'https://a/1', '2026-01-02 01:00')]), seen)
+    again = news_index.parse_new_items(make_rss([('같은  제목', 'https://b/2', '2026-01-02 01:05')]), seen)
+    assert again == []
+
+
+def _a(title, time):
+    return {'title': title, 'time': time}
+
+
+def test_merge_top_keeps_order_limit_and_new_copy_on_ties():
+    old = [_a('x', '2026-01-02 10:00'), _a('y', '2026-01-02 09:00'), _a('z', '2026-01-01 09:00')]
+    new = [_a('w', '2026-01-02 09:30'), dict(_a('y', '2026-01-02 09:00'), fresh=True)]
+    merged = news_index.merge_top(new, old, 3)
+    assert [a['title'] for a in merged] == ['x', 'w', 'y']
+    assert merged[2].get('fresh')                           # 시각이 같으면 새로 받은 쪽
+    assert news_index.merge_top([], old, 20) == old
+
+
+def test_save_index_prunes_old_entries(monkeypatch):
+    now = 1_800_000_000
+    monkeypatch.setattr(news_index.time, 'time', lambda: now)
+    index = {'A': {'l:new': now - 60, 'l:old': now - (news_index.INDEX_TTL_DAYS + 1) * 86400},
+             'B': {'l:old': now - (news_index.INDEX_TTL_DAYS + 1) * 86400}}
+    news_index.save_index('kr', index)
+    assert news_index.load_index('kr') == {'A': {'l:new': now - 60}}
@@ -0,0 +1,129 @@
+import pandas as pd
+import pytest
+import price_cache
+
+
+class FakeSource:
+    """날짜별 종가 dict 로 DataReader 흉내 (호출 구간 기록)"""
+
+    def __init__(self, closes):
+        self.closes = dict(closes)
+        self.calls = []
+
+    def __call__(self, code, start, end):
+        self.calls.append((start, end))
+        idx = [d for d in sorted(self.closes) if pd.Timestamp(start) <= pd.Timestamp(d) <= pd.Timestamp(end)]
+        close = [self.closes[d] for d in idx]
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1},
+                            index=pd.DatetimeIndex(idx))
+
+
+def _days(start, n):
+    return [d.strftime('%Y-%m-%d') for d in pd.bdate_range(start, periods=n)]
+
+
+def test_delta_fetch_starts_at_last_bar():
+    days = _days('2026-01-05', 30)
+    src = FakeSource({d: 100.0 + i for i, d in enumerate(days[:20])})
+    price_cache.get_history('AAA', days[0], days[20], fetcher=src)   # 마지막 봉(days[19])은 확정
+
+    src.closes.update({d: 100.0 + i for i, d in enumerate(days) if i >= 20})
+    df = price_cache.get_history('AAA', days[0], days[25], fetcher=src)
+    assert src.calls[-1][0] == days[19]
+    assert df['Close'].tolist() == [100.0 + i for i in range(26)]
+
+
+def test_intraday_bar_is_replaced_not_used_as_anchor():
+    days = _days('2026-01-05', 10)
+    src = FakeSource({d: 100.0 for d in days[:6]})
+    src.closes[days[5]] = 90.0                                 # 장중 값
+    price_cache.get_history('AAA', days[0], days[5], fetcher=src)
+
+    src.closes[days[5]] = 95.0                                 # 확정 종가
+    src.closes[days[6]] = 96.0
+    df = price_cache.get_history('AAA', days[0], days[6], fetcher=src)
+    assert src.calls[-1][0] == days[4]                         # 확정된 전 봉부터
+    assert len(src.calls) == 2                                 # 전체 재다운로드 없음
+    assert df['Close'].tolist()[-2:] == [95.0, 96.0]
+
+
+def test_adjusted_history_triggers_full_refetch():
+    days = _days('2026-01-05', 12)
+    src = FakeSource({d: 1000.0 for d in days[:10]})
+    price_cache.get_history('AAA', days[0], days[9], fetcher=src)
+
+    # 1:10 액면분할 → 과거 봉이 전부 수정됨
+    src.closes = {d: 100.0 for d in days}
+    df = price_cache.get_history('AAA', days[0], days[11], fetcher=src)
+    assert src.calls[-1][0] == days[0]
+    assert set(df['Close']) == {100.0}
+    assert set(price_cache.load_cached('AAA')['Close']) == {100.0}
+
+
+def test_recent_listing_is_not_refetched_every_run():
+    days = _days('2026-03-02', 20)
+    src = FakeSource({d: 50.0 for d in days})
+    start = '2025-06-01'                                       # 상장 훨씬 전부터 요청
+    price_cache.get_history('NEW', start, days[15], fetcher=src)
+    df = price_cache.get_history('NEW', '2025-06-02', days[19], fetcher=src)
+    assert src.calls[-1][0] == days[14]                        # 증분만
+    assert len(df) == 20
+
+
+def test_failure_falls_back_to_cache_and_marks_stale():
+    days = _days('2026-01-05', 5)
+    price_cache.get_history('AAA', days[0], days[4], fetcher=FakeSource({d: 1.0 for d in days}))
+
+    def down(code, start, end):
+        raise ConnectionError("down")
+
+    df = price_cache.get_history('AAA', days[0], days[4], fetcher=down)
+    assert len(df) == 5
+    with pytest.raises(ConnectionError):
+        price_cache.get_history('BBB', days[0], days[4], fetcher=down)
+
+
+def _snapshot(codes, close):
+    return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1},
+                        index=pd.Index(codes, name='Code'))
+
+
+def _seed(code, days, close=100.0):
+    """장 마감 뒤 받은 것처럼 (마지막 봉 확정)"""
+    end = pd.Timestamp(days[-1]) + pd.Timedelta(days=1)
+    price_cache.get_history(code, days[0], end, fetcher=FakeSource({d: close for d in days}))
+
+
+def test_intraday_snapshot_is_not_built_upon():
+    days = _days('2026-01-05', 8)
+    _seed('AAA', days[:6])
+
+    # 장중 스냅샷 → 반영은 하되 미확정
+    assert price_cache.append_snapshot(days[6], _snapshot(['AAA'], 101.0), days[5]) == ['AAA']
+    # 같은 날 다시 받으면 덮어씀
+    assert price_cache.append_snapshot(days[6], _snapshot(['AAA'], 102.0), days[5]) == ['AAA']
+    assert price_cache.load_cached('AAA')['Close'].iloc[-1] == 102.0
+    # 다음 날: 직전 봉이 미확정이라 벌크 반영하지 않음 → 개별 다운로드가 다시 받음
+    assert price_cache.append_snapshot(days[7], _snapshot(['AAA'], 104.0), days[6]) == []
+
+    src = FakeSource({d: 100.0 for d in days[:6]} | {days[6]: 103.0, days[7]: 104.0})
+    df = price_cache.get_history('AAA', days[0], days[7], fetcher=src)
+    assert src.calls == [(days[5], days[7])]
+    assert df['Close'].tolist()[-2:] == [103.0, 104.0]
+
+
+def test_final_snapshot_can_be_built_upon():
+    days = _days('2026-01-05', 8)
+    _seed('AAA', days[:6])
+    assert price_cache.append_snapshot(days[6], _snapshot(['AAA'], 101.0), days[5], final=True) == ['AAA']
+    assert price_cache.append_snapshot(days[7], _snapshot(['AAA'], 102.0), days[6]) == ['AAA']
+    assert price_cache.load_cached('AAA')['Close'].tolist()[-2:] == [101.0, 102.0]
+
+
+def test_snapshot_skips_adjusted_prev_close():
+    days = _days('2026-01-05', 7)
+    _seed('AAA', days[:6], close=1000.0)
+    _seed('BBB', days[:6], close=1000.0)
+    prev = pd.Series({'AAA': 100.0, 'BBB': 1000.0})            # AAA 액면분할
+    fresh = price_cache.append_snapshot(days[6], _snapshot(['AAA', 'BBB'], 101.0), days[5], prev_close=prev)
+    assert fresh == ['BBB']
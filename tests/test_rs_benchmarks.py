@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import rs_engine
+
+PERIODS = [120, 60, 20]
+WEIGHTS = [0.5, 0.3, 0.2]
+
+
+def _score(values):
+    return (pd.Series(values).rank(pct=True, method='average') * 98 + 1).round(0).to_numpy()
+
+
+def _excess(prices, index, p):
+    return (prices[-1] / prices[-(p + 1)] - 1) - (index[-1] / index[-(p + 1)] - 1)
+
+
+def _weighted(per_period):
+    return np.round(np.nansum([s * w for s, w in zip(per_period, WEIGHTS)], axis=0))
+
+
+def test_first_benchmark_matches_single_index(make_prices):
+    prices, index = make_prices(np.random.default_rng(21), 200, 50, n_bench=3)
+    multi = rs_engine.compute_rs(prices, index, PERIODS, WEIGHTS)
+    single = rs_engine.compute_rs(prices, index[:, 0], PERIODS, WEIGHTS)
+    for key in ('scores', 'avg', 'disparity', 'index_ret'):
+        np.testing.assert_allclose(multi[key], single[key], equal_nan=True, err_msg=key)
+    assert 'bench_avg' not in single and multi['bench_avg'].shape == (3, 50)
+
+
+def test_bench_scores_rank_all_benchmarks_together(make_prices):
+    """벤치마크별 점수는 (벤치마크 x 종목) 전체를 한 줄로 순위 → 지수끼리 비교 가능"""
+    prices, index = make_prices(np.random.default_rng(22), 200, 40, n_bench=2)
+    res = rs_engine.compute_rs(prices, index, PERIODS, WEIGHTS)
+
+    per_period = []
+    for p in PERIODS:
+        pooled = np.concatenate([_excess(prices, index[:, b], p) for b in range(2)])
+        per_period.append(_score(pooled).reshape(2, 40))
+    np.testing.assert_allclose(res['bench_avg'], _weighted(per_period))
+    # 더 약한 지수 대비 점수가 평균적으로 더 높음
+    weak = int(np.argmin(index[-1] / index[-(PERIODS[0] + 1)]))
+    assert np.nanmean(res['bench_avg'][weak]) >= np.nanmean(res['bench_avg'][1 - weak])
+
+
+def test_home_scores_use_each_tickers_own_index(make_prices):
+    rng = np.random.default_rng(23)
+    prices, index = make_prices(rng, 200, 40, n_bench=2)
+    home = rng.integers(0, 2, size=40)
+    res = rs_engine.compute_rs(prices, index, PERIODS, WEIGHTS, home)
+
+    per_period = []
+    for p in PERIODS:
+        own = np.array([_excess(prices[:, [t]], index[:, h], p)[0] for t, h in enumerate(home)])
+        per_period.append(_score(own))
+    np.testing.assert_allclose(res['home_avg'], _weighted(per_period))
+
+
+def test_rs_frame_columns_per_benchmark(make_prices):
+    prices, index = make_prices(np.random.default_rng(24), 200, 10, n_bench=2)
+    dates = pd.bdate_range('2025-06-02', periods=200)
+    close = pd.DataFrame(prices, index=dates, columns=[f"C{i}" for i in range(10)])
+    bench = pd.DataFrame(index, index=dates, columns=['KS11', 'KQ11'])
+
+    df = rs_engine.rs_frame(close, bench, PERIODS, WEIGHTS, home=np.zeros(10, dtype=int))
+    assert {'W_RS_KS11', 'W_RS_KQ11', 'W_RS_Home'} <= set(df.columns)
+    # home 이 전부 기본 지수면 소속 지수 점수 == 기본 점수
+    pd.testing.assert_series_equal(df['W_RS_Home'], df['W_RS_Avg'], check_names=False)
+    row = df.iloc[3]
+    assert rs_engine.bench_scores(row, ['KS11', 'KQ11']) == {b: int(row[f'W_RS_{b}']) for b in ('KS11', 'KQ11')}
+    assert rs_engine.bench_scores(row, ['KS11']) == {}
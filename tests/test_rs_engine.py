@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+import rs_engine
+
+PERIODS = [180, 90, 60, 30, 10]
+WEIGHTS = [0.2, 0.2, 0.2, 0.2, 0.2]
+
+
+# =========================================================================
+# pct_rank == pandas rank(method='average', pct=True)
+# =========================================================================
+def _pandas_pct(values):
+    v = np.asarray(values, dtype=float)
+    flat = v.reshape(-1, v.shape[-1])
+    out = np.vstack([pd.Series(row).rank(method='average', pct=True).to_numpy() for row in flat])
+    return out.reshape(v.shape)
+
+
+@pytest.mark.parametrize("shape", [(1, 7), (40, 25), (3, 4, 50)])
+def test_pct_rank_matches_pandas_with_ties_and_nans(shape):
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 6, size=shape).astype(float)   # 값 종류가 적어서 동점이 많음
+    values[rng.random(shape) < 0.2] = np.nan
+    np.testing.assert_allclose(rs_engine.pct_rank(values), _pandas_pct(values), equal_nan=True)
+
+
+def test_pct_rank_all_nan_and_single_value_rows():
+    values = np.array([[np.nan, np.nan, np.nan], [np.nan, 5.0, np.nan], [2.0, 2.0, 2.0]])
+    np.testing.assert_allclose(rs_engine.pct_rank(values), _pandas_pct(values), equal_nan=True)
+
+
+def test_pct_rank_1d():
+    values = np.array([3.0, np.nan, 1.0, 3.0, -2.0])
+    np.testing.assert_allclose(rs_engine.pct_rank(values), _pandas_pct(values[None, :])[0], equal_nan=True)
+
+
+# =========================================================================
+# rs_frame == 예전 종목 스크립트의 기간별 pandas 계산
+# =========================================================================
+PERIODS = [180, 90, 60, 30, 10]
+WEIGHTS = [0.2, 0.2, 0.2, 0.2, 0.2]
+
+
+def _legacy_frame(close, index):
+    out = pd.DataFrame(index=close.columns)
+    for p in PERIODS:
+        rs_val = (close.iloc[-1] / close.iloc[-(p + 1)] - 1) - (index.iloc[-1] / index.iloc[-(p + 1)] - 1)
+        out[f'RS_{p}D'] = (rs_val.rank(pct=True, method='average') * 98 + 1).round(0).astype('Int64')
+    out['W_RS_Avg'] = out.apply(
+        lambda r: sum(r[f'RS_{p}D'] * w for p, w in zip(PERIODS, WEIGHTS) if pd.notna(r[f'RS_{p}D'])),
+        axis=1).round(0).astype('Int64')
+    out['Disparity(%)'] = ((close.iloc[-1] / close.rolling(50).mean().iloc[-1] - 1) * 100).round(1)
+    return out
+
+
+def test_rs_frame_matches_legacy_per_period_calculation(make_prices):
+    prices, index = make_prices(np.random.default_rng(11), 300, 60)
+    dates = pd.bdate_range('2025-01-01', periods=300)
+    close = pd.DataFrame(prices, index=dates, columns=[f"{i:06d}" for i in range(60)]).ffill()
+    index = pd.Series(index, index=dates)
+
+    got = rs_engine.rs_frame(close, index, PERIODS, WEIGHTS)
+    pd.testing.assert_frame_equal(got, _legacy_frame(close, index), check_dtype=False)
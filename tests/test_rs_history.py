@@ -0,0 +1,98 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import rs_engine
+import rs_history
+
+PERIODS = [180, 90, 60, 30, 10]
+WEIGHTS = [0.2, 0.2, 0.2, 0.2, 0.2]
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    rs_history._cache.clear()
+
+
+def _rankings(codes, base=50):
+    return [{"rank": i + 1, "code": c, "rs_avg": base - i, **{f"rs_{p}": base - i for p in PERIODS}}
+            for i, c in enumerate(codes)]
+
+
+def _at(day, hhmm='1530'):
+    return pd.Timestamp(f"{day} {hhmm[:2]}:{hhmm[2:]}")
+
+
+def test_trajectory_and_movers():
+    today = pd.Timestamp.now().normalize()
+    d1, d2 = (today - pd.Timedelta(days=2)).strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d')
+    rs_history.append_snapshot('kr', _at(d1, '1000'), _rankings(['A', 'B', 'C']))
+    rs_history.append_snapshot('kr', _at(d1), _rankings(['B', 'A', 'C']))
+    rs_history.append_snapshot('kr', _at(d2), _rankings(['C', 'A', 'B']))
+
+    traj = rs_history.trajectory('kr', 'B', days=5)
+    assert traj['rank'].tolist() == [1, 3]            # 날짜별 마지막 스냅샷
+    moved = rs_history.movers('kr', d1)
+    assert moved.set_index('code')['change'].to_dict() == {'C': 2, 'B': -2, 'A': 0}
+
+
+def test_uncommitted_tail_is_ignored_and_truncated():
+    rs_history.append_snapshot('kr', _at('2026-01-02'), _rankings(['A', 'B']))
+    # 컬럼 하나만 붙고 meta 를 못 쓴 채로 죽은 상황
+    with open(os.path.join(rs_history._dir('kr'), 'rank.bin'), 'ab') as f:
+        f.write(np.array([9, 9, 9], dtype=np.int16).tobytes())
+    rs_history._cache.clear()
+    cols, _ = rs_history.load('kr')
+    assert cols['rank'].tolist() == [1, 2]
+
+    rs_history.append_snapshot('kr', _at('2026-01-05'), _rankings(['B', 'A']))
+    cols, meta = rs_history.load('kr')
+    assert meta['rows'] == 4
+    assert all(len(c) == 4 for c in cols.values())
+    assert cols['rank'].tolist() == [1, 2, 1, 2]
+
+
+def test_period_mismatch_raises_clear_error():
+    rs_history.append_snapshot('us', _at('2026-01-02'), _rankings(['AAPL']))
+    prices = pd.DataFrame({'AAPL': np.linspace(100, 200, 300)}, index=pd.bdate_range('2025-01-01', periods=300))
+    index = pd.Series(np.linspace(100, 150, 300), index=prices.index)
+    with pytest.raises(ValueError, match='reset'):
+        rs_history.backfill('us', prices, index, periods=[120, 60, 20])
+    with pytest.raises(ValueError, match='reset'):
+        rs_history.append_snapshot('us', _at('2026-01-05'), _rankings(['AAPL']), periods=[120, 60, 20])
+
+    rs_history.reset('us')
+    assert rs_history.backfill('us', prices, index, periods=[120, 60, 20]) == 300 - 120
+
+
+def test_backfill_adds_only_missing_dates(make_prices):
+    prices, index = make_prices(np.random.default_rng(7), 220, 12)
+    dates = pd.bdate_range('2025-03-03', periods=220)
+    close = pd.DataFrame(prices, index=dates, columns=[f"T{i}" for i in range(12)]).ffill()
+    idx = pd.Series(index, index=dates)
+
+    rs_history.append_snapshot('kr', dates[-1], _rankings(['T1', 'T2']))
+    added = rs_history.backfill('kr', close, idx, PERIODS, WEIGHTS)
+    assert added == 220 - max(PERIODS) - 1
+    assert rs_history.backfill('kr', close, idx, PERIODS, WEIGHTS) == 0
+
+    # 백필한 마지막 날 점수 == 그날 compute_rs
+    cols, meta = rs_history.load('kr')
+    day = int(dates[-2].strftime('%Y%m%d'))
+    single = rs_engine.compute_rs(close.to_numpy()[:-1], index[:-1], PERIODS, WEIGHTS)
+    rows = np.flatnonzero(cols['date'] == day)
+    codes = [meta['tickers'][t] for t in cols['ticker'][rows]]
+    expected = {f"T{i}": single['avg'][i] for i in range(12) if not np.isnan(single['avg'][i])}
+    assert dict(zip(codes, cols['rs_avg'][rows].tolist())) == expected
+
+
+def test_series_last_day_matches_compute_rs(make_prices):
+    """백필 / 백테스트용 전체 날짜 계산의 마지막 날 == 그날 compute_rs"""
+    prices, index = make_prices(np.random.default_rng(4), 240, 40)
+    prices[-1] = np.where(np.isnan(prices[-1]), prices[-2], prices[-1])
+    prices[np.isnan(prices)] = 100.0
+
+    series = rs_engine.compute_rs_series(prices, index, PERIODS, WEIGHTS)
+    single = rs_engine.compute_rs(prices, index, PERIODS, WEIGHTS)
+    np.testing.assert_allclose(series['scores'][-1], single['scores'], equal_nan=True)
+    np.testing.assert_allclose(series['avg'][-1], single['avg'], equal_nan=True)
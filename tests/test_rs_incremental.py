@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+import rs_engine
+import rs_kr
+
+PERIODS = [180, 90, 60, 30, 10]
+WEIGHTS = [0.2, 0.2, 0.2, 0.2, 0.2]
+
+
+# =========================================================================
+# IncrementalRS(어제까지).update(오늘) == compute_rs(어제까지 + 오늘)
+# =========================================================================
+def _assert_same(a, b):
+    for key in ('scores', 'avg', 'disparity', 'index_ret', 'bench_avg', 'home_avg'):
+        assert (key in a) == (key in b), key
+        if key in a:
+            np.testing.assert_allclose(a[key], b[key], equal_nan=True, err_msg=key)
+
+
+def _with_today_filled(prices):
+    """오늘 가격이 없는 종목은 전일 종가 (price_matrix.arrays 의 ffill 과 같은 입력)"""
+    full = prices.copy()
+    full[-1] = np.where(np.isnan(full[-1]), full[-2], full[-1])
+    return full
+
+
+def test_matches_compute_rs_single_index(make_prices):
+    prices, index = make_prices(np.random.default_rng(1), 260, 60)
+    engine = rs_engine.IncrementalRS(prices[:-1], index[:-1], PERIODS, WEIGHTS)
+    _assert_same(engine.update(prices[-1], index[-1]),
+                 rs_engine.compute_rs(_with_today_filled(prices), index, PERIODS, WEIGHTS))
+
+
+def test_matches_compute_rs_benchmarks_and_home(make_prices):
+    rng = np.random.default_rng(2)
+    prices, index = make_prices(rng, 260, 80, n_bench=3)
+    home = rng.integers(0, 3, size=80)
+    engine = rs_engine.IncrementalRS(prices[:-1], index[:-1], PERIODS, WEIGHTS, home)
+    _assert_same(engine.update(prices[-1], index[-1]),
+                 rs_engine.compute_rs(_with_today_filled(prices), index, PERIODS, WEIGHTS, home))
+
+
+def test_repeated_updates_do_not_drift(make_prices):
+    """같은 날 여러 번 update 해도 앵커는 그대로 (마지막 현재가 기준 결과만)"""
+    prices, index = make_prices(np.random.default_rng(5), 200, 30)
+    engine = rs_engine.IncrementalRS(prices[:-1], index[:-1], PERIODS, WEIGHTS)
+    for k in range(3):
+        engine.update(prices[-1] * (1 + 0.01 * k), index[-1])
+    _assert_same(engine.update(prices[-1], index[-1]),
+                 rs_engine.compute_rs(_with_today_filled(prices), index, PERIODS, WEIGHTS))
+
+
+def test_short_history(make_prices):
+    """최장 기간보다 짧은 히스토리: 계산 못 하는 기간은 양쪽 모두 NaN"""
+    prices, index = make_prices(np.random.default_rng(3), 70, 20)
+    prices[-1] = np.where(np.isnan(prices[-1]), 50.0, prices[-1])
+    engine = rs_engine.IncrementalRS(prices[:-1], index[:-1], PERIODS, WEIGHTS)
+    _assert_same(engine.update(prices[-1], index[-1]), rs_engine.compute_rs(prices, index, PERIODS, WEIGHTS))
+
+
+# =========================================================================
+# 장중 현재가: top 모드는 전 종목 시세표를 받지 않음
+# =========================================================================
+class _Table:
+    def __init__(self, markets):
+        self.markets = markets
+
+    def column(self, field):
+        return self.markets
+
+
+def test_top_mode_live_prices_use_quotes_only(monkeypatch):
+    seen = {}
+
+    def last_prices(syms, aliases=None):
+        seen.update(syms=syms, aliases=aliases)
+        return {'005930': 70000.0, '247540': 300000.0, 'KS11': 2500.0}
+
+    monkeypatch.setattr(rs_kr, 'RS_KR_MODE', 'top')
+    monkeypatch.setattr(rs_kr.quote_snapshot, 'last_prices', last_prices)
+    monkeypatch.setattr(rs_kr.symbols, 'table', lambda market, *a, **k: _Table({'005930': 'KOSPI', '247540': 'KOSDAQ'}))
+    monkeypatch.setattr(rs_kr.fdr, 'StockListing', lambda *a, **k: pytest.fail("시세표 다운로드"))
+
+    prices, index_now, listing = rs_kr.live_prices(['005930', '247540', '999990'], ['KS11', 'KQ11'], pd.Timestamp.now())
+    assert listing is None
+    np.testing.assert_array_equal(prices, [70000.0, 300000.0, np.nan])
+    np.testing.assert_array_equal(index_now, [2500.0, np.nan])
+    assert seen['aliases']['005930'] == '005930.KS' and seen['aliases']['247540'] == '247540.KQ'
+    assert seen['aliases']['KS11'] == '^KS11'
@@ -0,0 +1,111 @@
+import os
+import time
+import threading
+import pytest
+import storage
+
+
+class GateSink(storage.MemorySink):
+    """commit 마다 기록, fail 만큼 실패 / gate 가 열릴 때까지 대기"""
+    name = 'gate'
+
+    def __init__(self, fail=0):
+        super().__init__()
+        self.fail = fail
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def commit(self, ops):
+        self.gate.wait(5)
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("backend down")
+        self.batches.append(list(ops))
+        super().commit(ops)
+
+
+@pytest.fixture
+def fast_retry(monkeypatch):
+    monkeypatch.setattr(storage, 'RETRY_BASE', 0.01)
+
+
+def test_coalesces_writes_to_same_path():
+    sink = GateSink()
+    q = storage.WriteBehindQueue(sink, flush_delay=5)
+    for i in range(5):
+        q.set(('rs_data', 'latest'), {'v': i})
+    q.set(('stock_news', 'news_kr'), {'v': 'n'})
+    q.delete(('stock_news', 'news_kr'))
+    assert q.get(('rs_data', 'latest')) == {'v': 4}       # 안 보낸 기록을 먼저 읽음
+    assert q.get(('stock_news', 'news_kr')) is None
+    assert q.flush(5)
+    assert sink.batches == [[('set', ('rs_data', 'latest'), {'v': 4}), ('delete', ('stock_news', 'news_kr'), None)]]
+    q.close()
+
+
+def test_failed_batch_is_retried_without_losing_newer_writes(fast_retry):
+    sink = GateSink(fail=2)
+    q = storage.WriteBehindQueue(sink, flush_delay=0)
+    q.set(('a',), {'v': 1})
+    q.set(('b',), {'v': 1})
+    assert q.flush(5)
+    assert sink.docs == {('a',): {'v': 1}, ('b',): {'v': 1}}
+    q.close()
+
+
+def test_newer_write_during_inflight_batch_wins():
+    sink = GateSink()
+    sink.gate.clear()
+    q = storage.WriteBehindQueue(sink, flush_delay=0)
+    q.set(('a',), {'v': 1})
+    deadline = time.monotonic() + 5
+    while not q.inflight and time.monotonic() < deadline:
+        time.sleep(0.001)
+    q.set(('a',), {'v': 2})              # 첫 배치가 보내지는 중에 더 새 기록
+    sink.gate.set()
+    assert q.flush(5)
+    assert sink.docs[('a',)] == {'v': 2}
+    q.close()
+
+
+def test_on_commit_runs_once_per_batch_after_commit():
+    calls = []
+    sink = GateSink()
+    q = storage.WriteBehindQueue(sink, flush_delay=5)
+    fn = lambda values: calls.append((len(sink.batches), sorted(values)))
+    q.set(('a',), {'v': 1}, on_commit=(fn, 'a1'))
+    q.set(('a',), {'v': 2}, on_commit=(fn, 'a2'))   # 덮인 기록의 콜백은 버림
+    q.set(('b',), {'v': 1}, on_commit=(fn, 'b1'))
+    q.set(('c',), {'v': 1})
+    assert q.flush(5)
+    assert calls == [(1, ['a2', 'b1'])]
+    q.close()
+
+
+def test_unsent_writes_spill_and_resend_next_run(fast_retry):
+    down = GateSink(fail=10 ** 6)
+    q = storage.WriteBehindQueue(down, flush_delay=0, spill_name='t')
+    q.set(('rs_data', 'latest'), {'v': 1})
+    q.delete(('old',))
+    assert not q.close(timeout=0.2)
+    assert os.path.exists(q.spill_path)
+
+    up = GateSink()
+    q2 = storage.WriteBehindQueue(up, flush_delay=0, spill_name='t')
+    assert q2.flush(5)
+    assert up.docs == {('rs_data', 'latest'): {'v': 1}}
+    assert ('delete', ('old',), None) in up.batches[0]
+    assert not os.path.exists(q2.spill_path)
+    q2.close()
+
+
+@pytest.mark.parametrize('kind', ['json', 'sqlite'])
+def test_file_sinks_round_trip(kind, tmp_path):
+    sink = storage.JsonSink(str(tmp_path / 'j')) if kind == 'json' else storage.SqliteSink(str(tmp_path / 's.db'))
+    doc = {'종목': '삼성전자', 'n': [1, 2]}
+    sink.commit([('set', ('stock_news', 'news_kr', 'tickers', '005930'), doc)])
+    assert sink.get(('stock_news', 'news_kr', 'tickers', '005930')) == doc
+    sink.commit([('delete', ('stock_news', 'news_kr', 'tickers', '005930'), None)])
+    assert sink.get(('stock_news', 'news_kr', 'tickers', '005930')) is None
+